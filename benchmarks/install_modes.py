@@ -0,0 +1,99 @@
+"""Compare install times of Python's default (MSI) and portable modes.
+
+Runs 'main.py --install python [--mode portable] --trace' and
+'main.py --uninstall python' for each mode in turn and reads the stage
+durations from the traces. Run it elevated on a Windows machine (a CI agent or
+VM), since it really installs and removes Python. The artifacts are downloaded
+once before measuring, so the numbers compare installs, not the network.
+
+Usage:
+    python benchmarks/install_modes.py [--runs 3] [--json out.json]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(os.path.dirname(BENCH_DIR), 'main.py')
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BOLD = "\033[1m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_CYAN = "\033[96m"
+
+# Mode label -> extra main.py arguments
+MODES = {
+    'msi': [],
+    'portable': ['--mode', 'portable'],
+}
+STAGES = ('fetch', 'verify', 'extract', 'bootstrap', 'compile', 'path', 'config')
+
+
+def run_install(mode_args, trace_path):
+    """Install Python once with tracing and return {stage: seconds, 'total': seconds}."""
+    result = subprocess.run([sys.executable, MAIN_SCRIPT, '--install', 'python', *mode_args, '--trace', trace_path],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Install failed:\n{result.stdout}\n{result.stderr}")
+    with open(trace_path, 'r', encoding='utf-8') as f:
+        events = json.load(f)['traceEvents']
+    timings = {}
+    for event in events:
+        if event.get('ph') != 'X':
+            continue
+        if event['name'].startswith('install.'):
+            stage = event['name'].split('.', 1)[1]
+            timings[stage] = timings.get(stage, 0.0) + event['dur'] / 1e6
+        elif event['name'] == 'command':
+            timings['total'] = event['dur'] / 1e6
+    return timings
+
+
+def uninstall():
+    subprocess.run([sys.executable, MAIN_SCRIPT, '--uninstall', 'python'], capture_output=True, text=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Python's MSI and portable install times")
+    parser.add_argument('--runs', type=int, default=3, help='Installs to measure per mode')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    if os.name != 'nt':
+        print(f"{BRIGHT_RED}This benchmark installs Python for real and only runs on Windows.{RESET}")
+        sys.exit(1)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='sw-devtools-modes-') as work_dir:
+        for mode, mode_args in MODES.items():
+            # Warm the artifact cache so fetch measures a cache hit
+            print(f"{BRIGHT_CYAN}Warming the artifact cache for {mode}...{RESET}")
+            run_install(mode_args, os.path.join(work_dir, 'warm.json'))
+            uninstall()
+            runs = []
+            for index in range(args.runs):
+                print(f"{BRIGHT_CYAN}{mode} install {index + 1}/{args.runs}...{RESET}")
+                runs.append(run_install(mode_args, os.path.join(work_dir, f"{mode}-{index}.json")))
+                uninstall()
+            results[mode] = {key: round(sum(run.get(key, 0.0) for run in runs) / len(runs), 2)
+                             for key in STAGES + ('total',)}
+
+    print(f"\n{BOLD}{'Mode':10} " + ' '.join(f"{stage:>9}" for stage in STAGES) + f" {'total':>9}{RESET}")
+    for mode, timings in results.items():
+        print(f"{mode:10} " + ' '.join(f"{timings[stage]:>8.2f}s" for stage in STAGES) + f" {timings['total']:>8.2f}s")
+    if results['portable']['total']:
+        print(f"{BRIGHT_GREEN}Portable is {results['msi']['total'] / results['portable']['total']:.1f}x faster than the MSI.{RESET}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'runs': args.runs, 'results': results}, f, indent=4)
+        print(f"{BRIGHT_GREEN}Wrote {args.json}{RESET}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Downloading from several metalink mirrors at once versus from the best single mirror.
+
+Starts one stand-in server (benchmarks/standin.py) per mirror, each with its
+own bandwidth cap, and writes a Metalink 4 file listing them with SHA-256
+piece hashes. The last mirror is much slower than the others. Then the same
+synthetic file is downloaded twice:
+    single      download_file from the fastest mirror
+    metalink    functions.metalink.download_metalink from all mirrors at
+                once, which should drop the slow one after a few pieces
+Both results are checked against the original SHA-256.
+
+Usage:
+    python benchmarks/metalink.py [--size-mb 128] [--mirrors 3] [--rate-kbps 16384] [--slow-kbps 1024] [--json out.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from contextlib import ExitStack
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from functions import download, metalink
+from standin import StandInServer
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BOLD = "\033[1m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_CYAN = "\033[96m"
+
+PIECE_LENGTH = 1024 * 1024
+
+
+def write_meta4(path, name, block_map, urls):
+    """Write a Metalink 4 document with the file's SHA-256 and piece hashes, mirrors in priority order."""
+    pieces = '\n'.join(f'      <hash>{digest}</hash>' for digest in block_map['blocks'])
+    mirrors = '\n'.join(f'    <url priority="{number}">{url}</url>' for number, url in enumerate(urls, 1))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"""<?xml version="1.0" encoding="UTF-8"?>
+<metalink xmlns="urn:ietf:params:xml:ns:metalink">
+  <file name="{name}">
+    <size>{block_map['size']}</size>
+    <hash type="sha-256">{block_map['sha256']}</hash>
+    <pieces length="{block_map['block_size']}" type="sha-256">
+{pieces}
+    </pieces>
+{mirrors}
+  </file>
+</metalink>
+""")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare a multi-mirror metalink download with the best single mirror')
+    parser.add_argument('--size-mb', type=int, default=128, help='Size of the downloaded file')
+    parser.add_argument('--mirrors', type=int, default=3, help='Number of fast mirrors')
+    parser.add_argument('--rate-kbps', type=int, default=16384, help='Bandwidth cap of each fast mirror')
+    parser.add_argument('--slow-kbps', type=int, default=1024, help='Bandwidth cap of the slow mirror')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    work_dir = tempfile.mkdtemp(prefix='sw-devtools-metalink-')
+    results = {}
+    try:
+        with ExitStack() as stack:
+            servers = [stack.enter_context(StandInServer(work_dir)) for _ in range(args.mirrors + 1)]
+            rates = [args.rate_kbps] * args.mirrors + [args.slow_kbps]
+            urls = [f"{server.base_url}/synthetic/{size}?rate_kbps={rate}" for server, rate in zip(servers, rates)]
+            path = os.path.join(work_dir, 'image.iso')
+            print(f"{BRIGHT_CYAN}Downloading {args.size_mb} MB once to publish its piece hashes...{RESET}")
+            download.download_file(f"{servers[0].base_url}/synthetic/{size}", path, show_progress=False)
+            reference = download.hash_blocks(path, PIECE_LENGTH)
+            meta4_path = os.path.join(work_dir, 'image.iso.meta4')
+            write_meta4(meta4_path, 'image.iso', reference, urls)
+            os.remove(path)
+
+            def measure(label, fetch):
+                print(f"{BRIGHT_CYAN}{label}: downloading {args.size_mb} MB...{RESET}")
+                started = time.perf_counter()
+                try:
+                    fetch()
+                    ok = download.sha256_file(path) == reference['sha256']
+                except OSError as e:
+                    print(f"{BRIGHT_RED}{label} failed: {e}{RESET}")
+                    ok = False
+                seconds = time.perf_counter() - started
+                results[label] = {'ok': ok, 'seconds': round(seconds, 2),
+                                  'mb_per_s': round(args.size_mb / seconds, 1) if seconds else None}
+                if os.path.exists(path):
+                    os.remove(path)
+
+            measure('single', lambda: download.download_file(urls[0], path, show_progress=False))
+            with open(meta4_path, 'rb') as f:
+                meta = metalink.parse_metalink(f.read())
+            slow_before = sum(servers[-1].requests.values())
+            measure('metalink', lambda: metalink.download_metalink(meta, path, show_progress=False))
+            results['metalink']['slow_requests'] = sum(servers[-1].requests.values()) - slow_before
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{BOLD}{'Run':9} {'Result':>8} {'Time':>9} {'Rate':>11}{RESET}")
+    for label, result in results.items():
+        state = f"{BRIGHT_GREEN}{'ok':>8}{RESET}" if result['ok'] else f"{BRIGHT_RED}{'failed':>8}{RESET}"
+        print(f"{label:9} {state} {result['seconds']:>8.2f}s {result['mb_per_s']:>6.1f} MB/s")
+    print(f"Pieces requested from the slow mirror: {results['metalink']['slow_requests']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'size_mb': args.size_mb, 'mirrors': args.mirrors, 'rate_kbps': args.rate_kbps,
+                       'slow_kbps': args.slow_kbps, 'results': results}, f, indent=4)
+        print(f"{BRIGHT_GREEN}Wrote {args.json}{RESET}")
+    sys.exit(0 if all(result['ok'] for result in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
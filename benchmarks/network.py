@@ -0,0 +1,119 @@
+"""Download scenarios under emulated network conditions.
+
+Runs functions.download.download_file against the stand-in server
+(benchmarks/standin.py) with latency, bandwidth caps, connection resets,
+stalls, a wrong Content-Length and missing Range support. Each scenario is
+run with retries disabled and with the default retry/resume logic, and the
+outcome, time, retries and resumed bytes are reported.
+
+Usage:
+    python benchmarks/network.py [--size-mb 32] [--scenario resets] [--json out.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from functions import download
+from standin import StandInServer
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BOLD = "\033[1m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_CYAN = "\033[96m"
+
+# Scenario name -> stand-in query parameters; {quarter} is a quarter of the file size
+SCENARIOS = {
+    'clean': {},
+    'latency': {'latency_ms': 300},
+    'throttled': {'rate_kbps': 8192},
+    'resets': {'reset_after': '{quarter}', 'resets': 3},
+    'stall': {'stall_ms': 3000, 'stalls': 1},
+    'wrong_length': {'wrong_length': 65536},
+    'no_range_resets': {'reset_after': '{quarter}', 'resets': 2, 'no_range': 1},
+}
+
+
+def run_scenario(server, name, size, retries, work_dir):
+    """Download one file under a scenario and return the outcome."""
+    params = {key: str(value).format(quarter=size // 4) for key, value in SCENARIOS[name].items()}
+    query = '&'.join(f"{key}={value}" for key, value in params.items())
+    url = f"{server.base_url}/synthetic/{size}" + (f"?{query}" if query else '')
+    # A different query per run keeps the stand-in's per-URL reset counter fresh
+    url += ('&' if query else '?') + f"run={time.monotonic_ns()}"
+    output_path = os.path.join(work_dir, f"{name}.bin")
+
+    previous = download.RETRIES
+    download.RETRIES = retries
+    stats = {}
+    started = time.perf_counter()
+    try:
+        download.download_file(url, output_path, show_progress=False, stats=stats)
+        ok = os.path.getsize(output_path) == size
+        error = None if ok else 'size mismatch'
+    except Exception as e:
+        ok, error = False, repr(e)
+    finally:
+        download.RETRIES = previous
+    seconds = time.perf_counter() - started
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    return {
+        'scenario': name,
+        'retries_allowed': retries,
+        'ok': ok,
+        'error': error,
+        'seconds': round(seconds, 2),
+        'throughput_mb_s': round(size / (1024 * 1024) / seconds, 1) if ok else 0.0,
+        'retries': stats.get('retries', 0),
+        'resumed_mb': round(stats.get('resumed_bytes', 0) / (1024 * 1024), 1),
+        'restarts': stats.get('restarts', 0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Download scenarios under emulated network conditions')
+    parser.add_argument('--size-mb', type=int, default=32, help='Size of the downloaded file')
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help='Run only these scenarios')
+    parser.add_argument('--backoff', type=float, default=0.2, help='Retry backoff in seconds for the run')
+    parser.add_argument('--timeout', type=float, default=2.0, help='Stall timeout in seconds for the run')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    download.BACKOFF = args.backoff
+    download.TIMEOUT = args.timeout
+    size = args.size_mb * 1024 * 1024
+    work_dir = tempfile.mkdtemp(prefix='sw-devtools-net-')
+    results = []
+    try:
+        with StandInServer(work_dir) as server:
+            for name in args.scenario or SCENARIOS:
+                for retries in (0, download.RETRIES):
+                    print(f"{BRIGHT_CYAN}{name} (retries={retries})...{RESET}")
+                    results.append(run_scenario(server, name, size, retries, work_dir))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{BOLD}{'Scenario':18} {'Retries':>7} {'Result':>7} {'Time':>8} {'MB/s':>8} {'Retried':>7} {'Resumed':>8} {'Restarts':>8}{RESET}")
+    for r in results:
+        result = f"{BRIGHT_GREEN}{'ok':>7}{RESET}" if r['ok'] else f"{BRIGHT_RED}{'failed':>7}{RESET}"
+        print(f"{r['scenario']:18} {r['retries_allowed']:>7} {result} {r['seconds']:>7.2f}s {r['throughput_mb_s']:>8.1f} "
+              f"{r['retries']:>7} {r['resumed_mb']:>6.1f}MB {r['restarts']:>8}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'size_mb': args.size_mb, 'results': results}, f, indent=4)
+        print(f"{BRIGHT_GREEN}Wrote {args.json}{RESET}")
+
+
+if __name__ == '__main__':
+    main()
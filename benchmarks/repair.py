@@ -0,0 +1,100 @@
+"""Repairing a corrupted download from its block map versus downloading it again.
+
+Downloads a synthetic file from the stand-in server (benchmarks/standin.py)
+while building its block map, damages a few blocks, and restores it twice
+over a bandwidth-capped link:
+    redownload  download_file of the whole file again
+    repair      functions.download.repair_file, which fetches only the
+                blocks whose hashes differ, with Range requests
+Both results are checked against the original SHA-256.
+
+Usage:
+    python benchmarks/repair.py [--size-mb 256] [--bad-blocks 3] [--rate-kbps 32768] [--json out.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from functions import download
+from standin import StandInServer
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BOLD = "\033[1m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_CYAN = "\033[96m"
+
+
+def damage(path, blocks, block_size):
+    """Flip bytes inside the given blocks, like a bad Wi-Fi link or disk would."""
+    with open(path, 'r+b') as f:
+        for index in blocks:
+            f.seek(index * block_size + block_size // 2)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare repairing a corrupted download with downloading it again')
+    parser.add_argument('--size-mb', type=int, default=256, help='Size of the downloaded file')
+    parser.add_argument('--bad-blocks', type=int, default=3, help='Number of damaged 4 MiB blocks')
+    parser.add_argument('--rate-kbps', type=int, default=32768, help='Bandwidth cap of the restoring link')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    size = args.size_mb * 1024 * 1024
+    work_dir = tempfile.mkdtemp(prefix='sw-devtools-repair-')
+    results = {}
+    try:
+        with StandInServer(work_dir) as server:
+            url = f"{server.base_url}/synthetic/{size}"
+            path = os.path.join(work_dir, 'image.iso')
+            map_path = os.path.join(work_dir, 'image.blockmap.json')
+            hasher = download.BlockHasher()
+            print(f"{BRIGHT_CYAN}Downloading {args.size_mb} MB and building its block map...{RESET}")
+            download.download_file(url, path, show_progress=False, hasher=hasher)
+            reference = hasher.block_map()
+            download.save_block_map(map_path, path, reference)
+            bad = sorted(random.Random(7).sample(range(len(reference['blocks'])), min(args.bad_blocks, len(reference['blocks']))))
+            capped = f"{url}?rate_kbps={args.rate_kbps}"
+
+            def measure(label, restore):
+                damage(path, bad, reference['block_size'])
+                print(f"{BRIGHT_CYAN}{label}: restoring {len(bad)} damaged block(s)...{RESET}")
+                started = time.perf_counter()
+                fetched = restore()
+                seconds = time.perf_counter() - started
+                ok = fetched is not None and download.sha256_file(path) == reference['sha256']
+                results[label] = {'ok': ok, 'seconds': round(seconds, 2), 'mb': round((fetched or 0) / (1024 * 1024), 1)}
+
+            measure('redownload', lambda: download.download_file(capped, path, show_progress=False))
+            measure('repair', lambda: download.repair_file(path, capped, reference, map_path))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n{BOLD}{'Run':11} {'Result':>8} {'Time':>9} {'Fetched':>10}{RESET}")
+    for label, result in results.items():
+        state = f"{BRIGHT_GREEN}{'ok':>8}{RESET}" if result['ok'] else f"{BRIGHT_RED}{'failed':>8}{RESET}"
+        print(f"{label:11} {state} {result['seconds']:>8.2f}s {result['mb']:>8.1f}MB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'size_mb': args.size_mb, 'bad_blocks': args.bad_blocks, 'rate_kbps': args.rate_kbps,
+                       'results': results}, f, indent=4)
+        print(f"{BRIGHT_GREEN}Wrote {args.json}{RESET}")
+    sys.exit(0 if all(result['ok'] for result in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
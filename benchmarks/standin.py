@@ -0,0 +1,370 @@
+"""Local HTTP stand-in for python.org, windows.php.net, PyPI and ISO mirrors.
+
+Serves deterministic synthetic data of any size without touching the disk
+(/synthetic/<bytes>) and real files from a directory (/files/<name>), both
+with single-range support, so download benchmarks measure the client rather
+than the network. The wheels in the directory are also published as a
+package index (/simple/, PEP 503, with PEP 658 metadata files), so pip can
+resolve against it offline.
+
+Network conditions are injected per request through query parameters:
+    latency_ms=200      delay before the response headers
+    rate_kbps=512       bandwidth cap
+    stall_ms=3000       pause after the headers (slow start) ...
+    stalls=1            ... on the first N requests for the URL (default all)
+    reset_after=1048576 reset the connection after this many body bytes ...
+    resets=2            ... on the first N requests for the URL (default 1)
+    wrong_length=4096   advertise this many more bytes than are sent
+    no_range=1          ignore Range headers and always send the whole file
+e.g. /synthetic/104857600?rate_kbps=2048&reset_after=10485760&resets=3
+
+Usage:
+    python benchmarks/standin.py [--port 8765] [--dir DIR]
+"""
+import os
+import re
+import html
+import time
+import hashlib
+import random
+import socket
+import struct
+import urllib.parse
+import zipfile
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BLOCK_SIZE = 1024 * 1024
+# One block of incompressible data, repeated to build synthetic files of any size
+BLOCK = random.Random(20251019).randbytes(BLOCK_SIZE)
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+METADATA_SUFFIX = '.metadata'
+
+
+def _parse_range(header, size):
+    """Return (start, end) for a single range, None to ignore the header and False if it cannot be satisfied."""
+    match = RANGE_PATTERN.match((header or '').strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    return (start, end) if start <= end < size else False
+
+
+def parse_conditions(query):
+    """Parse the network condition query parameters into a dict of ints."""
+    conditions = {}
+    for key, values in urllib.parse.parse_qs(query).items():
+        try:
+            conditions[key] = int(values[-1])
+        except ValueError:
+            pass
+    return conditions
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        self.conditions = parse_conditions(query)
+        self.request_number = self.server.count_request(self.path)
+        if path.startswith('/synthetic/') and path[len('/synthetic/'):].isdigit():
+            self._send(int(path[len('/synthetic/'):]), self._synthetic_reader)
+        elif path.startswith('/simple/'):
+            self._send_index(path[len('/simple/'):].strip('/'))
+        elif path.startswith('/files/') and path.endswith('.whl' + METADATA_SUFFIX):
+            wheel_path = os.path.join(self.server.files_dir, os.path.basename(path)[:-len(METADATA_SUFFIX)])
+            metadata = wheel_metadata(wheel_path) if os.path.isfile(wheel_path) else None
+            if metadata is None:
+                self.send_error(404)
+                return
+            self._send(len(metadata), lambda start, length: [metadata[start:start + length]])
+        elif path.startswith('/files/'):
+            file_path = os.path.join(self.server.files_dir, os.path.basename(path))
+            if not os.path.isfile(file_path):
+                self.send_error(404)
+                return
+            self._send(os.path.getsize(file_path), lambda start, length: self._file_reader(file_path, start, length))
+        else:
+            self.send_error(404)
+
+    def _send_index(self, project):
+        """Send the PEP 503 project list, or the file list of one project."""
+        projects = self.server.wheel_index()
+        if not project:
+            links = [f'<a href="/simple/{name}/">{name}</a>' for name in sorted(projects)]
+        elif normalize_project(project) in projects:
+            links = []
+            for filename, digest, metadata_digest in projects[normalize_project(project)]:
+                quoted = urllib.parse.quote(filename)
+                links.append(f'<a href="/files/{quoted}#sha256={digest}" data-core-metadata="sha256={metadata_digest}" '
+                             f'data-dist-info-metadata="sha256={metadata_digest}">{html.escape(filename)}</a>')
+        else:
+            self.send_error(404)
+            return
+        body = ('<!DOCTYPE html>\n<html><body>\n' + '<br>\n'.join(links) + '\n</body></html>\n').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send(self, size, reader):
+        conditions = self.conditions
+        if conditions.get('latency_ms'):
+            time.sleep(conditions['latency_ms'] / 1000)
+
+        byte_range = None if conditions.get('no_range') else _parse_range(self.headers.get('Range'), size)
+        if byte_range is False:
+            self.send_response(416)
+            self.send_header('Content-Range', f"bytes */{size}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        start, end = byte_range or (0, size - 1)
+        self.send_response(206 if byte_range else 200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        if not conditions.get('no_range'):
+            self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1 + conditions.get('wrong_length', 0)))
+        if byte_range:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        if conditions.get('stall_ms') and self.request_number <= conditions.get('stalls', self.request_number):
+            time.sleep(conditions['stall_ms'] / 1000)
+        reset_after = None
+        if conditions.get('reset_after') and self.request_number <= conditions.get('resets', 1):
+            reset_after = conditions['reset_after']
+        # Small pieces keep the bandwidth cap smooth
+        piece_size = 64 * 1024 if conditions.get('rate_kbps') else BLOCK_SIZE
+        bytes_per_second = conditions.get('rate_kbps', 0) * 1024
+        started = time.perf_counter()
+        sent = 0
+        try:
+            for chunk in reader(start, end - start + 1):
+                for offset in range(0, len(chunk), piece_size):
+                    piece = chunk[offset:offset + piece_size]
+                    if reset_after is not None and sent + len(piece) > reset_after:
+                        self.wfile.write(piece[:reset_after - sent])
+                        self._reset()
+                        return
+                    self.wfile.write(piece)
+                    sent += len(piece)
+                    if bytes_per_second:
+                        ahead = sent / bytes_per_second - (time.perf_counter() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+            if conditions.get('wrong_length'):
+                # The client is still waiting for the advertised bytes
+                self._reset()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _reset(self):
+        """Abort the connection with a TCP reset."""
+        self.close_connection = True
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+
+    @staticmethod
+    def _synthetic_reader(start, length):
+        position = start
+        remaining = length
+        while remaining:
+            offset = position % BLOCK_SIZE
+            chunk = BLOCK[offset:offset + min(BLOCK_SIZE - offset, remaining)]
+            yield chunk
+            position += len(chunk)
+            remaining -= len(chunk)
+
+    @staticmethod
+    def _file_reader(file_path, start, length):
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            while length:
+                chunk = f.read(min(BLOCK_SIZE, length))
+                if not chunk:
+                    break
+                yield chunk
+                length -= len(chunk)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    The stand-in server. Use as a context manager to run it on a background thread.
+
+    Args:
+        files_dir (str): Directory served under /files/
+        port (int): Port to bind on 127.0.0.1, 0 picks a free one
+    """
+    daemon_threads = True
+
+    def __init__(self, files_dir, port=0):
+        super().__init__(('127.0.0.1', port), StandInHandler)
+        self.files_dir = files_dir
+        self.requests = {}
+        self._requests_lock = threading.Lock()
+        # Wheel path -> (mtime, size, sha256, metadata sha256)
+        self._digests = {}
+
+    def count_request(self, path):
+        """Count a request for a URL and return its 1-based number."""
+        with self._requests_lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+            return self.requests[path]
+
+    def wheel_index(self):
+        """
+        List the wheels in files_dir by normalized project name.
+
+        Returns:
+            dict: project -> [(filename, sha256, metadata sha256), ...]
+        """
+        projects = {}
+        for filename in sorted(os.listdir(self.files_dir)):
+            if not filename.endswith('.whl'):
+                continue
+            file_path = os.path.join(self.files_dir, filename)
+            stat = os.stat(file_path)
+            with self._requests_lock:
+                cached = self._digests.get(file_path)
+            if cached is None or cached[:2] != (stat.st_mtime, stat.st_size):
+                with open(file_path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+                cached = (stat.st_mtime, stat.st_size, digest, hashlib.sha256(wheel_metadata(file_path) or b'').hexdigest())
+                with self._requests_lock:
+                    self._digests[file_path] = cached
+            projects.setdefault(normalize_project(filename.split('-')[0]), []).append((filename, cached[2], cached[3]))
+        return projects
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def normalize_project(name):
+    """Normalize a project name as PEP 503 does."""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def wheel_metadata(wheel_path):
+    """Return a wheel's METADATA file (what PEP 658 serves as <wheel>.metadata), or None."""
+    try:
+        with zipfile.ZipFile(wheel_path) as zf:
+            for name in zf.namelist():
+                if name.count('/') == 1 and name.endswith('.dist-info/METADATA'):
+                    return zf.read(name)
+    except (OSError, zipfile.BadZipFile):
+        pass
+    return None
+
+
+def make_wheel(directory, name, version, requires=(), payload_size=0):
+    """
+    Write a minimal pure-Python wheel that pip can install.
+
+    Args:
+        directory (str): Where to write the wheel
+        name (str): Project name, e.g. 'demo_pkg'
+        version (str): Version, e.g. '1.0'
+        requires (tuple): Requirement strings for Requires-Dist, e.g. ('demo_dep>=1',)
+        payload_size (int): Bytes of incompressible data to add, to give the wheel a realistic size
+
+    Returns:
+        str: Path of the wheel
+    """
+    import base64
+
+    module = re.sub(r'[-.]+', '_', name).lower()
+    dist_info = f"{module}-{version}.dist-info"
+    files = {
+        f"{module}/__init__.py": f"__version__ = '{version}'\n".encode(),
+        f"{dist_info}/METADATA": ('Metadata-Version: 2.1\n'
+                                  f'Name: {name}\nVersion: {version}\n'
+                                  + ''.join(f'Requires-Dist: {requirement}\n' for requirement in requires)).encode(),
+        f"{dist_info}/WHEEL": b'Wheel-Version: 1.0\nGenerator: standin\nRoot-Is-Purelib: true\nTag: py3-none-any\n',
+    }
+    if payload_size:
+        files[f"{module}/payload.bin"] = random.Random(f"{name}-{version}").randbytes(payload_size)
+    record = []
+    for path, data in files.items():
+        digest = base64.urlsafe_b64encode(hashlib.sha256(data).digest()).rstrip(b'=').decode()
+        record.append(f"{path},sha256={digest},{len(data)}")
+    record.append(f"{dist_info}/RECORD,,")
+    files[f"{dist_info}/RECORD"] = ('\n'.join(record) + '\n').encode()
+
+    wheel_path = os.path.join(directory, f"{module}-{version}-py3-none-any.whl")
+    with zipfile.ZipFile(wheel_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for path, data in files.items():
+            zf.writestr(path, data)
+    return wheel_path
+
+
+def make_php_like_zip(path, scale=1.0):
+    """
+    Write a zip shaped like the PHP Windows archive.
+
+    A few large binaries, about 70 extension DLLs and a few hundred small text
+    files, compressed with deflate. With scale=1.0 the archive is roughly the
+    size of the real one (about 30 MB).
+
+    Args:
+        path (str): The zip file to write
+        scale (float): Size multiplier for the file contents
+
+    Returns:
+        int: Size of the archive in bytes
+    """
+    rng = random.Random(8)
+
+    def binary(size):
+        # Half random, half repeated, so it compresses about like real DLLs do
+        size = max(1, int(size * scale))
+        noise = rng.randbytes(size // 2)
+        return noise + bytes(size - len(noise))
+
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, size in (('php.exe', 140_000), ('php-cgi.exe', 80_000), ('php8.dll', 9_000_000),
+                           ('libcrypto-3-x64.dll', 5_000_000), ('libssl-3-x64.dll', 800_000), ('icudt72.dll', 30_000_000)):
+            zf.writestr(name, binary(size))
+        for index in range(70):
+            zf.writestr(f"ext/php_ext{index:02d}.dll", binary(rng.randint(30_000, 600_000)))
+        for index in range(400):
+            zf.writestr(f"extras/ssl/doc{index:03d}.txt", ("lorem ipsum dolor sit amet\n" * rng.randint(10, 400)).encode())
+        zf.writestr('php.ini-development', b"; php.ini\n" * 8000)
+        zf.writestr('php.ini-production', b"; php.ini\n" * 8000)
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local HTTP stand-in for download benchmarks')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--dir', default='.', help='Directory served under /files/')
+    args = parser.parse_args()
+    server = StandInServer(os.path.abspath(args.dir), args.port)
+    print(f"Serving {server.base_url}/synthetic/<bytes>, {server.base_url}/files/<name> "
+          f"and {server.base_url}/simple/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Cold-start benchmark for the sw-devtools CLI.
+
+Runs `python -X importtime main.py --version` several times and fails if the
+imports made by main.py exceed a threshold, or if any heavy module that only
+install/download commands need gets imported during startup.
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--max-import-ms 30] [--max-wall-ms 300] [--json out.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_CYAN = "\033[96m"
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(REPO_ROOT, 'main.py')
+
+# Modules that must never be imported just to print the version
+FORBIDDEN_MODULES = (
+    'urllib.request', 'http.client', 'ssl', 'email', 'zipfile', 'winreg', 'ctypes',
+    'functions.python', 'functions.php', 'functions.iso',
+)
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output.
+
+    Returns:
+        tuple: ({top-level module: cumulative microseconds}, set of all imported module names)
+    """
+    top_level = {}
+    imported = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            cumulative = int(cumulative)
+        except ValueError:
+            continue
+        module = name.strip()
+        imported.add(module)
+        # Nested imports are indented below their parent
+        if not name[1:].startswith(' '):
+            top_level[module] = top_level.get(module, 0) + cumulative
+    return top_level, imported
+
+
+def run_once(args):
+    """Run one cold start and return (wall ms, importtime stderr)."""
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + args,
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    return wall_ms, result.stderr
+
+
+def measure(runs=5, cli_args=None):
+    """
+    Measure cold-start time of the CLI.
+
+    Interpreter startup (site and friends) is measured with `-c pass` and
+    subtracted, so the import figure only covers what main.py pulls in.
+
+    Returns:
+        dict: Median wall and import times, per-run figures and forbidden imports
+    """
+    cli_args = cli_args or ['--version']
+    _, baseline_stderr = run_once(['-c', 'pass'])
+    baseline_modules, _ = parse_importtime(baseline_stderr)
+
+    wall_times = []
+    import_times = []
+    forbidden = set()
+    slowest = {}
+    for _ in range(runs):
+        wall_ms, stderr = run_once([MAIN_SCRIPT] + cli_args)
+        top_level, imported = parse_importtime(stderr)
+        own = {m: us for m, us in top_level.items() if m not in baseline_modules}
+        wall_times.append(wall_ms)
+        import_times.append(sum(own.values()) / 1000)
+        forbidden.update(m for m in imported if m in FORBIDDEN_MODULES)
+        slowest = own
+
+    return {
+        'command': ['main.py'] + cli_args,
+        'runs': runs,
+        'wall_ms': round(statistics.median(wall_times), 2),
+        'import_ms': round(statistics.median(import_times), 2),
+        'wall_ms_runs': [round(t, 2) for t in wall_times],
+        'import_ms_runs': [round(t, 2) for t in import_times],
+        'slowest_imports': sorted(((m, round(us / 1000, 2)) for m, us in slowest.items()), key=lambda x: -x[1])[:10],
+        'forbidden_imports': sorted(forbidden),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start benchmark for sw-devtools')
+    parser.add_argument('--runs', type=int, default=5, help='Number of cold starts to measure')
+    parser.add_argument('--max-import-ms', type=float, default=30.0, help='Fail if main.py imports take longer (median)')
+    parser.add_argument('--max-wall-ms', type=float, default=300.0, help='Fail if a cold --version takes longer (median, 0 disables)')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    result = measure(args.runs)
+    print(f"{BRIGHT_CYAN}Cold start of {' '.join(result['command'])} ({result['runs']} runs){RESET}")
+    print(f"  Wall time (median): {result['wall_ms']:.1f} ms")
+    print(f"  main.py imports (median): {result['import_ms']:.1f} ms")
+    for module, ms in result['slowest_imports']:
+        print(f"    {module}: {ms:.2f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=4)
+
+    failures = []
+    if result['forbidden_imports']:
+        failures.append(f"heavy modules imported at startup: {', '.join(result['forbidden_imports'])}")
+    if result['import_ms'] > args.max_import_ms:
+        failures.append(f"imports took {result['import_ms']:.1f} ms (limit {args.max_import_ms:.1f} ms)")
+    if args.max_wall_ms and result['wall_ms'] > args.max_wall_ms:
+        failures.append(f"cold start took {result['wall_ms']:.1f} ms (limit {args.max_wall_ms:.1f} ms)")
+
+    if failures:
+        for failure in failures:
+            print(f"{BRIGHT_RED}✗ Startup regression: {failure}{RESET}")
+        sys.exit(1)
+    print(f"{BRIGHT_GREEN}✓ Startup within limits.{RESET}")
+
+
+if __name__ == '__main__':
+    main()
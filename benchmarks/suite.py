@@ -0,0 +1,252 @@
+"""Benchmark suite for downloads, extraction, config/catalog loading and startup.
+
+Every benchmark runs in its own child process against the local stand-in
+server (benchmarks/standin.py), so peak RSS and CPU time are measured per
+benchmark and no request leaves the machine. Results are written as JSON and
+can be compared with a stored baseline.
+
+Usage:
+    python benchmarks/suite.py [--download-mb 2048] [--quick] [--json results.json]
+                               [--baseline baseline.json] [--threshold 0.15] [--save-baseline baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BOLD = "\033[1m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+# Metric -> True if higher is better
+METRICS = {
+    'download.throughput_mb_s': True,
+    'download.cpu_ns_per_byte': False,
+    'download.peak_rss_mb': False,
+    'extract.seconds': False,
+    'extract.cpu_seconds': False,
+    'extract.peak_rss_mb': False,
+    'load.config_us': False,
+    'load.catalog_us': False,
+    'startup.wall_ms': False,
+    'startup.import_ms': False,
+}
+
+
+def peak_rss_mb():
+    """Return this process's peak resident set size in MB."""
+    if os.name == 'nt':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def child_download(url, output_path):
+    from functions.download import download_file
+    started, cpu_started = time.perf_counter(), time.process_time()
+    size = download_file(url, output_path, show_progress=False)
+    seconds, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+    return {
+        'bytes': size,
+        'seconds': round(seconds, 3),
+        'throughput_mb_s': round(size / (1024 * 1024) / seconds, 1),
+        'cpu_ns_per_byte': round(cpu * 1e9 / size, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def child_extract(archive, output_dir):
+    from functions.pipeline import _install_artifact
+    started, cpu_started = time.perf_counter(), time.process_time()
+    _install_artifact(archive, 'zip', output_dir, '', '0')
+    return {
+        'archive_mb': round(os.path.getsize(archive) / (1024 * 1024), 1),
+        'seconds': round(time.perf_counter() - started, 3),
+        'cpu_seconds': round(time.process_time() - cpu_started, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def child_load(config_path, iterations):
+    from functions import config, iso
+    results = {}
+    for name, load, reset in (
+        ('config_us', lambda: config.load_config(config_path), lambda: config._config_memo.clear()),
+        ('catalog_us', iso.read_isos_config, lambda: setattr(iso, '_catalog_memo', None)),
+    ):
+        # Drop the in-memory copy every time so each iteration parses the file
+        started = time.perf_counter()
+        for _ in range(iterations):
+            reset()
+            load()
+        results[name] = round((time.perf_counter() - started) * 1e6 / iterations, 1)
+    return results
+
+
+CHILDREN = {
+    'download': child_download,
+    'extract': child_extract,
+    'load': child_load,
+}
+
+
+def run_child(name, *args):
+    """Run one benchmark in a fresh interpreter and return its JSON result."""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', name, json.dumps(args)],
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Benchmark '{name}' failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_suite(download_mb, zip_scale, startup_runs, load_iterations):
+    """
+    Run every benchmark.
+
+    Returns:
+        dict: {'meta': {...}, 'results': {benchmark: {metric: value}}}
+    """
+    from standin import StandInServer, make_php_like_zip
+    import startup
+
+    work_dir = tempfile.mkdtemp(prefix='sw-devtools-bench-')
+    try:
+        archive = os.path.join(work_dir, 'php-bench.zip')
+        print(f"{BRIGHT_CYAN}Generating PHP-shaped archive...{RESET}")
+        make_php_like_zip(archive, zip_scale)
+        config_path = os.path.join(work_dir, 'config.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump({'install_path': work_dir, 'python_path': os.path.join(work_dir, 'python.exe')}, f, indent=4)
+
+        results = {}
+        with StandInServer(work_dir) as server:
+            print(f"{BRIGHT_CYAN}Downloading {download_mb} MB from the stand-in server...{RESET}")
+            results['download'] = run_child('download', f"{server.base_url}/synthetic/{download_mb * 1024 * 1024}",
+                                            os.path.join(work_dir, 'download.bin'))
+            os.remove(os.path.join(work_dir, 'download.bin'))
+
+        print(f"{BRIGHT_CYAN}Extracting the archive...{RESET}")
+        results['extract'] = run_child('extract', archive, os.path.join(work_dir, 'extract'))
+
+        print(f"{BRIGHT_CYAN}Loading config and catalog...{RESET}")
+        results['load'] = run_child('load', config_path, load_iterations)
+
+        print(f"{BRIGHT_CYAN}Measuring cold start...{RESET}")
+        measured = startup.measure(startup_runs)
+        results['startup'] = {'wall_ms': measured['wall_ms'], 'import_ms': measured['import_ms']}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'download_mb': download_mb,
+            'zip_scale': zip_scale,
+        },
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results with a baseline.
+
+    Returns:
+        list: (metric, baseline, current, change, regressed) for every metric in both
+    """
+    rows = []
+    for metric, higher_is_better in METRICS.items():
+        group, name = metric.split('.')
+        current = results['results'].get(group, {}).get(name)
+        previous = baseline['results'].get(group, {}).get(name)
+        if current is None or not previous:
+            continue
+        change = (current - previous) / previous
+        regressed = change < -threshold if higher_is_better else change > threshold
+        rows.append((metric, previous, current, change, regressed))
+    return rows
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        print(json.dumps(CHILDREN[sys.argv[2]](*json.loads(sys.argv[3]))))
+        return
+
+    parser = argparse.ArgumentParser(description='Benchmark suite for sw-devtools')
+    parser.add_argument('--download-mb', type=int, default=2048, help='Size of the synthetic download')
+    parser.add_argument('--zip-scale', type=float, default=1.0, help='Size multiplier for the PHP-shaped archive')
+    parser.add_argument('--startup-runs', type=int, default=5, help='Cold starts to measure')
+    parser.add_argument('--load-iterations', type=int, default=200, help='Config/catalog loads to average')
+    parser.add_argument('--quick', action='store_true', help='Small sizes for a fast smoke run')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Compare against this results file')
+    parser.add_argument('--threshold', type=float, default=0.15, help='Allowed relative regression per metric')
+    parser.add_argument('--save-baseline', help='Also write the results to this baseline file')
+    args = parser.parse_args()
+
+    if args.quick:
+        args.download_mb, args.zip_scale, args.startup_runs, args.load_iterations = 64, 0.1, 2, 50
+
+    results = run_suite(args.download_mb, args.zip_scale, args.startup_runs, args.load_iterations)
+
+    print(f"\n{BOLD}Results{RESET}")
+    for group, metrics in results['results'].items():
+        print(f"  {BRIGHT_CYAN}{group}{RESET}: " + ', '.join(f"{k}={v}" for k, v in metrics.items()))
+
+    for path in filter(None, (args.json, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4)
+        print(f"{BRIGHT_GREEN}Wrote {path}{RESET}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        print(f"\n{BOLD}Compared with {args.baseline} (threshold {args.threshold:.0%}){RESET}")
+        for metric, previous, current, change, regressed in rows:
+            color = BRIGHT_RED if regressed else BRIGHT_GREEN
+            print(f"  {metric:28} {previous:>10} -> {current:>10}  {color}{change:+.1%}{RESET}")
+        regressions = [row[0] for row in rows if row[4]]
+        if regressions:
+            print(f"{BRIGHT_RED}✗ Regressions: {', '.join(regressions)}{RESET}")
+            sys.exit(1)
+        print(f"{BRIGHT_GREEN}✓ No regressions.{RESET}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Package provisioning from the shared wheelhouse versus plain pip.
+
+Publishes synthetic wheels (a few with dependencies) through the stand-in
+package index (benchmarks/standin.py) and installs the same requirements
+file into fresh virtual environments three ways:
+    pip        plain 'pip install -r' against the index, no pip cache
+    cold       functions.wheelhouse with an empty wheelhouse: resolve, parallel
+               downloads, then pip --no-index from the wheelhouse
+    warm       functions.wheelhouse again for a new environment: the cached
+               resolution and wheels, no index requests at all
+Nothing leaves the machine, so it also checks the --with code path offline.
+
+Usage:
+    python benchmarks/wheelhouse.py [--packages 30] [--size-kb 512] [--json out.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from functions import wheelhouse
+from standin import StandInServer, make_wheel
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BOLD = "\033[1m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_CYAN = "\033[96m"
+
+
+def make_environment(path):
+    """Create a virtual environment with pip and return its interpreter."""
+    subprocess.run([sys.executable, '-m', 'venv', path], check=True, capture_output=True)
+    return os.path.join(path, 'Scripts', 'python.exe') if os.name == 'nt' else os.path.join(path, 'bin', 'python')
+
+
+def installed(python_exe, names):
+    """Return True if every project imports in the environment."""
+    code = '; '.join(f"import {name}" for name in names)
+    return subprocess.run([python_exe, '-c', code], capture_output=True).returncode == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare wheelhouse provisioning with plain pip')
+    parser.add_argument('--packages', type=int, default=30, help='Number of packages in the requirements file')
+    parser.add_argument('--size-kb', type=int, default=512, help='Payload size of each wheel')
+    parser.add_argument('--json', help='Write the results to this JSON file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='sw-devtools-wheels-') as work_dir:
+        files_dir = os.path.join(work_dir, 'index')
+        os.makedirs(files_dir)
+        names = [f"demo_pkg{index:02d}" for index in range(args.packages)]
+        # Every fifth package depends on a shared library package, like requests on urllib3
+        make_wheel(files_dir, 'demo_common', '2.0', payload_size=args.size_kb * 1024)
+        for index, name in enumerate(names):
+            make_wheel(files_dir, name, '1.0', requires=('demo_common>=2',) if index % 5 == 0 else (),
+                       payload_size=args.size_kb * 1024)
+        requirements = os.path.join(work_dir, 'requirements.txt')
+        with open(requirements, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(names) + '\n')
+
+        results = {}
+        with StandInServer(files_dir) as server:
+            index_url = f"{server.base_url}/simple/"
+            house = os.path.join(work_dir, 'wheelhouse')
+
+            def measure(label, install):
+                python_exe = make_environment(os.path.join(work_dir, f"env-{label}"))
+                before = sum(server.requests.values())
+                print(f"{BRIGHT_CYAN}{label}: installing {args.packages} packages...{RESET}")
+                started = time.perf_counter()
+                ok = install(python_exe) and installed(python_exe, names + ['demo_common'])
+                results[label] = {'ok': ok, 'seconds': round(time.perf_counter() - started, 2),
+                                  'requests': sum(server.requests.values()) - before}
+
+            measure('pip', lambda python_exe: subprocess.run(
+                [python_exe, '-m', 'pip', 'install', '--no-cache-dir', '--disable-pip-version-check', '--quiet',
+                 '--index-url', index_url, '-r', requirements]).returncode == 0)
+
+            def provision(python_exe):
+                wheels = wheelhouse.provision_wheels(python_exe, requirements, house, 'bench', index_url=index_url)
+                return wheels is not None and wheelhouse.install_wheels(python_exe, house, wheels)
+            measure('cold', provision)
+            measure('warm', provision)
+
+    print(f"\n{BOLD}{'Run':6} {'Result':>8} {'Time':>9} {'Requests':>9}{RESET}")
+    for label, result in results.items():
+        state = f"{BRIGHT_GREEN}{'ok':>8}{RESET}" if result['ok'] else f"{BRIGHT_RED}{'failed':>8}{RESET}"
+        print(f"{label:6} {state} {result['seconds']:>8.2f}s {result['requests']:>9}")
+    if results['warm']['requests']:
+        print(f"{BRIGHT_RED}The warm install made {results['warm']['requests']} index requests; it should make none.{RESET}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'packages': args.packages, 'size_kb': args.size_kb, 'results': results}, f, indent=4)
+        print(f"{BRIGHT_GREEN}Wrote {args.json}{RESET}")
+    sys.exit(0 if all(result['ok'] for result in results.values()) and not results['warm']['requests'] else 1)
+
+
+if __name__ == '__main__':
+    main()
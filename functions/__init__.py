@@ -1,2 +1,15 @@
-from .initialize import init_default_conifg, init_default_conifg_ud
-from .admin import is_admin, request_admin_privileges
\ No newline at end of file
+import importlib
+
+# Re-exports are resolved lazily so importing a single submodule stays cheap
+_EXPORTS = {
+    'init_default_conifg': '.initialize',
+    'init_default_conifg_ud': '.initialize',
+    'is_admin': '.admin',
+    'request_admin_privileges': '.admin',
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
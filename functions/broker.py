@@ -0,0 +1,489 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import secrets
+import threading
+import contextlib
+from . import config, metrics
+from .admin import is_admin
+from .ipc import IPCError, LocalClient, LocalServer
+from .trace import span
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+# The broker exits after this many seconds without a request, and when the command that started it exits
+IDLE_TIMEOUT = 900
+# How long to wait for the UAC prompt to be answered and the broker to listen
+START_TIMEOUT = 120
+MAIN_SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+# The session token is handed to the broker over this pipe, never through a file;
+# the name carries the PID of the client that created it
+PIPE_PREFIX = r'\\.\pipe\sw-devtools-broker-'
+PIPE_PATTERN = re.compile(r'^\\\\\.\\pipe\\sw-devtools-broker-(\d+)-[0-9a-f]{32}$')
+TOKEN_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Windows API constants for the handoff pipe and the broker launch
+PIPE_ACCESS_DUPLEX = 0x3
+FILE_FLAG_FIRST_PIPE_INSTANCE = 0x80000
+PIPE_REJECT_REMOTE_CLIENTS = 0x8
+ERROR_PIPE_CONNECTED = 535
+SEE_MASK_NOCLOSEPROCESS = 0x40
+SYNCHRONIZE = 0x100000
+INFINITE = 0xFFFFFFFF
+WAIT_OBJECT_0 = 0
+
+# The broker of this process, started on first use; parallel installs share it
+_client = None
+_client_lock = threading.Lock()
+
+# Operation name -> handler. This is everything the elevated broker will do.
+OPERATIONS = {}
+
+
+def operation(name):
+    """Register a function as a privileged broker operation."""
+    def register(func):
+        OPERATIONS[name] = func
+        return func
+    return register
+
+
+@operation('install_artifact')
+def _op_install_artifact(name, version, mode=None, precompile=True, ini_profile=None):
+    """
+    Install a runtime artifact (and the pip wheel of modes that bootstrap pip) into the install root.
+
+    The artifact, its expected checksum and the install directory are all
+    resolved here, from the manifest and the protected config. The client's
+    download is only reused when the manifest or release index publishes a
+    checksum it matches; anything else is downloaded into the protected cache.
+    """
+    from .pipeline import prepare_install, stage_fetch, stage_verify, stage_extract, stage_bootstrap, stage_compile
+    ctx = prepare_install(name, version, mode=mode, precompile=precompile, ini_profile=ini_profile)
+    if ctx is None:
+        return False
+    _adopt(ctx['artifact'], ctx['sha256'])
+    if ctx['pip_wheel']:
+        _adopt(ctx['pip_wheel'], ctx['manifest']['pip_wheel'].get('sha256'))
+    return stage_fetch(ctx) and stage_verify(ctx) and stage_extract(ctx) and stage_bootstrap(ctx) and stage_compile(ctx)
+
+
+def _adopt(protected, sha256):
+    """
+    Copy the unelevated download of a file into the protected cache if it has a known checksum.
+
+    The copy is verified, so the user-writable original cannot be swapped
+    after it was checked. Without a checksum nothing is copied and the caller
+    downloads the file itself.
+
+    Returns:
+        bool: True if the protected cache holds a copy matching sha256
+    """
+    from .config import get_user_cache_dir
+    from .download import sha256_file
+    if not sha256:
+        return False
+    if os.path.exists(protected):
+        if sha256_file(protected) == sha256.lower():
+            return True
+        os.remove(protected)
+    download = os.path.join(get_user_cache_dir(), 'artifacts', os.path.basename(protected))
+    if not os.path.isfile(download):
+        return False
+    shutil.copyfile(download, protected)
+    if sha256_file(protected) != sha256.lower():
+        print(f"{BRIGHT_YELLOW}'{download}' does not match its published checksum; downloading it again.{RESET}")
+        os.remove(protected)
+        return False
+    return True
+
+
+@operation('install_wheels')
+def _op_install_wheels(name, version, wheels, mode=None):
+    """Install wheels ([path, sha256, project, version]) from the user's wheelhouse into a runtime."""
+    from .pipeline import prepare_install
+    from .wheelhouse import PINNED_PATTERN, SHA256_PATTERN, blob_path, get_wheelhouse, install_wheels
+    ctx = prepare_install(name, version, mode=mode)
+    if ctx is None:
+        return False
+    house = get_wheelhouse(ctx['artifact_dir'])
+    protected = []
+    for path, sha256, project, project_version in wheels:
+        filename = os.path.basename(path)
+        if not SHA256_PATTERN.match(sha256) or not PINNED_PATTERN.match(f"{project}=={project_version}") or not filename.endswith('.whl'):
+            print(f"{BRIGHT_RED}Refusing to install '{filename}' ({project}=={project_version}).{RESET}")
+            return False
+        blob_dir = os.path.dirname(blob_path(house, sha256, filename))
+        os.makedirs(blob_dir, exist_ok=True)
+        copy = _protect(path, blob_dir, sha256)
+        if copy is None:
+            return False
+        protected.append({'name': project, 'version': project_version, 'filename': filename, 'sha256': sha256, 'path': copy})
+    return install_wheels(os.path.join(ctx['install_path'], ctx['manifest']['exe']), house, protected)
+
+
+@operation('php_profile')
+def _op_php_profile(profile):
+    from .phpini import apply_installed_profile
+    return apply_installed_profile(profile)
+
+
+@operation('php_ext_set')
+def _op_php_ext_set(enable, disable):
+    """Edit the extension lines of the installed PHP's php.ini (enable: [name, kind] pairs, disable: names)."""
+    from .phpext import NAME_PATTERN, get_php_install, set_extensions
+    names = [entry[0] for entry in enable] + list(disable)
+    if not all(NAME_PATTERN.match(name) for name in names) or \
+            not all(entry[1] in ('extension', 'zend_extension') for entry in enable):
+        print(f"{BRIGHT_RED}Refusing invalid extension names: {', '.join(names)}{RESET}")
+        return False
+    install_path, _ = get_php_install()
+    return install_path is not None and set_extensions(install_path, enable, disable)
+
+
+@operation('install_bundle_runtimes')
+def _op_install_bundle_runtimes(bundle_path, runtimes):
+    """Install runtimes from a bundle the user chose, with the runtime manifests packed into it."""
+    from .bundle import install_bundle_runtimes
+    return install_bundle_runtimes(bundle_path, runtimes)
+
+
+@operation('commit_runtimes')
+def _op_commit_runtimes(runtimes):
+    """Record installed runtimes ([name, version] or [name, version, mode]) in the config and regenerate the shims."""
+    from .pipeline import prepare_install, commit_runtimes
+    config_path = config.find_config_path()
+    ctxs = [prepare_install(entry[0], entry[1], config_path=config_path, mode=entry[2] if len(entry) > 2 else None)
+            for entry in runtimes]
+    return commit_runtimes([ctx for ctx in ctxs if ctx], config_path)
+
+
+@operation('uninstall')
+def _op_uninstall(name):
+    """Uninstall a runtime; uninstall_runtime only removes directories the manifest places under a managed root."""
+    from .pipeline import uninstall_runtime
+    return uninstall_runtime(name)
+
+
+@operation('optimize_path')
+def _op_optimize_path(scope, hot, prune_missing):
+    from .path import optimize_path
+    return optimize_path(scope, hot=hot, prune_missing=prune_missing, apply=True)
+
+
+@operation('update_shims')
+def _op_update_shims():
+    from .shims import update_shims
+    return update_shims()
+
+
+@operation('init')
+def _op_init(path):
+    from .initialize import init_default_conifg, init_default_conifg_ud
+    if path == 'default':
+        init_default_conifg()
+    else:
+        init_default_conifg_ud(path)
+    return True
+
+
+def dispatch(message):
+    """
+    Run one broker request and capture what it prints.
+
+    The broker runs elevated, so it never writes the metrics into the user's
+    cache itself: each reply carries the metrics the operation recorded, and
+    the client merges them into its own.
+
+    Args:
+        message (dict): {'op': name, 'args': {...}}
+
+    Returns:
+        dict: {'ok': bool, 'result': ..., 'output': str, 'metrics': {...}} or {'ok': False, 'error': str}
+    """
+    handler = OPERATIONS.get(message.get('op'))
+    if handler is None:
+        return {'ok': False, 'error': f"Unknown operation '{message.get('op')}'"}
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            result = handler(**(message.get('args') or {}))
+        reply = {'ok': True, 'result': result}
+    except SystemExit as e:
+        reply = {'ok': False, 'error': f"Operation exited with status {e.code}"}
+    except Exception as e:
+        reply = {'ok': False, 'error': str(e)}
+    reply.update(output=output.getvalue(), metrics=metrics.take())
+    return reply
+
+
+def get_broker(start=True):
+    """
+    Return a client for this command's broker, starting it if needed.
+
+    The broker is started at most once per command, with one UAC prompt, and
+    runs every privileged operation of the command. Its session token is
+    handed over a named pipe and only ever lives in the memory of the two
+    processes, so other programs running as the user cannot drive it.
+
+    Args:
+        start (bool): Launch an elevated broker if none is running
+
+    Returns:
+        LocalClient: A connected client, or None if no broker is available
+    """
+    with _client_lock:
+        if _client is not None and _client.ping():
+            return _client
+        if not start:
+            return None
+        return _launch_client()
+
+
+def _launch_client():
+    """Start a broker for this command and connect to it (called with _client_lock held)."""
+    global _client
+    # The broker only trusts the protected default config, so a custom one would silently diverge
+    config_path = config.find_config_path()
+    default_path = config.get_default_config_path()
+    if config_path and os.path.normcase(os.path.abspath(config_path)) != os.path.normcase(os.path.abspath(default_path)):
+        print(f"{BRIGHT_RED}The elevated helper only uses the protected config '{default_path}', not '{config_path}'. "
+              f"Run this command from an elevated prompt to use SW_DEVTOOLS_CONFIG.{RESET}")
+        return None
+
+    token = secrets.token_hex(32)
+    try:
+        port = _start_broker(token)
+    except Exception as e:
+        print(f"{BRIGHT_RED}Could not start the elevated helper: {e}{RESET}")
+        return None
+    if port is None:
+        return None
+    client = LocalClient(port, token, on_reply=lambda reply: metrics.add(reply.get('metrics')))
+    if not client.ping():
+        print(f"{BRIGHT_RED}The elevated helper is not answering on port {port}.{RESET}")
+        return None
+    _client = client
+    return client
+
+
+def _kernel32():
+    """Load kernel32 with the signatures used here, so 64-bit handles are not truncated."""
+    import ctypes
+    from ctypes import wintypes
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    handle, dword = wintypes.HANDLE, wintypes.DWORD
+    kernel32.CreateNamedPipeW.restype = handle
+    kernel32.CreateNamedPipeW.argtypes = [wintypes.LPCWSTR, dword, dword, dword, dword, dword, dword, ctypes.c_void_p]
+    kernel32.ConnectNamedPipe.argtypes = [handle, ctypes.c_void_p]
+    kernel32.GetNamedPipeClientProcessId.argtypes = [handle, ctypes.POINTER(wintypes.ULONG)]
+    kernel32.GetNamedPipeServerProcessId.argtypes = [handle, ctypes.POINTER(wintypes.ULONG)]
+    kernel32.ReadFile.argtypes = [handle, ctypes.c_void_p, dword, ctypes.POINTER(dword), ctypes.c_void_p]
+    kernel32.WriteFile.argtypes = [handle, ctypes.c_char_p, dword, ctypes.POINTER(dword), ctypes.c_void_p]
+    kernel32.GetProcessId.argtypes = [handle]
+    kernel32.GetProcessId.restype = dword
+    kernel32.OpenProcess.argtypes = [dword, wintypes.BOOL, dword]
+    kernel32.OpenProcess.restype = handle
+    kernel32.WaitForSingleObject.argtypes = [handle, dword]
+    kernel32.WaitForSingleObject.restype = dword
+    kernel32.CloseHandle.argtypes = [handle]
+    return kernel32
+
+
+def _start_broker(token):
+    """
+    Launch the elevated broker and hand it the session token.
+
+    A named pipe is created before the broker is launched with its name, and
+    the token is only written once the process connected to the pipe is the
+    one UAC started; the broker checks in turn that the pipe belongs to us.
+
+    Returns:
+        int: The port the broker listens on, or None if it did not start
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    class ShellExecuteInfo(ctypes.Structure):
+        _fields_ = [('cbSize', wintypes.DWORD), ('fMask', wintypes.ULONG), ('hwnd', wintypes.HWND),
+                    ('lpVerb', wintypes.LPCWSTR), ('lpFile', wintypes.LPCWSTR), ('lpParameters', wintypes.LPCWSTR),
+                    ('lpDirectory', wintypes.LPCWSTR), ('nShow', ctypes.c_int), ('hInstApp', wintypes.HINSTANCE),
+                    ('lpIDList', ctypes.c_void_p), ('lpClass', wintypes.LPCWSTR), ('hkeyClass', wintypes.HKEY),
+                    ('dwHotKey', wintypes.DWORD), ('hIcon', wintypes.HANDLE), ('hProcess', wintypes.HANDLE)]
+
+    kernel32 = _kernel32()
+    pipe_name = f"{PIPE_PREFIX}{os.getpid()}-{secrets.token_hex(16)}"
+    # FIRST_PIPE_INSTANCE fails if another process already created a pipe of this name
+    pipe = kernel32.CreateNamedPipeW(pipe_name, PIPE_ACCESS_DUPLEX | FILE_FLAG_FIRST_PIPE_INSTANCE,
+                                     PIPE_REJECT_REMOTE_CLIENTS, 1, 4096, 4096, 0, None)
+    if pipe in (None, wintypes.HANDLE(-1).value):
+        raise ctypes.WinError(ctypes.get_last_error())
+    process = None
+    try:
+        info = ShellExecuteInfo(cbSize=ctypes.sizeof(ShellExecuteInfo), fMask=SEE_MASK_NOCLOSEPROCESS, lpVerb='runas',
+                                lpFile=sys.executable, lpParameters=f'"{MAIN_SCRIPT}" --broker-serve "{pipe_name}"', nShow=0)
+        if not ctypes.windll.shell32.ShellExecuteExW(ctypes.byref(info)) or not info.hProcess:
+            print(f"{BRIGHT_RED}Admin privilege request was denied.{RESET}")
+            return None
+        process = info.hProcess
+        broker_pid = kernel32.GetProcessId(process)
+
+        print(f"{BRIGHT_YELLOW}Started the elevated helper. Waiting for it to connect...{RESET}")
+        connected = threading.Event()
+
+        def connect():
+            if kernel32.ConnectNamedPipe(pipe, None) or ctypes.get_last_error() == ERROR_PIPE_CONNECTED:
+                connected.set()
+
+        threading.Thread(target=connect, daemon=True).start()
+        deadline = time.monotonic() + START_TIMEOUT
+        while not connected.wait(0.2):
+            if kernel32.WaitForSingleObject(process, 0) == WAIT_OBJECT_0:
+                print(f"{BRIGHT_RED}The elevated helper exited before it connected.{RESET}")
+                return None
+            if time.monotonic() > deadline:
+                print(f"{BRIGHT_RED}The elevated helper did not start within {START_TIMEOUT} seconds.{RESET}")
+                return None
+
+        client_pid = wintypes.ULONG()
+        if not kernel32.GetNamedPipeClientProcessId(pipe, ctypes.byref(client_pid)) or client_pid.value != broker_pid:
+            print(f"{BRIGHT_RED}Process {client_pid.value} connected to the elevated helper's pipe instead of the helper; "
+                  f"not handing over the session token.{RESET}")
+            return None
+        _pipe_write(kernel32, pipe, {'token': token})
+        port = _pipe_read(kernel32, pipe).get('port')
+        if not isinstance(port, int):
+            print(f"{BRIGHT_RED}The elevated helper did not report its port.{RESET}")
+            return None
+        return port
+    finally:
+        kernel32.CloseHandle(pipe)
+        if process:
+            kernel32.CloseHandle(process)
+
+
+def _pipe_write(kernel32, pipe, message):
+    """Write one JSON line to a pipe handle."""
+    import ctypes
+    from ctypes import wintypes
+    data = (json.dumps(message) + "\n").encode('utf-8')
+    written = wintypes.DWORD()
+    if not kernel32.WriteFile(pipe, data, len(data), ctypes.byref(written), None) or written.value != len(data):
+        raise ctypes.WinError(ctypes.get_last_error())
+
+
+def _pipe_read(kernel32, pipe):
+    """Read one JSON line from a pipe handle; an empty dict if the other end closed first."""
+    import ctypes
+    from ctypes import wintypes
+    data = b''
+    buffer = ctypes.create_string_buffer(4096)
+    read = wintypes.DWORD()
+    while not data.endswith(b'\n'):
+        if not kernel32.ReadFile(pipe, buffer, len(buffer), ctypes.byref(read), None) or not read.value:
+            break
+        data += buffer.raw[:read.value]
+    try:
+        message = json.loads(data.decode('utf-8'))
+        return message if isinstance(message, dict) else {}
+    except (UnicodeDecodeError, json.JSONDecodeError):
+        return {}
+
+
+def run_privileged(op, **args):
+    """
+    Run a privileged operation in this process if elevated, otherwise in the broker.
+
+    Exits when the broker cannot be started, like the other privileged entry points.
+
+    Args:
+        op (str): Operation name, a key of OPERATIONS
+        **args: Operation arguments (JSON-serializable)
+
+    Returns:
+        The operation's result
+    """
+    if is_admin():
+        return OPERATIONS[op](**args)
+    client = get_broker()
+    if client is None:
+        sys.exit(1)  # get_broker said why
+    try:
+        # The work happens in the broker process, so it shows up as one span here
+        with span(f"broker.{op}"):
+            return client.call(op, **args)
+    except (OSError, IPCError) as e:
+        print(f"{BRIGHT_RED}Elevated helper failed to run '{op}': {e}{RESET}")
+        return False
+
+
+def serve_broker(pipe_name):
+    """
+    Entry point of the elevated broker process (main.py --broker-serve <pipe>).
+
+    Connects to the handoff pipe of the command that launched it, checks that
+    the pipe belongs to that process, reads the session token from it, listens
+    on a free loopback port and reports the port back over the pipe. Then it
+    serves requests until the launching command exits, shutdown or IDLE_TIMEOUT.
+
+    Only the protected default config is used: SW_DEVTOOLS_CONFIG and any
+    path a client could name are writable without elevation.
+
+    Returns:
+        bool: False if the broker could not start
+    """
+    if not is_admin():
+        print(f"{BRIGHT_RED}The elevated helper must run as administrator.{RESET}")
+        return False
+    match = PIPE_PATTERN.match(pipe_name or '')
+    if not match:
+        print(f"{BRIGHT_RED}Invalid handoff pipe '{pipe_name}'.{RESET}")
+        return False
+    client_pid = int(match.group(1))
+    os.environ.pop('SW_DEVTOOLS_CONFIG', None)
+    config.CONFIG_FILE = None
+
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+    kernel32 = _kernel32()
+    try:
+        with open(pipe_name, 'r+b', buffering=0) as handoff:
+            server_pid = wintypes.ULONG()
+            handle = msvcrt.get_osfhandle(handoff.fileno())
+            if not kernel32.GetNamedPipeServerProcessId(handle, ctypes.byref(server_pid)) or server_pid.value != client_pid:
+                print(f"{BRIGHT_RED}The handoff pipe belongs to process {server_pid.value}, not {client_pid}.{RESET}")
+                return False
+            session = json.loads(handoff.readline().decode('utf-8'))
+            token = session.get('token') if isinstance(session, dict) else None
+            if not isinstance(token, str) or not TOKEN_PATTERN.match(token):
+                print(f"{BRIGHT_RED}No valid session token on the handoff pipe.{RESET}")
+                return False
+            server = LocalServer(token, dispatch, idle_timeout=IDLE_TIMEOUT)
+            handoff.write((json.dumps({'port': server.port}) + "\n").encode('utf-8'))
+    except (OSError, ValueError) as e:
+        print(f"{BRIGHT_RED}Broker handoff over '{pipe_name}' failed: {e}{RESET}")
+        return False
+
+    # Nobody else holds the token, so there is nothing left to serve once the command exits
+    client = kernel32.OpenProcess(SYNCHRONIZE, False, client_pid)
+    if not client:
+        return False
+
+    def watch_client():
+        kernel32.WaitForSingleObject(client, INFINITE)
+        server.stop()
+
+    threading.Thread(target=watch_client, daemon=True).start()
+    server.serve_forever()
+    kernel32.CloseHandle(client)
+    return True
@@ -0,0 +1,351 @@
+import io
+import os
+import copy
+import json
+import time
+import hashlib
+import zipfile
+from .config import load_config
+from .download import CHUNK_SIZE, download_file, sha256_file
+from .runtimes import get_runtime, load_runtimes, render, use_runtimes
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+BUNDLE_MANIFEST = 'bundle.json'
+BUNDLE_FORMAT = 1
+# Keys of the bundled runtimes.json that are used: what is downloaded, not how it is installed
+BUNDLE_KEYS = ('version', 'url', 'sha256', 'pip_wheel')
+
+
+def create_bundle(bundle_path, runtimes=None, isos=None, language='en_US', versions=None):
+    """
+    Pack runtime artifacts, ISOs and the catalogs into one offline bundle.
+
+    The bundle is a ZIP64 archive with every member stored uncompressed, plus
+    a bundle.json manifest recording each member's size, SHA-256 and data
+    offset. Artifacts are already compressed, and stored members can be read
+    with a single seek (or an HTTP Range request) without scanning the rest
+    of a multi-GB bundle. The packed runtimes.json names the version, URL and
+    checksum each bundled runtime was downloaded with.
+
+    Args:
+        bundle_path (str): The bundle file to write
+        runtimes (list): Runtime names to include, defaults to every runtime
+        isos (list): ISO paths to include (e.g. 'linux/ubuntu/24.04_lts/desktop_amd64')
+        language (str): Language of the ISOs
+        versions (dict): Runtime name -> version (from --runtimes python@3.13),
+            defaults to the manifest versions
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    from .iso import get_iso_url, get_iso_output_path
+    from .pipeline import prepare_install, stage_fetch, stage_verify, _fetch, _verify
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'runtimes': {},
+        'isos': {},
+        'files': {},
+    }
+    members = []
+    catalog = copy.deepcopy(load_runtimes())
+
+    for name in runtimes or list(catalog):
+        ctx = prepare_install(name, (versions or {}).get(name))
+        # Not run_pipeline: nothing is installed, so there is no install journal to keep
+        try:
+            fetched = ctx is not None and stage_fetch(ctx) and stage_verify(ctx)
+        except Exception as e:
+            print(f"{BRIGHT_RED}An error occurred while fetching {name}: {e}{RESET}")
+            fetched = False
+        if not fetched:
+            print(f"{BRIGHT_RED}Could not fetch {name} for the bundle.{RESET}")
+            return False
+        artifacts = [ctx['artifact']]
+        fallback = ctx['manifest'].get('fallback')
+        if fallback:
+            fallback_url = render(fallback['url'], ctx['version'])
+            fallback_artifact = os.path.join(ctx['artifact_dir'], os.path.basename(fallback_url.split('?')[0]))
+            if _fetch(ctx['label'], fallback_url, fallback_artifact, mirror=ctx['cfg'].get('cache_mirror'), sha256=fallback.get('sha256')) and _verify(fallback_artifact, fallback.get('sha256'), ctx['cfg'].get('allow_unverified_downloads', False)):
+                artifacts.append(fallback_artifact)
+        runtime_members = [f"runtimes/{ctx['name']}/{os.path.basename(a)}" for a in artifacts]
+        members.extend(zip(runtime_members, artifacts))
+        manifest['runtimes'][ctx['name']] = {'version': ctx['version'], 'artifacts': runtime_members}
+        catalog[ctx['name']].update(version=ctx['version'], url=ctx['url'], sha256=ctx['sha256'])
+
+    for iso_path in isos or []:
+        iso_url, note = get_iso_url(iso_path, language)
+        if iso_url is None:
+            return False
+        output_path = get_iso_output_path(iso_path, language, iso_url)
+        if not os.path.exists(output_path):
+            print(f"{BRIGHT_GREEN}Downloading {iso_path} ({language}) from {iso_url}...{RESET}")
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            download_file(iso_url, output_path, mirror=load_config().get('cache_mirror'))
+        member = f"isos/{os.path.basename(output_path)}"
+        members.append((member, output_path))
+        manifest['isos'][iso_path] = {'language': language, 'member': member, 'note': note}
+
+    members.append(('catalog/isos.json', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'isos.json')))
+    members.append(('catalog/runtimes.json', json.dumps(catalog, indent=4).encode('utf-8')))
+
+    part_path = bundle_path + '.part'
+    try:
+        with zipfile.ZipFile(part_path, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for member, source in members:
+                print(f"{BRIGHT_CYAN}Adding {member}...{RESET}")
+                manifest['files'][member] = _write_member(zf, member, source)
+            zf.writestr(BUNDLE_MANIFEST, json.dumps(manifest, indent=4))
+        os.replace(part_path, bundle_path)
+    except Exception as e:
+        print(f"{BRIGHT_RED}Failed to write bundle '{bundle_path}': {e}{RESET}")
+        try:
+            os.remove(part_path)
+        except OSError:
+            pass
+        return False
+
+    size_mb = os.path.getsize(bundle_path) / (1024 * 1024)
+    print(f"{BRIGHT_GREEN}Wrote bundle '{bundle_path}' ({len(members)} files, {size_mb:.1f} MB).{RESET}")
+    return True
+
+
+def _write_member(zf, member, source):
+    """Stream a file (or bytes) into the bundle uncompressed and return its size, SHA-256 and data offset."""
+    if isinstance(source, bytes):
+        info = zipfile.ZipInfo(member, time.localtime()[:6])
+        opened = io.BytesIO(source)
+    else:
+        info = zipfile.ZipInfo.from_file(source, member)
+        opened = open(source, 'rb')
+    info.compress_type = zipfile.ZIP_STORED
+    digest = hashlib.sha256()
+    size = 0
+    with opened as src, zf.open(info, 'w', force_zip64=True) as dst:
+        # The local header has just been written, so this is where the data starts
+        offset = zf.fp.tell()
+        for block in iter(lambda: src.read(CHUNK_SIZE), b''):
+            dst.write(block)
+            digest.update(block)
+            size += len(block)
+    return {'size': size, 'sha256': digest.hexdigest(), 'offset': offset}
+
+
+def read_bundle_manifest(zf):
+    """
+    Read and check the manifest of an open bundle.
+
+    Returns:
+        dict: The manifest
+
+    Raises:
+        ValueError: If the archive is not a bundle or uses an unknown format
+    """
+    try:
+        manifest = json.loads(zf.read(BUNDLE_MANIFEST).decode('utf-8'))
+    except KeyError:
+        raise ValueError(f"'{zf.filename}' is not a sw-devtools bundle (no {BUNDLE_MANIFEST}).")
+    if manifest.get('format') != BUNDLE_FORMAT:
+        raise ValueError(f"Unsupported bundle format {manifest.get('format')}, expected {BUNDLE_FORMAT}.")
+    return manifest
+
+
+def extract_member(zf, manifest, member, output_path):
+    """
+    Extract one bundle member and verify its SHA-256.
+
+    Only this member is read: the central directory gives its position, so
+    the rest of the bundle is never scanned. An existing file with the right
+    hash is kept as is.
+
+    Returns:
+        bool: True if output_path holds the verified member
+    """
+    expected = manifest['files'][member]['sha256']
+    if os.path.exists(output_path) and sha256_file(output_path) == expected:
+        print(f"{BRIGHT_GREEN}'{output_path}' is already up to date.{RESET}")
+        return True
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    part_path = output_path + '.part'
+    digest = hashlib.sha256()
+    with zf.open(member) as src, open(part_path, 'wb') as dst:
+        for block in iter(lambda: src.read(CHUNK_SIZE), b''):
+            dst.write(block)
+            digest.update(block)
+    if digest.hexdigest() != expected:
+        print(f"{BRIGHT_RED}Checksum mismatch for bundle member '{member}'.{RESET}")
+        os.remove(part_path)
+        return False
+    os.replace(part_path, output_path)
+    print(f"{BRIGHT_GREEN}Extracted '{member}' to '{output_path}'.{RESET}")
+    return True
+
+
+def install_bundle(bundle_path, runtimes=None, isos=None):
+    """
+    Install runtimes and ISOs from an offline bundle.
+
+    ISOs are extracted to the Downloads folder. The runtimes are installed
+    elevated (through the broker when not elevated) with the runtimes.json
+    packed into the bundle, so they match the artifacts next to it even if
+    the local catalog has moved on. A bundle is trusted like an installer
+    the user runs.
+
+    Args:
+        bundle_path (str): The bundle created by create_bundle
+        runtimes (list): Runtime names to install, defaults to every runtime in the bundle
+        isos (list): ISO paths to extract, defaults to every ISO in the bundle
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    from .admin import is_admin
+    from .broker import run_privileged
+    from .iso import get_iso_output_path
+
+    try:
+        with zipfile.ZipFile(bundle_path, 'r') as zf:
+            manifest = read_bundle_manifest(zf)
+            names = runtimes if runtimes is not None else list(manifest['runtimes'])
+            missing = [name for name in names if name not in manifest['runtimes']]
+            if missing:
+                print(f"{BRIGHT_RED}Bundle does not contain {', '.join(missing)}. Available: {', '.join(manifest['runtimes'])}{RESET}")
+                return False
+
+            iso_paths = isos if isos is not None else list(manifest['isos'])
+            for iso_path in iso_paths:
+                entry = manifest['isos'].get(iso_path)
+                if entry is None:
+                    print(f"{BRIGHT_RED}Bundle does not contain ISO '{iso_path}'.{RESET}")
+                    return False
+                output_path = get_iso_output_path(iso_path, entry['language'], entry['member'])
+                if not extract_member(zf, manifest, entry['member'], output_path):
+                    return False
+                if entry.get('note'):
+                    print(f"{BRIGHT_YELLOW}Note: {entry['note']}{RESET}")
+    except (OSError, ValueError, zipfile.BadZipFile) as e:
+        print(f"{BRIGHT_RED}Could not read bundle '{bundle_path}': {e}{RESET}")
+        return False
+
+    if not names:
+        return True
+    if is_admin():
+        return install_bundle_runtimes(bundle_path, names)
+    return run_privileged('install_bundle_runtimes', bundle_path=os.path.abspath(bundle_path), runtimes=names)
+
+
+def read_bundle_runtimes(zf, manifest):
+    """
+    Read the runtimes.json packed into a bundle.
+
+    Returns:
+        dict: Runtime name -> manifest, or None if the bundle has none or it does not match its checksum
+    """
+    member = 'catalog/runtimes.json'
+    if member not in manifest['files']:
+        return None
+    data = zf.read(member)
+    if hashlib.sha256(data).hexdigest() != manifest['files'][member]['sha256']:
+        print(f"{BRIGHT_RED}Checksum mismatch for bundle member '{member}'.{RESET}")
+        return None
+    return json.loads(data.decode('utf-8'))
+
+
+def merge_bundle_runtimes(local, bundled):
+    """
+    Take what a bundle downloads from its runtimes.json, and how it installs from the local manifests.
+
+    Only the download keys (BUNDLE_KEYS) of a runtime, its fallback and its
+    modes come from the bundle. Installer arguments, directories, config
+    keys and shims stay as the local manifests have them, so a bundle
+    cannot change the command line or the paths the elevated helper uses.
+
+    Args:
+        local (dict): The local runtime manifests
+        bundled (dict): The runtime manifests packed into the bundle
+
+    Returns:
+        dict: Runtime name -> merged manifest, for the runtimes both know
+    """
+    def overlay(target, source):
+        for key in BUNDLE_KEYS:
+            if isinstance(source, dict) and key in source:
+                target[key] = source[key]
+
+    merged = {}
+    ignored = []
+    for name, manifest in local.items():
+        if not isinstance(bundled.get(name), dict):
+            continue
+        runtime = copy.deepcopy(manifest)
+        overlay(runtime, bundled[name])
+        if runtime.get('fallback'):
+            overlay(runtime['fallback'], bundled[name].get('fallback'))
+        for mode, settings in (runtime.get('modes') or {}).items():
+            overlay(settings, (bundled[name].get('modes') or {}).get(mode))
+        ignored += [f"{name}.{key}" for key, value in bundled[name].items()
+                    if key not in BUNDLE_KEYS + ('fallback', 'modes') and value != manifest.get(key)]
+        merged[name] = runtime
+    if ignored:
+        print(f"{BRIGHT_YELLOW}Ignoring bundle settings that differ from the local runtime manifests: {', '.join(sorted(ignored))}{RESET}")
+    return merged
+
+
+def install_bundle_runtimes(bundle_path, names):
+    """
+    Install runtimes from a bundle with the bundle's download settings (elevated).
+
+    The artifacts are extracted into the artifact cache and then installed
+    by the normal pipeline, whose fetch stage finds them there instead of
+    going to the network. The bundle's manifests stay in effect until the
+    install ends, however it ends.
+
+    Args:
+        bundle_path (str): The bundle created by create_bundle
+        names (list): Runtime names to install
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    from .pipeline import install_many, install_runtime, prepare_install
+
+    try:
+        versions = {}
+        with zipfile.ZipFile(bundle_path, 'r') as zf:
+            manifest = read_bundle_manifest(zf)
+            bundled = read_bundle_runtimes(zf, manifest)
+            if bundled is None:
+                print(f"{BRIGHT_YELLOW}Bundle has no usable runtimes.json, installing with the local runtime manifests.{RESET}")
+            else:
+                use_runtimes(merge_bundle_runtimes(load_runtimes(), bundled))
+            unknown = [name for name in names if name not in manifest['runtimes'] or get_runtime(name) is None]
+            if unknown:
+                print(f"{BRIGHT_RED}Cannot install {', '.join(unknown)} from bundle '{bundle_path}': "
+                      f"not in the bundle or not a known runtime.{RESET}")
+                return False
+            for name in names:
+                entry = manifest['runtimes'][name]
+                ctx = prepare_install(name, entry['version'])
+                if ctx is None:
+                    return False
+                for member in entry['artifacts']:
+                    if not extract_member(zf, manifest, member, os.path.join(ctx['artifact_dir'], os.path.basename(member))):
+                        return False
+                versions[name] = entry['version']
+
+        if len(names) > 1:
+            return install_many(names, versions=versions)
+        return install_runtime(names[0], versions[names[0]])
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile) as e:
+        print(f"{BRIGHT_RED}Could not read bundle '{bundle_path}': {e!r}{RESET}")
+        return False
+    finally:
+        use_runtimes(None)
@@ -0,0 +1,419 @@
+import os
+import re
+import json
+import hashlib
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .config import get_user_cache_dir
+from .download import CHUNK_SIZE, MIRROR_BLOCK_MAP_PATH, BlockHasher, download_file, hash_blocks, load_block_map, save_block_map
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+DEFAULT_PORT = 8080
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+# Block maps of cached files are kept next to them
+BLOCK_MAP_SUFFIX = '.blockmap.json'
+
+
+def get_default_cache_dir():
+    """Return the directory the cache server stores mirrored files in."""
+    return os.path.join(get_user_cache_dir(), 'mirror')
+
+
+def get_upstream_hosts():
+    """
+    Collect the hosts the cache server may fetch from.
+
+    Only hosts that appear in runtimes.json or isos.json are mirrored, so the
+    server cannot be used as an open proxy.
+
+    Returns:
+        dict: host (with port, if any) -> URL scheme
+    """
+    from .iso import read_isos_config
+    from .runtimes import load_runtimes
+
+    urls = []
+
+    def collect(node):
+        if isinstance(node, dict):
+            for value in node.values():
+                collect(value)
+        elif isinstance(node, list):
+            for value in node:
+                collect(value)
+        elif isinstance(node, str) and node.startswith('http'):
+            urls.append(node)
+    # Every URL in the manifests: artifacts, fallbacks and the pip wheels (files.pythonhosted.org) of install modes
+    collect(load_runtimes())
+    collect(read_isos_config() or {})
+
+    hosts = {}
+    for url in urls:
+        parsed = urllib.parse.urlsplit(url)
+        hosts.setdefault(parsed.netloc.lower(), parsed.scheme)
+    return hosts
+
+
+def parse_range(header, size):
+    """
+    Parse a single-range Range header.
+
+    Args:
+        header (str): The Range header value, e.g. 'bytes=0-1023', 'bytes=100-' or 'bytes=-500'
+        size (int): Size of the file
+
+    Returns:
+        tuple: (start, end) inclusive, None for a header that should be ignored
+            (multiple or malformed ranges) and False if the range cannot be satisfied
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+class Fill:
+    """
+    State of an upstream fetch into the cache, shared by the requests streaming from it.
+
+    Attributes:
+        cond (threading.Condition): Guards the fields below and is notified on every change
+        started (bool): Upstream sent its first bytes, so the size is known if it announced one
+        written (int): Bytes in the .part file so far
+        total (int): Expected size once upstream announced it (or the body is complete), otherwise None
+        finishing (bool): All bytes are in; the .part file is about to be renamed and must not be opened
+        done (bool): The fetch ended, successfully if ok
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.started = False
+        self.written = 0
+        self.total = None
+        self.finishing = False
+        self.done = False
+        self.ok = False
+
+
+class CacheServer(ThreadingHTTPServer):
+    """
+    HTTP server mirroring runtime artifacts and ISOs for a LAN.
+
+    Requests are served from cache_dir with Range support. A miss is fetched
+    from upstream once, even if many clients ask for it at the same time. The
+    clients are sent the bytes as they reach the .part file, so a large file
+    does not outlast their timeout before its headers, and is not downloaded
+    again by a client that gave up on the mirror.
+
+    Args:
+        address (tuple): (host, port) to bind
+        cache_dir (str): Directory mirrored files are stored in
+        upstream_hosts (dict): Allowed upstream hosts -> scheme, defaults to get_upstream_hosts()
+    """
+    daemon_threads = True
+
+    def __init__(self, address, cache_dir, upstream_hosts=None):
+        super().__init__(address, CacheRequestHandler)
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.upstream_hosts = upstream_hosts if upstream_hosts is not None else get_upstream_hosts()
+        self._locks = {}
+        self._fills = {}
+        self._locks_guard = threading.Lock()
+
+    def lock_for(self, key):
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def resolve(self, request_path):
+        """
+        Map a request path (see download.mirror_url) to (upstream URL, cache file).
+
+        Returns:
+            tuple: (url, cache_path), or (None, None) if the host is not allowed
+                or the path escapes the cache directory
+        """
+        parsed = urllib.parse.urlsplit(request_path)
+        parts = [urllib.parse.unquote(p) for p in parsed.path.split('/') if p]
+        if len(parts) < 2 or parts[0].lower() not in self.upstream_hosts:
+            return None, None
+        # A decoded '/' (%2F) would put the file under another host's directory in the cache
+        if any(p in ('.', '..') or '/' in p or '\\' in p or ':' in p for p in parts[1:]):
+            return None, None
+
+        host = parts[0].lower()
+        url = f"{self.upstream_hosts[host]}://{host}{parsed.path[len('/' + parts[0]):]}"
+        if parsed.query:
+            url += f"?{parsed.query}"
+        # Keep the host directory name portable (no ':' on Windows)
+        cache_parts = [host.replace(':', '_')] + parts[1:]
+        if parsed.query:
+            cache_parts[-1] += '@' + hashlib.sha256(parsed.query.encode('utf-8')).hexdigest()[:16]
+        cache_path = os.path.abspath(os.path.join(self.cache_dir, *cache_parts))
+        if not cache_path.startswith(self.cache_dir + os.sep):
+            return None, None
+        return url, cache_path
+
+    def fill_for(self, url, cache_path):
+        """
+        Start fetching url into cache_path unless it is cached or already being fetched.
+
+        Returns:
+            Fill: The running fetch, or None if the file is cached
+        """
+        with self._locks_guard:
+            if os.path.exists(cache_path):
+                return None
+            fill = self._fills.get(cache_path)
+            if fill is None:
+                fill = self._fills[cache_path] = Fill()
+                threading.Thread(target=self._fill, args=(url, cache_path, fill), daemon=True).start()
+            return fill
+
+    def _fill(self, url, cache_path, fill):
+        def progress(written, total):
+            with fill.cond:
+                fill.started = True
+                fill.written = written
+                fill.total = total or None
+                fill.finishing = bool(total) and written >= total
+                fill.cond.notify_all()
+
+        print(f"{BRIGHT_CYAN}Cache miss, fetching {url}...{RESET}")
+        hasher = BlockHasher()
+        ok = False
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            size = download_file(url, cache_path, show_progress=False, hasher=hasher, progress=progress)
+            save_block_map(cache_path + BLOCK_MAP_SUFFIX, cache_path, hasher.block_map())
+            print(f"{BRIGHT_GREEN}Cached {url} ({size / (1024 * 1024):.1f} MB).{RESET}")
+            ok = True
+        except Exception as e:
+            print(f"{BRIGHT_RED}Upstream fetch of {url} failed: {e}{RESET}")
+        finally:
+            with self._locks_guard:
+                self._fills.pop(cache_path, None)
+            with fill.cond:
+                fill.done = True
+                fill.ok = ok
+                fill.cond.notify_all()
+
+    def block_map(self, cache_path):
+        """Return the block map of a cached file, hashing it first if it was cached without one."""
+        map_path = cache_path + BLOCK_MAP_SUFFIX
+        with self.lock_for(map_path):
+            block_map = load_block_map(map_path, cache_path)
+            if block_map is None:
+                block_map = hash_blocks(cache_path)
+                save_block_map(map_path, cache_path, block_map)
+            return block_map
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    """Serves GET and HEAD requests for mirrored files, with single-range support."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        if self.path.startswith(f"/{MIRROR_BLOCK_MAP_PATH}/"):
+            self._serve_block_map()
+            return
+        self._serve(send_body=True)
+
+    def _serve_block_map(self):
+        """Serve the block map of a cached file, which clients repair corrupted downloads against (--repair)."""
+        url, cache_path = self.server.resolve(self.path[len(MIRROR_BLOCK_MAP_PATH) + 1:])
+        # Only files already cached: fetching a multi-GB image would outlast the client's timeout
+        if url is None or not os.path.exists(cache_path):
+            self.send_error(404, "Not cached")
+            return
+        body = json.dumps(self.server.block_map(cache_path)).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve(self, send_body):
+        url, cache_path = self.server.resolve(self.path)
+        if url is None:
+            self.send_error(404, "Not a mirrored upstream URL")
+            return
+        range_header = self.headers.get('Range')
+        fill = self.server.fill_for(url, cache_path)
+        if fill is not None:
+            # The headers need the size, which upstream announces with its first bytes
+            with fill.cond:
+                fill.cond.wait_for(lambda: fill.done or fill.started)
+                if fill.total is None and range_header and not fill.done:
+                    # A range of a file of unknown size can only be cut once it is complete
+                    fill.cond.wait_for(lambda: fill.done)
+                size = fill.total
+                if fill.done:
+                    fill = None
+        if fill is None:
+            if not os.path.exists(cache_path):
+                self.send_error(502, "Upstream fetch failed")
+                return
+            size = os.path.getsize(cache_path)
+        if size is None:
+            self._send_chunked(fill, cache_path, send_body)
+            return
+
+        start, end = 0, size - 1
+        status = 200
+        if range_header and size:
+            byte_range = parse_range(range_header, size)
+            if byte_range is False:
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{size}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if byte_range:
+                start, end = byte_range
+                status = 206
+
+        length = end - start + 1 if size else 0
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(length))
+        if status == 206:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body or not length:
+            return
+
+        offset = start
+        if fill is not None:
+            offset = self._send_filling(fill, cache_path, offset, end, self.wfile.write)
+            if offset is None:
+                # Upstream failed: cut the response short, the client resumes or falls back
+                self.close_connection = True
+                return
+        self._send_cached(cache_path, offset, end, self.wfile.write)
+
+    def _send_chunked(self, fill, cache_path, send_body):
+        """Stream a file whose size upstream did not announce, with chunked transfer encoding."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        if not send_body:
+            return
+
+        def write_chunk(block):
+            self.wfile.write(f"{len(block):x}\r\n".encode('ascii') + block + b"\r\n")
+
+        offset = self._send_filling(fill, cache_path, 0, None, write_chunk)
+        if offset is None:
+            # No closing chunk, so the client sees the body as incomplete
+            self.close_connection = True
+            return
+        self._send_cached(cache_path, offset, None, write_chunk)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_cached(self, cache_path, offset, end, write):
+        """Send bytes offset..end (or to the end of the file if end is None) of a cached file."""
+        if end is not None and offset > end:
+            return
+        with open(cache_path, 'rb') as f:
+            f.seek(offset)
+            while end is None or offset <= end:
+                block = f.read(CHUNK_SIZE if end is None else min(CHUNK_SIZE, end + 1 - offset))
+                if not block:
+                    break
+                write(block)
+                offset += len(block)
+
+    def _send_filling(self, fill, cache_path, offset, end, write):
+        """
+        Send bytes offset..end (or everything, if end is None) from the .part file of a running fetch as they arrive.
+
+        The .part file is only opened under fill.cond, and not once the fetch
+        is finishing, so it is never open when download_file renames it.
+
+        Returns:
+            int: Where to continue from the cached file once the fetch is done,
+                or None if the fetch failed
+        """
+        part_path = cache_path + '.part'
+        while end is None or offset <= end:
+            with fill.cond:
+                fill.cond.wait_for(lambda: fill.done or (not fill.finishing and fill.written > offset))
+                if fill.done:
+                    return offset if fill.ok else None
+                wanted = min(CHUNK_SIZE, fill.written - offset)
+                if end is not None:
+                    wanted = min(wanted, end + 1 - offset)
+                try:
+                    with open(part_path, 'rb') as f:
+                        f.seek(offset)
+                        block = f.read(wanted)
+                except OSError:
+                    block = b''
+                if not block:
+                    # A retry started the file over and has not caught up yet
+                    fill.cond.wait(1)
+                    continue
+            write(block)
+            offset += len(block)
+        return offset
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} - {format % args}")
+
+
+def serve_cache(host='0.0.0.0', port=DEFAULT_PORT, cache_dir=None):
+    """
+    Run the LAN cache server in the foreground (main.py --serve-cache).
+
+    Clients use it by setting the cache_mirror config key to
+    http://<this machine>:<port>. They fall back to upstream if it is unreachable.
+
+    Args:
+        host (str): Address to bind
+        port (int): Port to listen on
+        cache_dir (str): Directory to store mirrored files, defaults to get_default_cache_dir()
+
+    Returns:
+        bool: True when the server stopped, False if it could not start
+    """
+    cache_dir = cache_dir or get_default_cache_dir()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        server = CacheServer((host, port), cache_dir)
+    except Exception as e:
+        print(f"{BRIGHT_RED}Could not start cache server on {host}:{port}: {e}{RESET}")
+        return False
+
+    print(f"{BRIGHT_GREEN}Serving cache '{cache_dir}' on http://{host}:{server.server_address[1]} (Ctrl+C to stop).{RESET}")
+    print(f"{BRIGHT_CYAN}Mirroring: {', '.join(sorted(server.upstream_hosts))}{RESET}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(f"{BRIGHT_CYAN}Cache server stopped.{RESET}")
+    return True
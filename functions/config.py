@@ -0,0 +1,149 @@
+import os
+import json
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_RED = "\033[91m"
+
+CONFIG_FILE = os.getenv("SW_DEVTOOLS_CONFIG")
+
+# Parsed config files: path -> ((size, mtime_ns), config), reused while the file is unchanged
+_config_memo = {}
+
+
+def get_default_config_path():
+    """
+    Return the default config location under Program Files.
+
+    Unlike SW_DEVTOOLS_CONFIG, it is only writable with elevation, so it is
+    the only config the elevated helper trusts.
+
+    Returns:
+        str: %ProgramFiles%\\SyncWide Devtools\\config.json
+    """
+    program_files = os.getenv('ProgramFiles') or r"C:\Program Files"
+    return os.path.join(program_files, 'SyncWide Devtools', 'config.json')
+
+
+def find_config_path():
+    """
+    Locate the SyncWide Devtools configuration file.
+
+    Prefers the SW_DEVTOOLS_CONFIG environment variable and falls back to the
+    default config under Program Files.
+
+    Returns:
+        str: Path to the config file, or None if none could be found
+    """
+    if CONFIG_FILE:
+        return CONFIG_FILE
+    default_cfg = get_default_config_path()
+    if os.path.exists(default_cfg):
+        return default_cfg
+    return None
+
+
+def load_config(config_path=None):
+    """
+    Load the configuration file.
+
+    The parsed file is kept in memory and reused while its size and mtime are
+    unchanged, so a long-running process only re-reads it after a write.
+
+    Args:
+        config_path (str): Config file to read, defaults to find_config_path()
+
+    Returns:
+        dict: The parsed configuration, or an empty dict if it could not be read
+    """
+    config_path = config_path or find_config_path()
+    if not config_path:
+        return {}
+    try:
+        stat = os.stat(config_path)
+    except OSError:
+        return {}
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    memo = _config_memo.get(config_path)
+    if memo and memo[0] == stamp:
+        return dict(memo[1])
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            cfg = json.load(f) or {}
+        if not isinstance(cfg, dict):
+            return {}
+        _config_memo[config_path] = (stamp, cfg)
+        return dict(cfg)
+    except Exception as e:
+        print(f"{BRIGHT_YELLOW}Could not load config '{config_path}': {e}{RESET}")
+        return {}
+
+
+def save_config(cfg, config_path=None):
+    """
+    Write the configuration file.
+
+    Args:
+        cfg (dict): The configuration to write
+        config_path (str): Config file to write, defaults to find_config_path()
+            or the default location under Program Files
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    config_path = config_path or find_config_path()
+    if not config_path:
+        config_path = get_default_config_path()
+    try:
+        os.makedirs(os.path.dirname(config_path), exist_ok=True)
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(cfg, f, indent=4)
+        return True
+    except Exception as e:
+        print(f"{BRIGHT_RED}Failed to write config '{config_path}': {e}{RESET}")
+        return False
+
+
+def get_install_root(cfg):
+    """
+    Return the SyncWide Devtools root directory.
+
+    Args:
+        cfg (dict): The loaded configuration
+
+    Returns:
+        str: The configured install_path, or the default Program Files location
+    """
+    install_path = cfg.get('install_path') or cfg.get('installPath') if isinstance(cfg, dict) else None
+    if install_path:
+        return install_path
+    program_files = os.getenv('ProgramFiles') or r"C:\Program Files"
+    return os.path.join(program_files, 'SyncWide Devtools')
+
+
+def get_user_cache_dir():
+    """
+    Return the per-user cache directory, which is writable without elevation.
+
+    Returns:
+        str: %LOCALAPPDATA%\\SyncWide Devtools\\cache, or ~/.cache/sw-devtools elsewhere
+    """
+    local_app_data = os.getenv('LOCALAPPDATA')
+    if local_app_data:
+        return os.path.join(local_app_data, 'SyncWide Devtools', 'cache')
+    return os.path.join(os.path.expanduser('~'), '.cache', 'sw-devtools')
+
+
+def get_artifact_dir(cfg):
+    """
+    Return the directory downloaded runtime artifacts are cached in.
+
+    Args:
+        cfg (dict): The loaded configuration
+
+    Returns:
+        str: The configured artifact_cache, or 'cache\\artifacts' inside the install root
+    """
+    return cfg.get('artifact_cache') or os.path.join(get_install_root(cfg), 'cache', 'artifacts')
@@ -0,0 +1,176 @@
+import io
+import os
+import sys
+import secrets
+import contextlib
+from . import config
+from .config import get_user_cache_dir
+from .ipc import IPCError, LocalClient, LocalServer, read_session, write_session
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+# The daemon exits after this many seconds without a request
+IDLE_TIMEOUT = 3600
+SESSION_FILE_NAME = 'daemon.json'
+
+
+def _run_status(value, as_json=False, use_cache=True):
+    from .status import parse_runtime_names, show_status, status_many
+    try:
+        names = parse_runtime_names(value)
+    except ValueError as e:
+        print(f"{BRIGHT_RED}{e}{RESET}")
+        return 1
+    if len(names) == 1 and not as_json:
+        show_status(names[0], use_cache=use_cache)
+    else:
+        status_many(names, as_json=as_json, use_cache=use_cache)
+    return 0
+
+
+def _run_iso_list():
+    from .iso import list_available_isos
+    list_available_isos()
+    return 0
+
+
+# Read-only commands the daemon answers: name -> handler returning an exit code
+COMMANDS = {
+    'status': _run_status,
+    'iso_list': _run_iso_list,
+}
+
+
+def get_session_path():
+    """Return the per-user file holding the daemon's port and token."""
+    return os.path.join(get_user_cache_dir(), SESSION_FILE_NAME)
+
+
+def _connect():
+    """Return a client for the running daemon, or None if none answers."""
+    session = read_session(get_session_path())
+    if not session or not session.get('port') or not session.get('token'):
+        return None
+    client = LocalClient(session['port'], session['token'])
+    return client if client.ping() else None
+
+
+def run(name, use_daemon=True, **args):
+    """
+    Run a read-only command in the daemon if one is running, otherwise in-process.
+
+    Args:
+        name (str): Command name, a key of COMMANDS
+        use_daemon (bool): Set to False to always run in-process
+        **args: Command arguments (JSON-serializable)
+
+    Returns:
+        int: The command's exit code
+    """
+    client = _connect() if use_daemon else None
+    if client is not None:
+        try:
+            return client.call('run', command=name, args=args, config=config.CONFIG_FILE)
+        except OSError:
+            pass  # The daemon went away between ping and call; run it here instead
+        except IPCError as e:
+            print(f"{BRIGHT_RED}Daemon failed to run '{name}': {e}{RESET}")
+            return 1
+    return COMMANDS[name](**args)
+
+
+def _handle(message):
+    """Answer one daemon request, capturing what the command prints."""
+    from .path import revalidate_path_snapshot
+    if message.get('op') == 'ping':
+        return {'ok': True, 'result': True}
+    if message.get('op') != 'run':
+        return {'ok': False, 'error': f"Unknown operation '{message.get('op')}'"}
+    args = message.get('args') or {}
+    handler = COMMANDS.get(args.get('command'))
+    if handler is None:
+        return {'ok': False, 'error': f"Unknown command '{args.get('command')}'"}
+
+    revalidate_path_snapshot()
+    # Honour the client's SW_DEVTOOLS_CONFIG for the duration of the request
+    previous_config = config.CONFIG_FILE
+    config.CONFIG_FILE = args.get('config') or previous_config
+    output, errors = io.StringIO(), io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+            code = handler(**(args.get('args') or {}))
+        return {'ok': True, 'result': code, 'output': output.getvalue(), 'errors': errors.getvalue()}
+    except Exception as e:
+        return {'ok': False, 'error': str(e), 'output': output.getvalue(), 'errors': errors.getvalue()}
+    finally:
+        config.CONFIG_FILE = previous_config
+
+
+def serve_daemon(idle_timeout=IDLE_TIMEOUT):
+    """
+    Run the resident daemon in the foreground (main.py --serve).
+
+    The daemon keeps the parsed config, the ISO catalog and the PATH snapshot
+    in memory. The config and catalog are re-read when their mtime changes and
+    the PATH snapshot when the Environment registry keys are written, so
+    repeated --status and --iso list calls skip interpreter startup and
+    parsing entirely.
+
+    Args:
+        idle_timeout (float): Seconds without a request before the daemon exits
+
+    Returns:
+        bool: True when the daemon stopped cleanly or one is already running
+    """
+    session_path = get_session_path()
+    client = _connect()
+    if client is not None:
+        print(f"{BRIGHT_YELLOW}A daemon is already running on 127.0.0.1:{client.port}.{RESET}")
+        return True
+
+    token = secrets.token_hex(32)
+    server = LocalServer(token, _handle, idle_timeout=idle_timeout)
+    try:
+        write_session({'token': token, 'port': server.port, 'pid': os.getpid()}, session_path)
+    except Exception as e:
+        print(f"{BRIGHT_RED}Could not write daemon session file '{session_path}': {e}{RESET}")
+        return False
+
+    # Import the command modules and fill the caches before the first request
+    from . import iso, path, status
+    config.load_config()
+    iso.read_isos_config()
+    path.get_path_snapshot()
+    status.load_version_cache()
+
+    print(f"{BRIGHT_GREEN}sw-devtools daemon listening on 127.0.0.1:{server.port} (Ctrl+C to stop).{RESET}")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        session = read_session(session_path)
+        if session and session.get('pid') == os.getpid():
+            try:
+                os.remove(session_path)
+            except OSError:
+                pass
+    print(f"{BRIGHT_CYAN}sw-devtools daemon stopped.{RESET}")
+    return True
+
+
+def stop_daemon():
+    """Ask the running daemon to exit."""
+    client = _connect()
+    if client is None:
+        print(f"{BRIGHT_YELLOW}No daemon is running.{RESET}")
+        return True
+    client.call('shutdown')
+    print(f"{BRIGHT_GREEN}Stopped the daemon.{RESET}")
+    return True
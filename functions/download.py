@@ -0,0 +1,469 @@
+import os
+import sys
+import json
+import time
+import socket
+import hashlib
+import http.client
+import urllib.error
+import urllib.parse
+import urllib.request
+from . import metrics
+from .trace import enabled as tracing, span
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+CHUNK_SIZE = 1024 * 1024
+BAR_LENGTH = 40
+# Retries after a dropped, stalled or short download, with exponential backoff starting at BACKOFF seconds
+RETRIES = 4
+BACKOFF = 1.0
+# Seconds without any data before a connection counts as stalled
+TIMEOUT = 30
+# Granularity of block maps: a corrupted download is repaired in units of this size
+BLOCK_SIZE = 4 * 1024 * 1024
+# Most consecutive corrupted blocks repair_file fetches with one Range request
+REPAIR_RUN_BLOCKS = 16
+# Cache server path prefix that serves block maps instead of files
+MIRROR_BLOCK_MAP_PATH = '_blockmap'
+
+
+class BlockHasher:
+    """
+    Hash a file's bytes in order as they are written.
+
+    Produces the whole-file SHA-256 and one SHA-256 per block, so a
+    download gets its checksum and its block map without reading the file
+    back.
+
+    Args:
+        block_size (int): Bytes per block
+    """
+
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self.reset()
+
+    def reset(self):
+        """Start over, e.g. when a server ignored a Range request and the download restarts."""
+        self.size = 0
+        self.blocks = []
+        self._file = hashlib.sha256()
+        self._block = hashlib.sha256()
+        self._filled = 0
+
+    def update(self, data):
+        self._file.update(data)
+        self.size += len(data)
+        view = memoryview(data)
+        while view:
+            take = min(len(view), self.block_size - self._filled)
+            self._block.update(view[:take])
+            self._filled += take
+            view = view[take:]
+            if self._filled == self.block_size:
+                self.blocks.append(self._block.hexdigest())
+                self._block = hashlib.sha256()
+                self._filled = 0
+
+    def block_map(self):
+        """
+        Return the block map of the bytes seen so far.
+
+        Returns:
+            dict: {'block_size', 'size', 'sha256', 'blocks': [hex digest per block]}
+        """
+        blocks = self.blocks + ([self._block.hexdigest()] if self._filled else [])
+        return {'block_size': self.block_size, 'size': self.size, 'sha256': self._file.hexdigest(), 'blocks': blocks}
+
+
+def mirror_url(url, mirror):
+    """
+    Map an upstream URL to its location on a LAN cache server.
+
+    https://www.python.org/ftp/python/x.exe becomes <mirror>/www.python.org/ftp/python/x.exe.
+
+    Args:
+        url (str): The upstream URL
+        mirror (str): Base URL of the cache server (the cache_mirror config key)
+
+    Returns:
+        str: The URL to request from the cache server
+    """
+    parsed = urllib.parse.urlsplit(url)
+    mapped = f"{mirror.rstrip('/')}/{parsed.netloc}{parsed.path}"
+    return f"{mapped}?{parsed.query}" if parsed.query else mapped
+
+
+def mirror_block_map_url(url, mirror):
+    """Map an upstream URL to the cache server's block map of its copy (see cache_server)."""
+    return mirror_url(url, f"{mirror.rstrip('/')}/{MIRROR_BLOCK_MAP_PATH}")
+
+
+def download_file(url, output_path, show_progress=True, mirror=None, stats=None, hasher=None, progress=None):
+    """
+    Stream a URL to a file with a progress bar.
+
+    The data is written to '<output_path>.part' and renamed once complete, so
+    an interrupted download never leaves a truncated file at output_path.
+    Dropped connections, stalls (no data for TIMEOUT seconds) and short bodies
+    are retried up to RETRIES times with exponential backoff. Retries resume
+    from the bytes already received with a Range request, and restart from
+    the beginning if the server ignores Range.
+    With a mirror, the file is requested from the cache server first and from
+    upstream only if the cache server fails.
+
+    Args:
+        url (str): The URL to download
+        output_path (str): Destination file
+        show_progress (bool): Draw a progress bar on stdout
+        mirror (str): Base URL of a cache server (--serve-cache), or None
+        stats (dict): If given, filled with 'retries', 'resumed_bytes',
+            'restarts' and 'source' ('mirror' or 'upstream')
+        hasher (BlockHasher): If given, fed the file's bytes as they are written
+        progress (callable): If given, called with (bytes in the .part file, expected size or 0)
+            after each chunk; the count drops back to 0 if a retry has to start over.
+            Once the body is complete it is called with the final size as both
+            values, before the .part file is renamed
+
+    Returns:
+        int: Number of bytes downloaded
+
+    Raises:
+        urllib.error.URLError: If the download fails
+        OSError: If the file cannot be written
+    """
+    if stats is None:
+        stats = {}
+    stats.update(retries=0, resumed_bytes=0, restarts=0, source='upstream')
+    host = urllib.parse.urlsplit(url).netloc
+    with span('download', url=url) as attrs:
+        if mirror:
+            mirror_host = urllib.parse.urlsplit(mirror).netloc
+            started = time.perf_counter()
+            try:
+                # A mirror that is down should not cost the full backoff
+                size = _stream(mirror_url(url, mirror), output_path, show_progress, stats, retries=1, hasher=hasher,
+                               progress=progress)
+                stats['source'] = 'mirror'
+                attrs.update(stats, bytes=size)
+                _record_metrics(mirror_host, host, size, started, stats)
+                return size
+            except OSError as e:
+                metrics.inc('mirror_fallbacks_total', mirror=mirror_host)
+                print(f"{BRIGHT_YELLOW}Cache mirror {mirror} failed ({e}), downloading from upstream.{RESET}")
+        started = time.perf_counter()
+        try:
+            size = _stream(url, output_path, show_progress, stats, hasher=hasher, progress=progress)
+        except Exception:
+            metrics.inc('downloads_total', source='upstream', host=host, result='failed')
+            raise
+        attrs.update(stats, bytes=size)
+        _record_metrics('upstream', host, size, started, stats)
+        return size
+
+
+def _record_metrics(source, host, size, started, stats):
+    """Count a completed download; source is the mirror's host or 'upstream'."""
+    metrics.inc('downloads_total', source=source, host=host, result='ok')
+    metrics.inc('download_bytes_total', size, source=source, host=host)
+    metrics.observe('download_seconds', time.perf_counter() - started, source=source, host=host)
+    for key in ('retries', 'resumed_bytes', 'restarts'):
+        if stats[key]:
+            metrics.inc(f"download_{key}_total", stats[key], source=source, host=host)
+
+
+def _stream(url, output_path, show_progress, stats, retries=None, hasher=None, progress=None):
+    """Download url to output_path through a .part file, retrying and resuming on failure."""
+    retries = RETRIES if retries is None else retries
+    if hasher is not None:
+        hasher.reset()
+    part_path = output_path + '.part'
+    downloaded = 0
+    attempt = 0
+    if tracing():
+        _trace_dns(url)
+    while True:
+        request = urllib.request.Request(url, headers={'Range': f"bytes={downloaded}-"} if downloaded else {})
+        try:
+            # Connect, send the request and wait for the response headers
+            with span('download.connect', attempt=attempt) as attrs:
+                response = urllib.request.urlopen(request, timeout=TIMEOUT)
+                attrs['status'] = response.status
+            with response, span('download.body', attempt=attempt, offset=downloaded) as attrs:
+                if downloaded and response.status != 206:
+                    # The server ignored the Range header, so start over
+                    stats['restarts'] += 1
+                    downloaded = attrs['offset'] = 0
+                    if hasher is not None:
+                        hasher.reset()
+                elif downloaded:
+                    stats['resumed_bytes'] += downloaded
+                total = _expected_total(response, downloaded)
+
+                try:
+                    with open(part_path, 'ab' if downloaded else 'wb') as out_file:
+                        while True:
+                            chunk = response.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            out_file.write(chunk)
+                            if hasher is not None:
+                                hasher.update(chunk)
+                            downloaded += len(chunk)
+                            if progress is not None:
+                                progress(downloaded, total)
+                            if show_progress:
+                                _print_progress(downloaded, total)
+                finally:
+                    attrs['bytes'] = downloaded - attrs['offset']
+                if total and downloaded < total:
+                    raise http.client.IncompleteRead(b'', total - downloaded)
+            break
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and downloaded:
+                # Nothing past what we already have: the body was complete but
+                # the server announced more than it sent
+                break
+            # Client errors other than timeouts and rate limits will not go away on retry
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                raise
+            error = e
+        except (OSError, http.client.HTTPException) as e:
+            error = e
+
+        attempt += 1
+        if attempt > retries:
+            if isinstance(error, OSError):
+                raise error
+            raise urllib.error.URLError(error)
+        stats['retries'] += 1
+        delay = BACKOFF * 2 ** (attempt - 1)
+        if show_progress:
+            sys.stdout.write("\n")
+        print(f"{BRIGHT_YELLOW}Download interrupted ({error!r}), retrying in {delay:.1f}s ({attempt}/{retries})...{RESET}")
+        time.sleep(delay)
+
+    if show_progress:
+        sys.stdout.write("\n")
+    if progress is not None:
+        progress(downloaded, downloaded)
+    os.replace(part_path, output_path)
+    return downloaded
+
+
+def read_range(url, start, length, retries=None):
+    """
+    Fetch a byte range of a URL into memory, retrying like a download.
+
+    Args:
+        url (str): The URL
+        start (int): Offset of the first byte
+        length (int): Number of bytes
+        retries (int): Retries after a failed request, defaults to RETRIES
+
+    Returns:
+        bytes: Exactly length bytes
+
+    Raises:
+        urllib.error.URLError: If the server does not honour the range or the request keeps failing
+    """
+    attempt = 0
+    while True:
+        request = urllib.request.Request(url, headers={'Range': f"bytes={start}-{start + length - 1}"})
+        try:
+            with span('download.range', offset=start, length=length), urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+                status = response.status
+                # A full body would mean downloading the whole file for one block
+                data = response.read(length) if status == 206 else b''
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                raise
+            error = e
+        except (OSError, http.client.HTTPException) as e:
+            error = e
+        else:
+            if status != 206:
+                raise urllib.error.URLError(f"{urllib.parse.urlsplit(url).netloc} does not support Range requests")
+            if len(data) == length:
+                return data
+            error = http.client.IncompleteRead(data, length - len(data))
+        attempt += 1
+        if attempt > (RETRIES if retries is None else retries):
+            raise error if isinstance(error, urllib.error.URLError) else urllib.error.URLError(error)
+        time.sleep(BACKOFF * 2 ** (attempt - 1))
+
+
+def repair_file(path, url, reference, map_path, mirror=None):
+    """
+    Bring a file in line with a reference block map by re-fetching only the blocks that differ.
+
+    The file's own block map is loaded from map_path, or rebuilt by hashing
+    the file if it changed since. Runs of mismatched blocks are fetched with
+    Range requests, from the cache mirror first and then upstream, and every
+    block is checked against its reference hash before it is written.
+
+    Args:
+        path (str): The damaged file
+        url (str): Its upstream URL
+        reference (dict): The block map of the intact file
+        map_path (str): Where the file's block map is kept; updated afterwards
+        mirror (str): Base URL of a cache server, or None
+
+    Returns:
+        int: Bytes fetched (0 if the file was intact), or None if some blocks could not be repaired
+    """
+    block_size, size, blocks = reference['block_size'], reference['size'], reference['blocks']
+    local = load_block_map(map_path, path)
+    if local is None or local['block_size'] != block_size:
+        print(f"{BRIGHT_CYAN}Hashing '{path}' in {block_size // (1024 * 1024)} MiB blocks...{RESET}")
+        local = hash_blocks(path, block_size)
+    bad = [index for index, digest in enumerate(blocks) if index >= len(local['blocks']) or local['blocks'][index] != digest]
+    if not bad and local['size'] == size:
+        print(f"{BRIGHT_GREEN}All {len(blocks)} blocks of '{path}' match; nothing to repair.{RESET}")
+        return 0
+
+    runs = []
+    for index in bad:
+        if runs and runs[-1][-1] == index - 1 and len(runs[-1]) < REPAIR_RUN_BLOCKS:
+            runs[-1].append(index)
+        else:
+            runs.append([index])
+    to_fetch = sum(min(size, (run[-1] + 1) * block_size) - run[0] * block_size for run in runs)
+    print(f"{BRIGHT_CYAN}{len(bad)} of {len(blocks)} blocks differ, fetching {to_fetch / (1024 * 1024):.1f} MB...{RESET}")
+    sources = ([mirror_url(url, mirror)] if mirror else []) + [url]
+    fetched = 0
+    with span('download.repair', path=os.path.basename(path), blocks=len(bad)) as attrs, open(path, 'r+b') as f:
+        # Drop bytes past the end, or make room for missing blocks
+        f.truncate(size)
+        for run in runs:
+            start = run[0] * block_size
+            length = min(size, (run[-1] + 1) * block_size) - start
+            data = _fetch_blocks(sources, start, length, block_size, [blocks[index] for index in run])
+            if data is None:
+                print(f"{BRIGHT_RED}No source returned matching data for blocks {run[0]}-{run[-1]} of '{path}'.{RESET}")
+                return None
+            f.seek(start)
+            f.write(data)
+            fetched += length
+        attrs['bytes'] = fetched
+    save_block_map(map_path, path, reference)
+    print(f"{BRIGHT_GREEN}✓ Repaired {len(bad)} block(s) of '{path}': fetched {fetched / (1024 * 1024):.1f} MB "
+          f"instead of {size / (1024 * 1024):.1f} MB.{RESET}")
+    return fetched
+
+
+def _fetch_blocks(sources, start, length, block_size, digests):
+    """Fetch a run of blocks from the first source whose bytes match the reference hashes."""
+    for source in sources:
+        try:
+            data = read_range(source, start, length)
+        except OSError as e:
+            print(f"{BRIGHT_YELLOW}Could not fetch bytes {start}-{start + length - 1} from {source}: {e}{RESET}")
+            continue
+        if all(hashlib.sha256(data[i * block_size:(i + 1) * block_size]).hexdigest() == digest
+               for i, digest in enumerate(digests)):
+            return data
+        print(f"{BRIGHT_YELLOW}Blocks at offset {start} from {source} do not match the block map, trying the next source.{RESET}")
+    return None
+
+
+def hash_blocks(path, block_size=BLOCK_SIZE):
+    """
+    Build the block map of an existing file in one read pass.
+
+    Returns:
+        dict: See BlockHasher.block_map
+    """
+    hasher = BlockHasher(block_size)
+    with span('download.hash_blocks', path=os.path.basename(path)) as attrs, open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            hasher.update(block)
+        attrs['bytes'] = hasher.size
+    return hasher.block_map()
+
+
+def load_block_map(map_path, path):
+    """
+    Load a saved block map if it still describes the file.
+
+    Returns:
+        dict: The block map, or None if there is none or the file changed since it was saved
+    """
+    try:
+        with open(map_path, 'r', encoding='utf-8') as f:
+            block_map = json.load(f)
+        stat = os.stat(path)
+        if block_map.get('size') == stat.st_size and block_map.get('mtime_ns') == stat.st_mtime_ns:
+            return block_map
+    except (OSError, ValueError, AttributeError):
+        pass
+    return None
+
+
+def save_block_map(map_path, path, block_map):
+    """Save a file's block map atomically, stamped with the file's modification time."""
+    block_map = dict(block_map, mtime_ns=os.stat(path).st_mtime_ns)
+    os.makedirs(os.path.dirname(map_path) or '.', exist_ok=True)
+    tmp_path = f"{map_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(block_map, f)
+    os.replace(tmp_path, map_path)
+
+
+def _trace_dns(url):
+    """Resolve the URL's host in its own span; the lookup urlopen does next is then served from the resolver cache."""
+    parsed = urllib.parse.urlsplit(url)
+    with span('download.dns', host=parsed.hostname) as attrs:
+        try:
+            attrs['addresses'] = len(socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80), type=socket.SOCK_STREAM))
+        except OSError as e:
+            attrs['error'] = str(e)
+
+
+def _expected_total(response, downloaded):
+    """Return the full size of the file from Content-Range or Content-Length, or 0 if unknown."""
+    content_range = response.getheader('Content-Range') or ''
+    if response.status == 206 and '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        if total.isdigit():
+            return int(total)
+    length = response.getheader('Content-Length')
+    return downloaded + int(length) if length and length.isdigit() else 0
+
+
+def _print_progress(downloaded, total):
+    """Redraw the download progress bar."""
+    mb_downloaded = downloaded / (1024 * 1024)
+    if total:
+        percent = downloaded / total
+        filled = int(BAR_LENGTH * percent)
+        bar = '=' * filled + ' ' * (BAR_LENGTH - filled)
+        mb_total = total / (1024 * 1024)
+        sys.stdout.write(f"\r{BRIGHT_CYAN}[{bar}] {percent*100:6.2f}% ({mb_downloaded:.1f}/{mb_total:.1f} MB){RESET}")
+    else:
+        sys.stdout.write(f"\r{BRIGHT_CYAN}Downloaded: {mb_downloaded:.1f} MB{RESET}")
+    sys.stdout.flush()
+
+
+def sha256_file(path):
+    """
+    Compute the SHA-256 of a file.
+
+    Args:
+        path (str): The file to hash
+
+    Returns:
+        str: Lowercase hex digest
+    """
+    digest = hashlib.sha256()
+    with span('sha256', path=os.path.basename(path)) as attrs, open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+        attrs['bytes'] = f.tell()
+    return digest.hexdigest()
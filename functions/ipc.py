@@ -0,0 +1,302 @@
+import os
+import sys
+import hmac
+import json
+import time
+import socket
+import hashlib
+import secrets
+import threading
+
+# Requests older than this are rejected even with a valid signature
+MAX_MESSAGE_AGE = 300
+
+
+class IPCError(Exception):
+    """Raised when a local IPC message is malformed, unauthenticated or replayed."""
+
+
+def _signature(payload, token):
+    """Return the HMAC-SHA256 of a payload's canonical JSON form."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hmac.new(token.encode('utf-8'), canonical.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def encode_message(payload, token=None):
+    """
+    Encode a message as one JSON line.
+
+    With a token, a timestamp and a random nonce are added and the message is
+    signed with HMAC-SHA256, so only holders of the token can issue requests.
+
+    Args:
+        payload (dict): JSON-serializable message
+        token (str): Shared secret, or None for unauthenticated messages
+
+    Returns:
+        bytes: The encoded line including the trailing newline
+    """
+    message = dict(payload)
+    if token:
+        message['ts'] = time.time()
+        message['nonce'] = secrets.token_hex(16)
+        message['mac'] = _signature(message, token)
+    return (json.dumps(message) + "\n").encode('utf-8')
+
+
+def decode_message(line, token=None, seen_nonces=None):
+    """
+    Decode and authenticate one JSON line.
+
+    Args:
+        line (bytes): The received line
+        token (str): Shared secret the message must be signed with, or None
+        seen_nonces (set): Nonces already accepted, used to reject replays
+
+    Returns:
+        dict: The message without its authentication fields
+
+    Raises:
+        IPCError: If the message is malformed, unsigned, stale or replayed
+    """
+    try:
+        message = json.loads(line.decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise IPCError(f"Malformed message: {e}")
+    if not isinstance(message, dict):
+        raise IPCError("Malformed message: expected an object")
+
+    if token:
+        mac = message.pop('mac', None)
+        if not isinstance(mac, str) or not hmac.compare_digest(mac, _signature(message, token)):
+            raise IPCError("Authentication failed")
+        if abs(time.time() - float(message.get('ts', 0))) > MAX_MESSAGE_AGE:
+            raise IPCError("Message expired")
+        nonce = message.get('nonce')
+        if seen_nonces is not None:
+            if nonce in seen_nonces:
+                raise IPCError("Replayed message")
+            seen_nonces.add(nonce)
+        message.pop('ts', None)
+        message.pop('nonce', None)
+    return message
+
+
+def request(host, port, payload, token=None, timeout=None):
+    """
+    Send one request over a local TCP connection and return the reply.
+
+    Args:
+        host (str): Host to connect to (normally 127.0.0.1)
+        port (int): Port of the server
+        payload (dict): The request
+        token (str): Shared secret to sign the request with
+        timeout (float): Socket timeout in seconds, None to wait indefinitely
+
+    With a token the reply must be signed with it too and carry the id of
+    this request, so neither a process squatting on the port nor a replayed
+    reply can answer in the server's name.
+
+    Returns:
+        dict: The decoded reply
+
+    Raises:
+        OSError: If the server cannot be reached
+        IPCError: If the reply is malformed, unsigned or does not answer this request
+    """
+    request_id = secrets.token_hex(8)
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall(encode_message(dict(payload, id=request_id), token))
+        with sock.makefile('rb') as reader:
+            line = reader.readline()
+    if not line:
+        raise IPCError("Connection closed without a reply")
+    reply = decode_message(line, token)
+    if token and reply.pop('id', None) != request_id:
+        raise IPCError(reply.get('error') or "Reply does not answer the request")
+    return reply
+
+
+def serve_connection(reader, writer, handler, token=None, seen_nonces=None):
+    """
+    Answer the requests of one connection.
+
+    Works on any pair of binary file objects, so the protocol can be exercised
+    with a socketpair or in-memory streams instead of a real server. Replies
+    are signed with the token and echo the request's id.
+
+    Args:
+        reader: Binary file object requests are read from
+        writer: Binary file object replies are written to
+        handler (callable): Takes a decoded request and returns a reply dict
+        token (str): Shared secret requests must be signed with
+        seen_nonces (set): Nonces already accepted, shared across connections
+    """
+    for line in iter(reader.readline, b''):
+        request_id = None
+        try:
+            message = decode_message(line, token, seen_nonces)
+            request_id = message.pop('id', None)
+            reply = handler(message)
+        except IPCError as e:
+            reply = {'ok': False, 'error': str(e)}
+        if request_id is not None:
+            reply = dict(reply, id=request_id)
+        writer.write(encode_message(reply, token))
+        writer.flush()
+
+
+def read_session(session_path):
+    """
+    Read a session file describing a local server (token, port, pid).
+
+    Returns:
+        dict: The session, or None if it does not exist or is invalid
+    """
+    try:
+        with open(session_path, 'r', encoding='utf-8') as f:
+            session = json.load(f)
+        return session if isinstance(session, dict) else None
+    except Exception:
+        return None
+
+
+def write_session(session, session_path):
+    """Write a session file atomically."""
+    os.makedirs(os.path.dirname(session_path), exist_ok=True)
+    tmp_path = f"{session_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(session, f)
+    os.replace(tmp_path, session_path)
+
+
+class LocalClient:
+    """
+    Client for a LocalServer.
+
+    Args:
+        port (int): Port the server listens on
+        token (str): Shared secret of the session
+        host (str): Server address
+        on_reply (callable): Called with every reply of call(), e.g. to collect extra fields
+    """
+
+    def __init__(self, port, token, host='127.0.0.1', on_reply=None):
+        self.port = port
+        self.token = token
+        self.host = host
+        self.on_reply = on_reply
+
+    def call(self, op, **args):
+        """
+        Run an operation on the server and echo its output (and what it wrote to stderr).
+
+        Returns:
+            The operation's result
+
+        Raises:
+            IPCError: If the server rejected the request or the operation failed
+            OSError: If the server cannot be reached
+        """
+        reply = request(self.host, self.port, {'op': op, 'args': args}, self.token)
+        if self.on_reply is not None:
+            self.on_reply(reply)
+        if reply.get('output'):
+            sys.stdout.write(reply['output'])
+            sys.stdout.flush()
+        if reply.get('errors'):
+            sys.stderr.write(reply['errors'])
+            sys.stderr.flush()
+        if not reply.get('ok'):
+            raise IPCError(reply.get('error', 'Unknown server error'))
+        return reply.get('result')
+
+    def ping(self):
+        try:
+            return bool(request(self.host, self.port, {'op': 'ping'}, self.token, timeout=2).get('ok'))
+        except (OSError, IPCError):
+            return False
+
+
+class LocalServer:
+    """
+    Loopback TCP server answering signed requests, each connection on its own thread.
+
+    Requests are passed to the handler one at a time. {'op': 'ping'} is
+    answered without waiting for that, so a long operation does not make
+    the server look dead, and {'op': 'shutdown'} stops the server after replying.
+
+    Args:
+        token (str): Shared secret every request must be signed with
+        handler (callable): Takes a decoded request and returns a reply dict
+        host (str): Address to bind, loopback only by default
+        port (int): Port to bind, 0 picks a free one
+        idle_timeout (float): Seconds without a request before serve_forever returns
+    """
+
+    def __init__(self, token, handler, host='127.0.0.1', port=0, idle_timeout=None):
+        self.token = token
+        self.handler = handler
+        self.idle_timeout = idle_timeout
+        self.seen_nonces = set()
+        self.running = True
+        self.active = 0
+        self.last_request = time.monotonic()
+        self._lock = threading.Lock()
+        self._handler_lock = threading.Lock()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind((host, port))
+        self.sock.listen(8)
+        self.port = self.sock.getsockname()[1]
+
+    def handle(self, message):
+        op = message.get('op')
+        if op == 'ping':
+            return {'ok': True, 'result': True, 'output': ''}
+        if op == 'shutdown':
+            self.stop()
+            return {'ok': True, 'result': True, 'output': ''}
+        with self._lock:
+            self.active += 1
+        try:
+            with self._handler_lock:
+                return self.handler(message)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.last_request = time.monotonic()
+
+    def stop(self):
+        """Make serve_forever return; requests already running finish first."""
+        self.running = False
+
+    def _serve(self, conn):
+        with conn:
+            conn.settimeout(self.idle_timeout)
+            try:
+                with conn.makefile('rb') as reader, conn.makefile('wb') as writer:
+                    serve_connection(reader, writer, self.handle, self.token, self.seen_nonces)
+            except OSError:
+                pass
+
+    def serve_forever(self):
+        # Wake up regularly to notice stop() and the idle timeout
+        self.sock.settimeout(min(self.idle_timeout, 1.0) if self.idle_timeout else 1.0)
+        try:
+            while self.running:
+                try:
+                    conn, _ = self.sock.accept()
+                except socket.timeout:
+                    with self._lock:
+                        idle = not self.active and time.monotonic() - self.last_request > (self.idle_timeout or float('inf'))
+                    if idle:
+                        break
+                    continue
+                with self._lock:
+                    self.last_request = time.monotonic()
+                threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+            # Let running operations finish before the process exits
+            while self.active:
+                time.sleep(0.1)
+        finally:
+            self.sock.close()
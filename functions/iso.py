@@ -1,13 +1,14 @@
 import os
 import sys
-import subprocess
+import urllib.error
 import urllib.request
 import json
-import zipfile
-import ctypes
-import winreg
-import shutil
-from .admin import is_admin, request_admin_privileges
+import hashlib
+from .config import load_config, get_user_cache_dir
+from .download import BlockHasher, download_file, mirror_block_map_url, repair_file, save_block_map, sha256_file, TIMEOUT
+from .metalink import download_metalink, fetch_metalink
+from . import metrics
+from .trace import span
 
 # ANSI escape codes for CLI colors
 RESET = "\033[0m"
@@ -57,12 +58,25 @@ BG_BRIGHT_WHITE = "\033[107m"
 
 CONFIG_FILE = os.getenv("SW_DEVTOOLS_CONFIG")
 
+# Optional keys next to an ISO's URL in isos.json: '<iso_type>_sha256' is the image's
+# checksum, '<iso_type>_blockmap' the URL of its block map (see download.BlockHasher),
+# '<iso_type>_metalink' the URL of a metalink listing its mirrors (see metalink.py)
+META_SUFFIXES = ('_sha256', '_blockmap', '_metalink')
+BLOCK_MAP_DIR = 'blockmaps'
+
+# Parsed catalog: ((size, mtime_ns), data), reused while isos.json is unchanged
+_catalog_memo = None
+
 def read_isos_config():
     """Read and return the isos.json configuration file.
     
+    The parsed catalog is kept in memory and only re-read when the file's size
+    or modification time changes.
+    
     Returns:
         dict: The parsed JSON data from isos.json, or None if the file cannot be read.
     """
+    global _catalog_memo
     try:
         script_dir = os.path.dirname(os.path.abspath(__file__))
         file_path = os.path.join(script_dir, 'isos.json')
@@ -71,9 +85,15 @@ def read_isos_config():
             print(f"{BRIGHT_RED}ISO configuration file not found at: {file_path}{RESET}")
             return None
         
-        with open(file_path, 'r', encoding='utf-8') as f:
+        stat = os.stat(file_path)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if _catalog_memo is not None and _catalog_memo[0] == stamp:
+            return _catalog_memo[1]
+        
+        with span('iso.catalog_parse', bytes=stat.st_size), open(file_path, 'r', encoding='utf-8') as f:
             iso_data = json.load(f)
         
+        _catalog_memo = (stamp, iso_data)
         return iso_data
     except json.JSONDecodeError as e:
         print(f"{BRIGHT_RED}Failed to parse isos.json: {e}{RESET}")
@@ -107,7 +127,7 @@ def _print_iso_tree(data, indent=0):
                 if has_urls:
                     print(f"{prefix}{BRIGHT_YELLOW}├─{RESET} {key}")
                     for sub_key, url in value.items():
-                        if isinstance(url, str) and url.startswith('http'):
+                        if isinstance(url, str) and url.startswith('http') and not sub_key.endswith(META_SUFFIXES):
                             print(f"{prefix}  {BRIGHT_CYAN}└─{RESET} {sub_key}: {BRIGHT_WHITE}{url[:60]}...{RESET}")
                 else:
                     print(f"{prefix}{BRIGHT_YELLOW}├─{RESET} {key}")
@@ -129,15 +149,30 @@ def get_iso_url(path: str, language: str = "en_US"):
     Returns:
         tuple: (url, note) if found, (None, None) otherwise
     """
+    entry = get_iso_entry(path, language)
+    if entry is None:
+        return None, None
+    return entry['url'], entry['note']
+
+def get_iso_entry(path: str, language: str = "en_US"):
+    """Look up an ISO in the configuration, with its optional checksum, block map and metalink.
+    
+    Args:
+        path: Path to the ISO in format 'os_category/distro/version/iso_type'
+        language: Language code (default: 'en_US')
+    
+    Returns:
+        dict: {'url', 'note', 'sha256', 'blockmap', 'metalink'} (all but 'url' may be None), or None if not found
+    """
     iso_data = read_isos_config()
     if iso_data is None:
-        return None, None
+        return None
     
     try:
         parts = path.split('/')
         if len(parts) < 3:
             print(f"{BRIGHT_RED}Invalid path format. Expected: 'os_category/distro/version/iso_type'{RESET}")
-            return None, None
+            return None
         
         # Navigate through the JSON structure
         current = iso_data
@@ -150,7 +185,7 @@ def get_iso_url(path: str, language: str = "en_US"):
             language = "en_US"
             if language not in current:
                 print(f"{BRIGHT_RED}No en_US fallback available{RESET}")
-                return None, None
+                return None
         
         lang_data = current[language]
         iso_type = parts[-1]
@@ -159,18 +194,41 @@ def get_iso_url(path: str, language: str = "en_US"):
         url = lang_data.get(iso_type)
         note = lang_data.get('note', None)
         
-        if isinstance(url, str) and url.startswith('http'):
-            return url, note
+        if isinstance(url, str) and url.startswith('http') and not iso_type.endswith(META_SUFFIXES):
+            return {'url': url, 'note': note, 'sha256': lang_data.get(f"{iso_type}_sha256"),
+                    'blockmap': lang_data.get(f"{iso_type}_blockmap"), 'metalink': lang_data.get(f"{iso_type}_metalink")}
         else:
             print(f"{BRIGHT_RED}Invalid or missing URL in configuration{RESET}")
-            return None, None
+            return None
             
     except KeyError as e:
         print(f"{BRIGHT_RED}Path not found in configuration: {e}{RESET}")
-        return None, None
+        return None
     except Exception as e:
         print(f"{BRIGHT_RED}Error parsing path: {e}{RESET}")
-        return None, None
+        return None
+
+def get_iso_output_path(path: str, language: str, iso_url: str):
+    """Return where an ISO is saved: the user's Downloads folder, named after the URL or the path.
+    
+    Args:
+        path: Path to the ISO in format 'os_category/distro/version/iso_type'
+        language: Language code
+        iso_url: The ISO's download URL
+    
+    Returns:
+        str: The output file path
+    """
+    output_dir = os.path.join(os.path.expanduser('~'), 'Downloads')
+    
+    # Extract filename from URL
+    filename = os.path.basename(iso_url.split('?')[0])
+    if not filename.endswith('.iso'):
+        # Generate filename from path
+        safe_path = path.replace('/', '_').replace('\\', '_')
+        filename = f"{safe_path}_{language}.iso"
+    
+    return os.path.join(output_dir, filename)
 
 def download_iso(path: str, language: str = "en_US"):
     """Download an ISO image using a simple path and language.
@@ -187,73 +245,152 @@ def download_iso(path: str, language: str = "en_US"):
     """
     print(f"{BRIGHT_CYAN}Preparing to download ISO...{RESET}\n")
     
-    # Get the ISO URL and note
-    iso_url, note = get_iso_url(path, language)
-    if iso_url is None:
+    # Get the ISO URL, note and checksum
+    entry = get_iso_entry(path, language)
+    if entry is None:
         print(f"{BRIGHT_RED}Failed to retrieve ISO URL{RESET}")
         sys.exit(1)
+    iso_url, note = entry['url'], entry['note']
     
     # Display note if available
     if note:
         print(f"{BRIGHT_YELLOW}Note: {note}{RESET}\n")
     
-    # Determine output directory (user's Downloads folder)
-    output_dir = os.path.join(os.path.expanduser('~'), 'Downloads')
+    output_path = get_iso_output_path(path, language, iso_url)
     
     try:
-        os.makedirs(output_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
     except Exception as e:
         print(f"{BRIGHT_RED}Failed to create output directory: {e}{RESET}")
         sys.exit(1)
     
-    # Extract filename from URL
-    filename = os.path.basename(iso_url.split('?')[0])
-    if not filename.endswith('.iso'):
-        # Generate filename from path
-        safe_path = path.replace('/', '_').replace('\\', '_')
-        filename = f"{safe_path}_{language}.iso"
-    
-    output_path = os.path.join(output_dir, filename)
-    
     print(f"{BRIGHT_GREEN}Downloading from:{RESET} {iso_url}")
     print(f"{BRIGHT_GREEN}Saving to:{RESET} {output_path}\n")
     
     try:
-        # Stream download with progress bar
-        with urllib.request.urlopen(iso_url) as response:
-            total_length = response.getheader('Content-Length')
-            total = int(total_length) if total_length and total_length.isdigit() else 0
-            chunk_size = 8192
-            downloaded = 0
-            bar_length = 40
-            
-            with open(output_path, 'wb') as out_file:
-                while True:
-                    chunk = response.read(chunk_size)
-                    if not chunk:
-                        break
-                    out_file.write(chunk)
-                    downloaded += len(chunk)
-                    
-                    if total:
-                        percent = downloaded / total
-                        filled = int(bar_length * percent)
-                        bar = '=' * filled + ' ' * (bar_length - filled)
-                        mb_downloaded = downloaded / (1024 * 1024)
-                        mb_total = total / (1024 * 1024)
-                        sys.stdout.write(f"\r{BRIGHT_CYAN}[{bar}] {percent*100:6.2f}% ({mb_downloaded:.1f}/{mb_total:.1f} MB){RESET}")
-                    else:
-                        mb_downloaded = downloaded / (1024 * 1024)
-                        sys.stdout.write(f"\r{BRIGHT_CYAN}Downloaded: {mb_downloaded:.1f} MB{RESET}")
-                    sys.stdout.flush()
-        
-        sys.stdout.write("\n")
+        mirror = load_config().get('cache_mirror')
+        # A LAN cache server beats any set of internet mirrors
+        meta = fetch_metalink(entry['metalink'], name=os.path.basename(iso_url.split('?')[0])) if entry['metalink'] and not mirror else None
+        block_map = None
+        with span('iso.download', path=path, language=language, metalink=meta is not None) as attrs:
+            if meta is not None:
+                try:
+                    block_map = download_metalink(meta, output_path, extra_urls=[iso_url])
+                except OSError as e:
+                    print(f"{BRIGHT_YELLOW}Multi-mirror download failed ({e}), downloading from {iso_url} instead.{RESET}")
+            if block_map is None:
+                # Stream download with progress bar; the checksum and block map are computed as it is written
+                hasher = BlockHasher()
+                download_file(iso_url, output_path, mirror=mirror, hasher=hasher)
+                block_map = hasher.block_map()
+            attrs['bytes'] = block_map['size']
+        _save_iso_block_map(output_path, block_map)
+        if entry['sha256'] and block_map['sha256'] != entry['sha256'].lower():
+            metrics.inc('iso_downloads_total', result='corrupt')
+            print(f"\n{BRIGHT_RED}Checksum mismatch for '{output_path}': expected {entry['sha256']}, got {block_map['sha256']}.{RESET}")
+            print(f"{BRIGHT_YELLOW}The file was kept. Run 'main.py --iso {path} --repair' to re-fetch only its corrupted blocks.{RESET}")
+            sys.exit(1)
+        metrics.inc('iso_downloads_total', result='ok')
         print(f"\n{BRIGHT_GREEN}✓ Download completed successfully!{RESET}")
+        if entry['sha256']:
+            print(f"{BRIGHT_GREEN}Verified checksum {block_map['sha256']}.{RESET}")
         print(f"{BRIGHT_GREEN}ISO saved to:{RESET} {output_path}")
         
     except urllib.error.URLError as e:
+        metrics.inc('iso_downloads_total', result='failed')
         print(f"\n{BRIGHT_RED}Download failed: {e}{RESET}")
         sys.exit(1)
     except Exception as e:
+        metrics.inc('iso_downloads_total', result='failed')
         print(f"\n{BRIGHT_RED}An error occurred: {e}{RESET}")
         sys.exit(1)
+
+def get_block_map_path(output_path: str):
+    """Return where the block map of a downloaded file is kept: the user cache, not next to the ISO."""
+    key = hashlib.sha256(os.path.abspath(output_path).lower().encode('utf-8')).hexdigest()[:16]
+    return os.path.join(get_user_cache_dir(), BLOCK_MAP_DIR, f"{key}.json")
+
+def _save_iso_block_map(output_path, block_map):
+    """Keep a download's block map for --repair; losing it only costs a re-hash."""
+    try:
+        save_block_map(get_block_map_path(output_path), output_path, block_map)
+    except OSError as e:
+        print(f"{BRIGHT_YELLOW}Could not save the block map of '{output_path}': {e}{RESET}")
+
+def _get_reference_block_map(entry, mirror):
+    """Fetch the block map to repair against: the catalog's, the cache server's map of its copy,
+    else the SHA-256 piece hashes of the ISO's metalink.
+    
+    Returns:
+        dict: A block map (see download.BlockHasher.block_map), or None if none is available
+    """
+    sources = [entry['blockmap']] if entry['blockmap'] else []
+    if mirror:
+        sources.append(mirror_block_map_url(entry['url'], mirror))
+    if entry['metalink']:
+        sources.append(entry['metalink'])
+    for url in sources:
+        if url == entry['metalink']:
+            meta = fetch_metalink(url, name=os.path.basename(entry['url'].split('?')[0]))
+            if meta is not None and meta['piece_type'] == 'sha256':
+                return {'block_size': meta['piece_length'], 'size': meta['size'], 'sha256': meta['sha256'], 'blocks': meta['pieces']}
+            if meta is not None:
+                print(f"{BRIGHT_YELLOW}The metalink {url} has no SHA-256 piece hashes.{RESET}")
+            continue
+        try:
+            with urllib.request.urlopen(url, timeout=TIMEOUT) as response:
+                block_map = json.load(response)
+            block_size, size, blocks = block_map['block_size'], block_map['size'], block_map['blocks']
+            if not isinstance(block_size, int) or block_size <= 0 or len(blocks) != -(-size // block_size):
+                raise ValueError('inconsistent block count')
+            return block_map
+        except Exception as e:
+            print(f"{BRIGHT_YELLOW}No usable block map at {url}: {e}{RESET}")
+    return None
+
+def repair_iso(path: str, language: str = "en_US"):
+    """Re-fetch only the corrupted blocks of a downloaded ISO (main.py --iso <path> --repair).
+    
+    The file's block map, kept from its download or rebuilt by hashing it, is
+    compared with a reference block map: the catalog's '<iso_type>_blockmap',
+    or the LAN cache server's map of its copy. Only the blocks that differ are
+    fetched (see download.repair_file).
+    
+    Args:
+        path: Path to the ISO in format 'os_category/distro/version/iso_type'
+        language: Language code (default: 'en_US')
+    
+    Returns:
+        bool: True if the ISO matches its reference afterwards
+    """
+    entry = get_iso_entry(path, language)
+    if entry is None:
+        return False
+    output_path = get_iso_output_path(path, language, entry['url'])
+    if not os.path.exists(output_path):
+        print(f"{BRIGHT_RED}No download to repair at '{output_path}'. Download it with --iso {path}.{RESET}")
+        return False
+    mirror = load_config().get('cache_mirror')
+    reference = _get_reference_block_map(entry, mirror)
+    if reference is None:
+        print(f"{BRIGHT_RED}No block hashes are available for {path}. Add '{path.split('/')[-1]}_blockmap' to isos.json, "
+              f"or set cache_mirror to a cache server that holds the image.{RESET}")
+        return False
+    expected = (entry['sha256'] or '').lower()
+    if expected and reference.get('sha256') and reference['sha256'].lower() != expected:
+        print(f"{BRIGHT_RED}The block map describes a different image (sha256 {reference['sha256']}, expected {expected}).{RESET}")
+        return False
+
+    with span('iso.repair', path=path) as attrs:
+        fetched = repair_file(output_path, entry['url'], reference, get_block_map_path(output_path), mirror=mirror)
+        attrs['bytes'] = fetched
+    if fetched is None:
+        metrics.inc('iso_repairs_total', result='failed')
+        print(f"{BRIGHT_RED}Run --repair again, or download the ISO again.{RESET}")
+        return False
+    metrics.inc('iso_repairs_total', result='ok')
+    metrics.inc('iso_repair_bytes_total', fetched)
+    if fetched and expected and (reference.get('sha256') or '').lower() != expected and sha256_file(output_path) != expected:
+        print(f"{BRIGHT_RED}'{output_path}' matches the block map but not the catalog checksum {expected}.{RESET}")
+        return False
+    return True
@@ -0,0 +1,66 @@
+import os
+import json
+import time
+import hashlib
+from .config import get_user_cache_dir
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_YELLOW = "\033[93m"
+
+JOURNAL_DIR = 'journal'
+
+
+def get_journal_path(name, version, mode=None):
+    """Return the journal file of an install: <user cache>/journal/<name>-<version>[-<mode>].json."""
+    suffix = f"-{mode}" if mode else ''
+    return os.path.join(get_user_cache_dir(), JOURNAL_DIR, f"{name}-{version}{suffix}.json")
+
+
+def fingerprint(inputs):
+    """Digest of the inputs an install was started with; a journal only resumes an identical install."""
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_journal(path, key):
+    """
+    Load an install journal.
+
+    Args:
+        path (str): Journal file from get_journal_path
+        key (str): Fingerprint of the current install
+
+    Returns:
+        dict: {'key', 'started_at', 'stages': {stage: {'at', 'state'}}}; a new,
+            empty journal if there is none or it belongs to different inputs
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+        if journal.get('key') == key and isinstance(journal.get('stages'), dict):
+            return journal
+    except Exception:
+        pass
+    return {'key': key, 'started_at': time.time(), 'stages': {}}
+
+
+def save_journal(path, journal):
+    """Write a journal atomically, so a crash leaves the previous checkpoint intact."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(journal, f, indent=4)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"{BRIGHT_YELLOW}Could not write install journal '{path}': {e}{RESET}")
+
+
+def clear_journal(path):
+    """Remove a journal once its install has finished (or for --restart)."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"{BRIGHT_YELLOW}Could not remove install journal '{path}': {e}{RESET}")
@@ -0,0 +1,331 @@
+import os
+import sys
+import time
+import hashlib
+import threading
+import urllib.parse
+import urllib.request
+import xml.etree.ElementTree as ET
+from collections import deque
+from . import metrics
+from .download import BLOCK_SIZE, TIMEOUT, hash_blocks, read_range
+from .trace import span
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+# Metalink 4 (RFC 5854, .meta4) and Metalink 3 (.metalink) namespaces
+NAMESPACES = {'urn:ietf:params:xml:ns:metalink': 4, 'http://www.metalinker.org/': 3}
+# hashlib names of the supported hash types, looked up with hash_name()
+HASH_NAMES = {'sha256': 'sha256', 'sha1': 'sha1', 'sha512': 'sha512', 'sha384': 'sha384', 'md5': 'md5'}
+# Mirrors downloaded from at the same time, best priority first
+MAX_SOURCES = 6
+# A mirror is dropped once it is this much slower than the fastest one ...
+SLOW_FRACTION = 0.25
+# ... measured over at least this many pieces
+MIN_PIECES = 2
+# Failed requests after which a mirror is dropped
+MAX_FAILURES = 2
+BAR_LENGTH = 40
+
+
+def hash_name(value):
+    """Normalise a hash type: Metalink 4 says 'sha-256', Metalink 3 'sha256' or 'SHA256'. None if unsupported."""
+    return HASH_NAMES.get((value or '').lower().replace('-', ''))
+
+
+def parse_metalink(data, name=None):
+    """
+    Parse a Metalink 4 or Metalink 3 document.
+
+    Args:
+        data (bytes): The XML document
+        name (str): File to pick if the metalink describes several, defaults to the first
+
+    Returns:
+        dict: {'name', 'size', 'sha256' (or None), 'piece_length', 'piece_type',
+            'pieces' ([hex digest, ...], empty if none are published),
+            'urls' (HTTP(S) mirrors, best first)}
+
+    Raises:
+        ValueError: If the document is not a usable metalink
+    """
+    root = ET.fromstring(data)
+    namespace = root.tag[1:].split('}', 1)[0] if root.tag.startswith('{') else ''
+    version = NAMESPACES.get(namespace)
+    if version is None:
+        raise ValueError(f"not a metalink document ({root.tag})")
+
+    def tag(name):
+        return f"{{{namespace}}}{name}"
+
+    files = list(root.iter(tag('file')))
+    if not files:
+        raise ValueError('the metalink lists no files')
+    entry = next((f for f in files if f.get('name') == name), files[0])
+    size = entry.findtext(tag('size'))
+    if not size or not size.strip().isdigit():
+        raise ValueError(f"no size for '{entry.get('name')}'")
+
+    verification = entry if version == 4 else entry.find(tag('verification'))
+    hashes = {}
+    pieces = None
+    if verification is not None:
+        hashes = {hash_name(h.get('type')): h.text.strip().lower()
+                  for h in verification.findall(tag('hash')) if h.text}
+        pieces = verification.find(tag('pieces'))
+    piece_hashes = []
+    if pieces is not None and hash_name(pieces.get('type')):
+        elements = pieces.findall(tag('hash'))
+        if version == 3:
+            elements.sort(key=lambda h: int(h.get('piece', 0)))
+        piece_hashes = [h.text.strip().lower() for h in elements if h.text]
+
+    if version == 4:
+        # Lower priority values are preferred; mirrors without one come last
+        ranked = [(int(u.get('priority', 999999)), u.text.strip()) for u in entry.findall(tag('url')) if u.text]
+    else:
+        # Higher preference values are preferred
+        resources = entry.find(tag('resources'))
+        ranked = [(-int(u.get('preference', 0)), u.text.strip()) for u in (resources.findall(tag('url')) if resources is not None else []) if u.text]
+    urls = []
+    for _, url in sorted(ranked, key=lambda item: item[0]):
+        if urllib.parse.urlsplit(url).scheme in ('http', 'https') and url not in urls:
+            urls.append(url)
+    if not urls:
+        raise ValueError(f"no HTTP mirrors for '{entry.get('name')}'")
+
+    piece_length = int(pieces.get('length')) if piece_hashes else 0
+    if piece_hashes and len(piece_hashes) != -(-int(size) // piece_length):
+        raise ValueError('the piece hashes do not cover the file')
+    return {
+        'name': entry.get('name'),
+        'size': int(size),
+        'sha256': hashes.get('sha256'),
+        'piece_length': piece_length,
+        'piece_type': hash_name(pieces.get('type')) if piece_hashes else None,
+        'pieces': piece_hashes,
+        'urls': urls,
+    }
+
+
+def fetch_metalink(url, name=None):
+    """
+    Download and parse a metalink.
+
+    Returns:
+        dict: See parse_metalink, or None if it cannot be fetched or parsed
+    """
+    try:
+        with span('metalink.fetch', url=url), urllib.request.urlopen(url, timeout=TIMEOUT) as response:
+            return parse_metalink(response.read(), name)
+    except Exception as e:
+        print(f"{BRIGHT_YELLOW}Could not use the metalink {url}: {e}{RESET}")
+        return None
+
+
+class _Source:
+    """One mirror and what it has delivered so far."""
+
+    def __init__(self, url):
+        self.url = url
+        self.host = urllib.parse.urlsplit(url).netloc
+        self.bytes = 0
+        self.seconds = 0.0
+        self.pieces = 0
+        self.failures = 0
+        self.dropped = None
+        self.fetching = set()
+
+    def rate(self):
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+def download_metalink(meta, output_path, show_progress=True, extra_urls=(), max_sources=MAX_SOURCES):
+    """
+    Download a file from several mirrors at once, piece by piece.
+
+    Every mirror gets its own connection and takes the next missing piece
+    from a shared queue, so fast mirrors fetch more pieces than slow ones.
+    Each piece is checked against its hash from the metalink as it lands;
+    a mirror that sends a bad piece is dropped at once, and one that fails
+    MAX_FAILURES requests or is SLOW_FRACTION slower than the fastest
+    mirror is dropped too. Its pieces go back into the queue. When the queue
+    is empty, idle mirrors also fetch the pieces still in flight on slower
+    ones, and the first copy wins. Afterwards the file is hashed once in
+    BLOCK_SIZE blocks for its SHA-256 and block map.
+
+    Args:
+        meta (dict): The parsed metalink (see parse_metalink)
+        output_path (str): Destination file; written to '<output_path>.part' first
+        show_progress (bool): Draw a progress bar on stdout
+        extra_urls (iterable): More mirrors to use after the metalink's own (e.g. the catalog URL)
+        max_sources (int): Most mirrors to use at the same time
+
+    Returns:
+        dict: The file's block map (see download.BlockHasher.block_map)
+
+    Raises:
+        OSError: If a piece could not be fetched from any mirror, or the file fails its checksum
+    """
+    size = meta['size']
+    # Small pieces are fetched several at a time, so each request moves about BLOCK_SIZE bytes
+    per_unit = max(1, BLOCK_SIZE // meta['piece_length']) if meta['pieces'] else 1
+    unit_length = meta['piece_length'] * per_unit if meta['pieces'] else BLOCK_SIZE
+    count = max(1, -(-size // unit_length))
+    urls = list(meta['urls']) + [url for url in extra_urls if url not in meta['urls']]
+    sources = [_Source(url) for url in urls[:max_sources]]
+    pending = deque(range(count))
+    in_flight = {}  # piece -> number of mirrors fetching it
+    done = set()
+    condition = threading.Condition()
+    active = len(sources)
+    part_path = output_path + '.part'
+    started = time.perf_counter()
+
+    def piece_range(index):
+        start = index * unit_length
+        return start, min(size, start + unit_length) - start
+
+    def piece_ok(index, data):
+        if not meta['pieces']:
+            return True  # Only the whole-file checksum at the end
+        piece_length = meta['piece_length']
+        first = index * per_unit
+        return all(hashlib.new(meta['piece_type'], data[offset:offset + piece_length]).hexdigest() == meta['pieces'][first + number]
+                   for number, offset in enumerate(range(0, len(data), piece_length)))
+
+    def drop(source, reason, detail=''):
+        if source.dropped is None:
+            source.dropped = reason
+            metrics.inc('metalink_sources_dropped_total', reason=reason)
+            if show_progress:
+                sys.stdout.write("\n")
+            print(f"{BRIGHT_YELLOW}Dropped mirror {source.host} ({detail or reason}, {source.rate() / (1024 * 1024):.1f} MB/s).{RESET}")
+
+    def release(index):
+        """Give a piece back to the queue unless another mirror still has it (called with the lock held)."""
+        in_flight[index] -= 1
+        if not in_flight[index]:
+            del in_flight[index]
+            if index not in done:
+                pending.appendleft(index)
+        condition.notify_all()
+
+    def drop_slow():
+        measured = [s for s in sources if s.dropped is None and s.pieces >= MIN_PIECES]
+        if len(measured) < 2:
+            return
+        fastest = max(s.rate() for s in measured)
+        for source in measured:
+            # Never drop the last mirror standing
+            if source.rate() < fastest * SLOW_FRACTION and sum(s.dropped is None for s in sources) > 1:
+                drop(source, 'slow')
+
+    def worker(source):
+        nonlocal active
+        try:
+            fetch_pieces(source)
+        finally:
+            with condition:
+                active -= 1
+                condition.notify_all()
+
+    def fetch_pieces(source):
+        while True:
+            with condition:
+                while True:
+                    if source.dropped is not None or len(done) == count:
+                        return
+                    if pending:
+                        index = pending.popleft()
+                        break
+                    # Endgame: help with a piece another mirror is still fetching
+                    shared = [i for i, fetching in in_flight.items() if fetching == 1 and i not in done and i not in source.fetching]
+                    if shared:
+                        index = shared[0]
+                        break
+                    if not in_flight:
+                        return
+                    condition.wait(0.5)
+                in_flight[index] = in_flight.get(index, 0) + 1
+                source.fetching.add(index)
+            start, length = piece_range(index)
+            fetch_started = time.perf_counter()
+            try:
+                data = read_range(source.url, start, length, retries=0)
+            except OSError as e:
+                with condition:
+                    source.fetching.discard(index)
+                    source.failures += 1
+                    metrics.inc('metalink_pieces_total', result='failed')
+                    if source.failures >= MAX_FAILURES:
+                        drop(source, 'errors', str(e))
+                    release(index)
+                continue
+            elapsed = time.perf_counter() - fetch_started
+            with condition:
+                source.fetching.discard(index)
+                if not piece_ok(index, data):
+                    metrics.inc('metalink_pieces_total', result='bad_hash')
+                    drop(source, 'bad_data', f"data at offset {start} does not match the piece hashes")
+                    release(index)
+                    return
+                source.bytes += length
+                source.seconds += elapsed
+                source.pieces += 1
+                if index not in done and not out_file.closed:
+                    out_file.seek(start)
+                    out_file.write(data)
+                    done.add(index)
+                    metrics.inc('metalink_pieces_total', result='ok')
+                    if show_progress:
+                        _print_progress(len(done) * unit_length, size, sum(s.dropped is None for s in sources))
+                release(index)
+                drop_slow()
+
+    print(f"{BRIGHT_CYAN}Fetching {count} piece(s) from {len(sources)} mirror(s) at once: {', '.join(s.host for s in sources)}{RESET}")
+    with span('metalink.download', size=size, pieces=count, sources=len(sources)) as attrs:
+        with open(part_path, 'wb') as out_file:
+            out_file.truncate(size)
+            threads = [threading.Thread(target=worker, args=(source,), daemon=True) for source in sources]
+            for thread in threads:
+                thread.start()
+            # Don't wait for a slow mirror whose last piece another one already delivered
+            with condition:
+                while len(done) != count and active:
+                    condition.wait()
+        if show_progress:
+            sys.stdout.write("\n")
+        attrs['dropped'] = sum(s.dropped is not None for s in sources)
+        for source in sources:
+            if source.bytes:
+                metrics.inc('download_bytes_total', source.bytes, source='metalink', host=source.host)
+
+        seconds = time.perf_counter() - started
+        used = ', '.join(f"{s.host} {s.bytes / (1024 * 1024):.0f} MB" for s in sources if s.bytes)
+        if len(done) != count:
+            raise OSError(f"{count - len(done)} of {count} pieces could not be fetched from any mirror")
+        print(f"{BRIGHT_GREEN}Fetched {size / (1024 * 1024):.1f} MB in {seconds:.1f}s "
+              f"({size / (1024 * 1024) / max(seconds, 1e-9):.1f} MB/s) from {used}.{RESET}")
+
+        block_map = hash_blocks(part_path)
+        if meta['sha256'] and block_map['sha256'] != meta['sha256']:
+            raise OSError(f"checksum mismatch: the metalink lists {meta['sha256']}, got {block_map['sha256']}")
+    os.replace(part_path, output_path)
+    return block_map
+
+
+def _print_progress(downloaded, total, mirrors):
+    """Redraw the progress bar with the number of active mirrors."""
+    downloaded = min(downloaded, total)
+    percent = downloaded / total if total else 1.0
+    filled = int(BAR_LENGTH * percent)
+    bar = '=' * filled + ' ' * (BAR_LENGTH - filled)
+    sys.stdout.write(f"\r{BRIGHT_CYAN}[{bar}] {percent*100:6.2f}% ({downloaded / (1024 * 1024):.1f}/{total / (1024 * 1024):.1f} MB, "
+                     f"{mirrors} mirror(s)){RESET}")
+    sys.stdout.flush()
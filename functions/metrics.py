@@ -0,0 +1,296 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+import contextlib
+from .config import get_user_cache_dir, load_config
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_YELLOW = "\033[93m"
+
+METRICS_STATE_FILE = 'metrics.json'
+PREFIX = 'sw_devtools_'
+# Histogram bucket upper bounds in seconds
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+# A lock file older than this is left over from a crashed process
+STALE_LOCK_SECONDS = 30
+
+# This process's increments, merged into the cumulative state by flush():
+# {'counters': {series: value}, 'histograms': {series: {'buckets', 'counts', 'sum', 'count'}}}
+_pending = {'counters': {}, 'histograms': {}}
+_pending_lock = threading.Lock()
+_flush_registered = False
+
+
+def _series(name, labels):
+    """Return the Prometheus series name, e.g. sw_devtools_downloads_total{result="ok"}."""
+    if not labels:
+        return PREFIX + name
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return PREFIX + name + '{' + ','.join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + '}'
+
+
+def _register_flush():
+    global _flush_registered
+    if not _flush_registered:
+        _flush_registered = True
+        atexit.register(flush)
+
+
+def inc(name, value=1, **labels):
+    """
+    Add to a counter.
+
+    Args:
+        name (str): Metric name without the sw_devtools_ prefix, e.g. 'download_bytes_total'
+        value (int|float): Amount to add
+        **labels: Label values, e.g. source='upstream'
+    """
+    series = _series(name, labels)
+    with _pending_lock:
+        _pending['counters'][series] = _pending['counters'].get(series, 0) + value
+        _register_flush()
+
+
+def observe(name, value, buckets=DURATION_BUCKETS, **labels):
+    """
+    Record a value in a histogram.
+
+    Args:
+        name (str): Metric name without the sw_devtools_ prefix, e.g. 'extract_seconds'
+        value (float): The observed value
+        buckets (tuple): Bucket upper bounds
+        **labels: Label values
+    """
+    series = _series(name, labels)
+    with _pending_lock:
+        histogram = _pending['histograms'].setdefault(
+            series, {'buckets': list(buckets), 'counts': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+        for index, bound in enumerate(histogram['buckets']):
+            if value <= bound:
+                histogram['counts'][index] += 1
+                break
+        histogram['sum'] += value
+        histogram['count'] += 1
+        _register_flush()
+
+
+@contextlib.contextmanager
+def timed(name, **labels):
+    """
+    Observe the duration of a block in a histogram.
+
+    The block can add labels to the yielded dict, e.g. whether the work succeeded.
+
+    Args:
+        name (str): Histogram name without the sw_devtools_ prefix
+        **labels: Initial label values
+
+    Yields:
+        dict: The labels
+    """
+    started = time.perf_counter()
+    try:
+        yield labels
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def load_state(path=None):
+    """
+    Load the cumulative metrics.
+
+    Returns:
+        dict: {'counters': {...}, 'histograms': {...}, 'updated': timestamp}
+    """
+    path = path or os.path.join(get_user_cache_dir(), METRICS_STATE_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if isinstance(state, dict):
+            state.setdefault('counters', {})
+            state.setdefault('histograms', {})
+            return state
+    except Exception:
+        pass
+    return {'counters': {}, 'histograms': {}}
+
+
+def _merge(state, pending):
+    for series, value in pending['counters'].items():
+        state['counters'][series] = state['counters'].get(series, 0) + value
+    for series, histogram in pending['histograms'].items():
+        total = state['histograms'].get(series)
+        if total is None or total['buckets'] != histogram['buckets']:
+            # New series, or the bucket layout changed: start over
+            state['histograms'][series] = json.loads(json.dumps(histogram))
+            continue
+        total['counts'] = [a + b for a, b in zip(total['counts'], histogram['counts'])]
+        total['sum'] += histogram['sum']
+        total['count'] += histogram['count']
+    state['updated'] = time.time()
+    return state
+
+
+def _acquire_lock(lock_path, timeout=5.0):
+    """Create lock_path exclusively, waiting up to timeout seconds. Returns True if acquired."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.02)
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def take():
+    """
+    Remove and return this process's unflushed metrics.
+
+    The elevated broker hands its metrics to the client with each reply
+    instead of writing them into the user's cache itself.
+
+    Returns:
+        dict: {'counters': {...}, 'histograms': {...}}
+    """
+    with _pending_lock:
+        pending = {'counters': dict(_pending['counters']), 'histograms': dict(_pending['histograms'])}
+        _pending['counters'].clear()
+        _pending['histograms'].clear()
+    return pending
+
+
+def add(pending):
+    """Add metrics taken from another process (see take) to this process's, to be flushed with them."""
+    if not isinstance(pending, dict):
+        return
+    with _pending_lock:
+        _merge(_pending, {'counters': pending.get('counters') or {}, 'histograms': pending.get('histograms') or {}})
+        _pending.pop('updated', None)
+        _register_flush()
+
+
+def flush(metrics_file=None):
+    """
+    Merge this process's metrics into the cumulative state and export them.
+
+    Called at exit once anything was recorded, including the metrics the
+    broker returned (see add). The state file in the user cache is updated under a lock file
+    and replaced atomically. If the metrics_file config key (or the argument)
+    is set, the totals are also exported there: a .prom file is rewritten as a
+    Prometheus textfile, any other file gets one JSON line per command.
+
+    Args:
+        metrics_file (str): Export target, defaults to the metrics_file config key
+
+    Returns:
+        bool: True if the metrics were written (or there was nothing to write)
+    """
+    pending = take()
+    if not pending['counters'] and not pending['histograms']:
+        return True
+
+    cache_dir = get_user_cache_dir()
+    state_path = os.path.join(cache_dir, METRICS_STATE_FILE)
+    lock_path = state_path + '.lock'
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        if not _acquire_lock(lock_path):
+            print(f"{BRIGHT_YELLOW}Metrics are locked by another process, dropping this command's metrics.{RESET}")
+            return False
+        try:
+            state = _merge(load_state(state_path), pending)
+            _write_atomic(state_path, json.dumps(state, indent=4))
+            metrics_file = metrics_file or load_config().get('metrics_file')
+            if metrics_file:
+                export(state, metrics_file)
+        finally:
+            os.remove(lock_path)
+        return True
+    except Exception as e:
+        print(f"{BRIGHT_YELLOW}Could not write metrics: {e}{RESET}")
+        return False
+
+
+def export(state, path):
+    """
+    Export cumulative metrics.
+
+    Args:
+        state (dict): The state from load_state
+        path (str): A .prom file (Prometheus textfile collector format, replaced
+            atomically) or a JSON-lines file (one snapshot appended per call)
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    if path.endswith('.prom'):
+        _write_atomic(path, format_prometheus(state))
+        return
+    line = json.dumps({'time': round(state['updated'], 3), 'command': ' '.join(sys.argv[1:]), 'counters': state['counters'],
+                       'histograms': state['histograms']}, separators=(',', ':')) + '\n'
+    # One write on an O_APPEND descriptor, so concurrent commands never interleave lines
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode('utf-8'))
+    finally:
+        os.close(fd)
+
+
+def format_prometheus(state):
+    """
+    Render cumulative metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: The textfile contents
+    """
+    lines = []
+    typed = set()
+
+    def split(series):
+        name, _, labels = series.partition('{')
+        return name, labels.rstrip('}')
+
+    # Series of one metric must be contiguous, so sort by metric name first
+    for series, value in sorted(state['counters'].items(), key=lambda item: split(item[0])):
+        name, _ = split(series)
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{series} {value}")
+
+    for series, histogram in sorted(state['histograms'].items(), key=lambda item: split(item[0])):
+        name, labels = split(series)
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        prefix = labels + ',' if labels else ''
+        cumulative = 0
+        for bound, count in zip(histogram['buckets'], histogram['counts']):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram["count"]}')
+        suffix = '{' + labels + '}' if labels else ''
+        lines.append(f"{name}_sum{suffix} {histogram['sum']:.6f}")
+        lines.append(f"{name}_count{suffix} {histogram['count']}")
+
+    lines.append(f"# TYPE {PREFIX}metrics_updated_timestamp_seconds gauge")
+    lines.append(f"{PREFIX}metrics_updated_timestamp_seconds {state.get('updated', 0):.3f}")
+    return '\n'.join(lines) + '\n'
@@ -1,6 +1,12 @@
 import os
-import winreg
-import ctypes
+import re
+import time
+try:
+    import winreg
+except ImportError:  # Non-Windows: PathSnapshot still works with a custom reader
+    winreg = None
+from . import metrics
+from .trace import span
 
 # ANSI escape codes for CLI colors
 RESET = "\033[0m"
@@ -43,9 +49,9 @@ def add_to_path(directory, scope='system'):
         # Split PATH into individual directories
         path_dirs = [p.strip() for p in current_path.split(';') if p.strip()]
         
-        # Check if directory is already in PATH (case-insensitive)
-        directory_lower = directory.lower()
-        if any(p.lower() == directory_lower for p in path_dirs):
+        # Check if directory is already in PATH (normalized, case-insensitive)
+        directory_key = _path_key(directory)
+        if any(_path_key(p) == directory_key for p in path_dirs):
             print(f"{BRIGHT_YELLOW}'{directory}' is already in {scope} PATH.{RESET}")
             winreg.CloseKey(key)
             return True
@@ -54,8 +60,10 @@ def add_to_path(directory, scope='system'):
         path_dirs.append(directory)
         new_path = ';'.join(path_dirs)
         
-        winreg.SetValueEx(key, 'Path', 0, reg_type, new_path)
+        with span('path.registry_write', scope=scope, entries=len(path_dirs)):
+            winreg.SetValueEx(key, 'Path', 0, reg_type, new_path)
         winreg.CloseKey(key)
+        invalidate_path_snapshot()
         
         print(f"{BRIGHT_GREEN}Added '{directory}' to {scope} PATH.{RESET}")
         
@@ -118,8 +126,10 @@ def remove_from_path(directory, scope='system'):
         
         # Update PATH
         new_path = ';'.join(path_dirs)
-        winreg.SetValueEx(key, 'Path', 0, reg_type, new_path)
+        with span('path.registry_write', scope=scope, entries=len(path_dirs)):
+            winreg.SetValueEx(key, 'Path', 0, reg_type, new_path)
         winreg.CloseKey(key)
+        invalidate_path_snapshot()
         
         print(f"{BRIGHT_GREEN}Removed '{directory}' from {scope} PATH.{RESET}")
         
@@ -136,6 +146,43 @@ def remove_from_path(directory, scope='system'):
         return False
 
 
+def read_registry_path(scope='system'):
+    """
+    Read the raw PATH value from the registry.
+    
+    This is the default reader used by get_path and PathSnapshot, see
+    set_path_reader to plug in another one.
+    
+    Args:
+        scope (str): Either 'system' or 'user' to specify which PATH to read
+    
+    Returns:
+        str: The raw PATH value ('' if the value does not exist)
+    
+    Raises:
+        ValueError: If the scope is invalid
+        OSError: If the registry cannot be read
+    """
+    if scope == 'system':
+        key_path = r'SYSTEM\CurrentControlSet\Control\Session Manager\Environment'
+        hkey = winreg.HKEY_LOCAL_MACHINE
+    elif scope == 'user':
+        key_path = r'Environment'
+        hkey = winreg.HKEY_CURRENT_USER
+    else:
+        raise ValueError(f"Invalid scope '{scope}'. Use 'system' or 'user'.")
+    
+    with span('path.registry_read', scope=scope):
+        key = winreg.OpenKey(hkey, key_path, 0, winreg.KEY_READ)
+        try:
+            current_path, _ = winreg.QueryValueEx(key, 'Path')
+        except FileNotFoundError:
+            current_path = ''
+        finally:
+            winreg.CloseKey(key)
+    return current_path
+
+
 def get_path(scope='system'):
     """
     Get the current PATH environment variable.
@@ -146,6 +193,206 @@ def get_path(scope='system'):
     Returns:
         list: List of directories in PATH, or None if failed
     """
+    try:
+        current_path = (_reader or read_registry_path)(scope) or ''
+        return [p.strip() for p in current_path.split(';') if p.strip()]
+        
+    except ValueError as e:
+        print(f"{BRIGHT_RED}{e}{RESET}")
+        return None
+    except Exception as e:
+        print(f"{BRIGHT_RED}Failed to read PATH: {e}{RESET}")
+        return None
+
+
+def is_in_path(directory, scope='system'):
+    """
+    Check if a directory is in the PATH environment variable.
+    
+    Args:
+        directory (str): The directory path to check
+        scope (str): Either 'system' or 'user' to specify which PATH to check
+    
+    Returns:
+        bool: True if directory is in PATH, False otherwise
+    """
+    return get_path_snapshot().contains(directory, scope)
+
+
+class PathSnapshot:
+    """
+    Read-once view of the user and system PATH.
+    
+    Both scopes are read a single time and every entry is indexed by its
+    normalized, case-insensitive key (see _path_key), so membership checks
+    are O(1) dictionary lookups instead of a registry read and a scan.
+    
+    Args:
+        reader (callable): Function taking a scope ('system' or 'user') and
+            returning the raw PATH string. Defaults to read_registry_path;
+            pass a stub to use the snapshot without a registry.
+    """
+    SCOPES = ('system', 'user')
+
+    def __init__(self, reader=None):
+        self.reader = reader or read_registry_path
+        self.stamp = registry_path_stamp() if reader is None else None
+        self.created_at = time.monotonic()
+        self.entries = {}
+        self._index = {}
+        for scope in self.SCOPES:
+            try:
+                raw = self.reader(scope) or ''
+            except Exception as e:
+                print(f"{BRIGHT_YELLOW}Failed to read {scope} PATH: {e}{RESET}")
+                raw = ''
+            entries = [p.strip() for p in raw.split(';') if p.strip()]
+            index = {}
+            for entry in entries:
+                index.setdefault(_path_key(entry), entry)
+            self.entries[scope] = entries
+            self._index[scope] = index
+
+    def get(self, scope='system'):
+        """Return the entries of one scope, in PATH order."""
+        return list(self.entries.get(scope, []))
+
+    def contains(self, directory, scope=None):
+        """
+        Check whether a directory is on PATH.
+        
+        Args:
+            directory (str): The directory to look up
+            scope (str): 'system', 'user' or None to check both
+        
+        Returns:
+            bool: True if the directory is on PATH
+        """
+        return self.find(directory, scope) is not None
+
+    def find(self, directory, scope=None):
+        """
+        Return the PATH entry matching a directory.
+        
+        Args:
+            directory (str): The directory to look up
+            scope (str): 'system', 'user' or None to check both
+        
+        Returns:
+            str: The entry as written in PATH, or None if it is not present
+        """
+        key = _path_key(directory)
+        for name in ((scope,) if scope else self.SCOPES):
+            entry = self._index.get(name, {}).get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def __contains__(self, directory):
+        return self.contains(directory)
+
+
+_snapshot = None
+_reader = None
+
+
+def get_path_snapshot(refresh=False):
+    """
+    Return the PathSnapshot shared by every module during this invocation.
+    
+    Args:
+        refresh (bool): Re-read PATH even if a snapshot already exists
+    
+    Returns:
+        PathSnapshot: The shared snapshot
+    """
+    global _snapshot
+    if _snapshot is None or refresh:
+        _snapshot = PathSnapshot(_reader)
+    return _snapshot
+
+
+def registry_path_stamp():
+    """
+    Return the last-write times of the system and user Environment registry keys.
+    
+    Any change to PATH updates these, so a long-running process can tell
+    whether its snapshot is stale without reading and parsing PATH again.
+    
+    Returns:
+        tuple: (system, user) last-write times, or None if they cannot be read
+    """
+    if winreg is None:
+        return None
+    stamp = []
+    try:
+        for hkey, key_path in ((winreg.HKEY_LOCAL_MACHINE, r'SYSTEM\CurrentControlSet\Control\Session Manager\Environment'),
+                               (winreg.HKEY_CURRENT_USER, r'Environment')):
+            key = winreg.OpenKey(hkey, key_path, 0, winreg.KEY_READ)
+            try:
+                stamp.append(winreg.QueryInfoKey(key)[2])
+            finally:
+                winreg.CloseKey(key)
+    except Exception:
+        return None
+    return tuple(stamp)
+
+
+def revalidate_path_snapshot(max_age=5.0):
+    """
+    Drop the shared snapshot if PATH changed since it was taken.
+    
+    Used by the resident daemon, which keeps the snapshot across requests.
+    When the registry stamp is unavailable (custom reader, no winreg), the
+    snapshot is re-read once it is older than max_age seconds.
+    
+    Args:
+        max_age (float): Fallback lifetime of a snapshot without a stamp
+    
+    Returns:
+        PathSnapshot: The valid shared snapshot
+    """
+    snapshot = _snapshot
+    if snapshot is not None:
+        if snapshot.stamp is not None:
+            stale = registry_path_stamp() != snapshot.stamp
+        else:
+            stale = time.monotonic() - snapshot.created_at > max_age
+        if stale:
+            invalidate_path_snapshot()
+    return get_path_snapshot()
+
+
+def set_path_reader(reader):
+    """
+    Replace the reader used by get_path and the shared snapshot (e.g. a stub outside Windows).
+    
+    Args:
+        reader (callable): Function taking a scope and returning the raw PATH
+            string, or None to restore the registry reader
+    """
+    global _reader, _snapshot
+    _reader = reader
+    _snapshot = None
+
+
+def invalidate_path_snapshot():
+    """Discard the shared snapshot so the next lookup re-reads PATH."""
+    global _snapshot
+    _snapshot = None
+
+
+def set_path(path_dirs, scope='system'):
+    """
+    Replace the PATH environment variable with the given list of directories.
+    
+    Args:
+        path_dirs (list): Directories to write, in order
+        scope (str): Either 'system' or 'user' to specify which PATH to modify
+    
+    Returns:
+        bool: True if successful, False otherwise
+    """
     try:
         if scope == 'system':
             key_path = r'SYSTEM\CurrentControlSet\Control\Session Manager\Environment'
@@ -155,54 +402,193 @@ def get_path(scope='system'):
             hkey = winreg.HKEY_CURRENT_USER
         else:
             print(f"{BRIGHT_RED}Invalid scope '{scope}'. Use 'system' or 'user'.{RESET}")
-            return None
+            return False
         
-        key = winreg.OpenKey(hkey, key_path, 0, winreg.KEY_READ)
-        current_path, _ = winreg.QueryValueEx(key, 'Path')
+        key = winreg.OpenKey(hkey, key_path, 0, winreg.KEY_READ | winreg.KEY_WRITE)
+        try:
+            _, reg_type = winreg.QueryValueEx(key, 'Path')
+        except FileNotFoundError:
+            reg_type = winreg.REG_EXPAND_SZ
+        
+        with span('path.registry_write', scope=scope, entries=len(path_dirs)):
+            winreg.SetValueEx(key, 'Path', 0, reg_type, ';'.join(path_dirs))
         winreg.CloseKey(key)
+        invalidate_path_snapshot()
         
-        return [p.strip() for p in current_path.split(';') if p.strip()]
+        # Broadcast WM_SETTINGCHANGE to notify other programs
+        _broadcast_environment_change()
         
+        return True
+        
+    except PermissionError:
+        print(f"{BRIGHT_RED}Permission denied. Administrator privileges required for system PATH.{RESET}")
+        return False
     except Exception as e:
-        print(f"{BRIGHT_RED}Failed to read PATH: {e}{RESET}")
-        return None
+        print(f"{BRIGHT_RED}Failed to write PATH: {e}{RESET}")
+        return False
 
 
-def is_in_path(directory, scope='system'):
+def normalize_path_entry(entry):
     """
-    Check if a directory is in the PATH environment variable.
+    Normalize a PATH entry without changing what it points to.
+    
+    Strips whitespace, surrounding quotes and trailing separators and collapses
+    redundant separators. Environment variable references such as
+    %SystemRoot% are kept unexpanded so REG_EXPAND_SZ values stay portable.
     
     Args:
-        directory (str): The directory path to check
-        scope (str): Either 'system' or 'user' to specify which PATH to check
+        entry (str): A single PATH entry
     
     Returns:
-        bool: True if directory is in PATH, False otherwise
+        str: The normalized entry, or an empty string for blank entries
+    """
+    entry = entry.strip().strip('"').strip()
+    if not entry:
+        return ''
+    normalized = os.path.normpath(entry)
+    # Keep drive roots such as 'C:\' intact, strip separators everywhere else
+    if len(normalized) > 3 or not normalized.endswith((':\\', ':/')):
+        normalized = normalized.rstrip('\\/') or normalized
+    return normalized
+
+
+def _expand_env_vars(entry):
+    """Expand %VAR% style references the way Windows does for REG_EXPAND_SZ values."""
+    def _replace(match):
+        return os.environ.get(match.group(1), match.group(0))
+    return re.sub(r'%([^%]+)%', _replace, entry)
+
+
+def _path_key(entry):
+    """Return a case-insensitive comparison key for a PATH entry."""
+    normalized = normalize_path_entry(entry)
+    if not normalized:
+        return ''
+    return os.path.normcase(os.path.abspath(_expand_env_vars(normalized))).casefold()
+
+
+def is_within(entry, root):
+    """
+    Check whether a PATH entry or directory is root itself or lies inside it.
+    
+    Both are compared by their expanded, absolute, case-insensitive form, so
+    '..' segments and %VAR% references cannot escape root.
+    
+    Returns:
+        bool: True if entry is inside root
+    """
+    entry_key, root_key = _path_key(entry), _path_key(root)
+    if not entry_key or not root_key:
+        return False
+    return entry_key == root_key or entry_key.startswith(root_key.rstrip('\\/') + os.sep)
+
+
+def optimize_path(scope='system', hot=None, prune_missing=True, apply=False):
+    """
+    Normalize, de-duplicate and reorder the PATH environment variable.
+    
+    Entries are normalized with normalize_path_entry, duplicates (compared
+    case-insensitively after expansion) keep their first position, directories
+    that no longer exist are dropped and any directories listed in `hot` are
+    moved to the front in the given order. Entries that still contain an
+    unresolved %VAR% reference are never pruned.
+    
+    Args:
+        scope (str): Either 'system' or 'user' to specify which PATH to optimize
+        hot (list): Directories to move to the front of PATH
+        prune_missing (bool): Drop directories that do not exist
+        apply (bool): Write the result back to the registry; otherwise only
+            print the dry-run diff
+    
+    Returns:
+        list: The optimized list of directories, None if PATH could not be read,
+            or False if it could not be written
     """
     path_dirs = get_path(scope)
     if path_dirs is None:
-        return False
+        return None
+    
+    kept = []
+    seen = set()
+    changes = []
+    # Checking for missing directories can be slow when PATH points at network shares
+    with span('path.scan', scope=scope, entries=len(path_dirs)) as attrs:
+        for entry in path_dirs:
+            normalized = normalize_path_entry(entry)
+            key = _path_key(normalized)
+            if key in seen:
+                changes.append(f"{BRIGHT_RED}- {entry}{RESET} (duplicate)")
+                continue
+            expanded = _expand_env_vars(normalized)
+            if prune_missing and '%' not in expanded and not os.path.isdir(expanded):
+                changes.append(f"{BRIGHT_RED}- {entry}{RESET} (missing)")
+                continue
+            if normalized != entry:
+                changes.append(f"{BRIGHT_YELLOW}~ {entry} -> {normalized}{RESET} (normalized)")
+            seen.add(key)
+            kept.append(normalized)
+        attrs['kept'] = len(kept)
+    
+    # Move hot directories to the front, in the order they were requested
+    front = []
+    for directory in hot or []:
+        hot_key = _path_key(directory)
+        for entry in kept:
+            if _path_key(entry) == hot_key and entry not in front:
+                front.append(entry)
+                break
+        else:
+            print(f"{BRIGHT_YELLOW}Hot directory '{directory}' is not in {scope} PATH, skipping.{RESET}")
+    for position, entry in enumerate(front):
+        if kept.index(entry) != position:
+            changes.append(f"{BRIGHT_GREEN}^ {entry}{RESET} (moved to position {position + 1})")
+    optimized = front + [entry for entry in kept if entry not in front]
+    
+    old_length = len(';'.join(path_dirs))
+    new_length = len(';'.join(optimized))
+    
+    if changes:
+        print(f"{BRIGHT_GREEN}Proposed changes to {scope} PATH:{RESET}")
+        for change in changes:
+            print(f"  {change}")
+    else:
+        print(f"{BRIGHT_GREEN}{scope.capitalize()} PATH is already optimal.{RESET}")
+    print(f"Entries: {len(path_dirs)} -> {len(optimized)}")
+    print(f"Length: {old_length} -> {new_length} characters ({old_length - new_length} saved)")
+    
+    if not changes:
+        return optimized
+    
+    if apply:
+        if not set_path(optimized, scope):
+            return False
+        print(f"{BRIGHT_GREEN}Wrote optimized {scope} PATH.{RESET}")
+    else:
+        print(f"{BRIGHT_YELLOW}Dry run only. Re-run with --apply to write these changes.{RESET}")
     
-    directory = os.path.abspath(directory).lower()
-    return any(p.lower() == directory for p in path_dirs)
+    return optimized
 
 
 def _broadcast_environment_change():
     """Broadcast WM_SETTINGCHANGE message to notify other programs of environment changes."""
     try:
+        # Imported here so read-only commands such as --status don't load ctypes
+        import ctypes
         HWND_BROADCAST = 0xFFFF
         WM_SETTINGCHANGE = 0x001A
         SMTO_ABORTIFHUNG = 0x0002
         result = ctypes.c_long()
-        ctypes.windll.user32.SendMessageTimeoutW(
-            HWND_BROADCAST,
-            WM_SETTINGCHANGE,
-            0,
-            "Environment",
-            SMTO_ABORTIFHUNG,
-            5000,
-            ctypes.byref(result)
-        )
+        # Waits up to 5 seconds per top-level window that is slow to answer
+        with span('path.broadcast'), metrics.timed('broadcast_seconds'):
+            ctypes.windll.user32.SendMessageTimeoutW(
+                HWND_BROADCAST,
+                WM_SETTINGCHANGE,
+                0,
+                "Environment",
+                SMTO_ABORTIFHUNG,
+                5000,
+                ctypes.byref(result)
+            )
     except Exception:
         # Silently fail - not critical if broadcast doesn't work
         pass
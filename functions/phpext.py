@@ -0,0 +1,418 @@
+import os
+import re
+import json
+import time
+import struct
+import statistics
+import subprocess
+from .admin import is_admin
+from .broker import run_privileged
+from .config import get_user_cache_dir, load_config
+from .phpini import disable_extension, enable_extension, get_extensions, read_ini, write_ini
+from .runtimes import get_runtime, resolve_installed_dir
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BOLD = "\033[1m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+EXT_INDEX_FILE = 'php-extensions.json'
+# php -r "" runs per startup measurement; the median is reported
+STARTUP_RUNS = 5
+NAME_PATTERN = re.compile(r'^[a-z0-9_]+$')
+# PE data directory indexes
+EXPORT_DIRECTORY = 0
+IMPORT_DIRECTORY = 1
+DELAY_IMPORT_DIRECTORY = 13
+
+
+def read_pe_dependencies(path):
+    """
+    Read the imported DLLs and exported names of a PE file (a PHP extension DLL).
+
+    Only the headers, the section table and the import, delay-import and
+    export directories are parsed; the DLL is never loaded.
+
+    Args:
+        path (str): The DLL
+
+    Returns:
+        tuple: (imports, exports): DLL names in import order, exported function names
+
+    Raises:
+        ValueError: If the file is not a valid PE image
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        if data[:2] != b'MZ':
+            raise ValueError('no MZ header')
+        pe_offset = struct.unpack_from('<I', data, 0x3c)[0]
+        if data[pe_offset:pe_offset + 4] != b'PE\0\0':
+            raise ValueError('no PE signature')
+        section_count, optional_size = struct.unpack_from('<H12xH', data, pe_offset + 6)
+        optional = pe_offset + 24
+        magic = struct.unpack_from('<H', data, optional)[0]
+        if magic not in (0x10b, 0x20b):
+            raise ValueError(f"unknown optional header magic {magic:#x}")
+        # PE32 and PE32+ differ in the size of the fields before the data directories
+        directories = optional + (96 if magic == 0x10b else 112)
+        directory_count = struct.unpack_from('<I', data, directories - 4)[0]
+
+        sections = []
+        for index in range(section_count):
+            virtual_size, virtual_address, raw_size, raw_offset = struct.unpack_from('<IIII', data, optional + optional_size + 40 * index + 8)
+            sections.append((virtual_address, max(virtual_size, raw_size), raw_offset))
+
+        def directory(index):
+            return struct.unpack_from('<I', data, directories + 8 * index)[0] if index < directory_count else 0
+
+        def offset(rva):
+            for virtual_address, size, raw_offset in sections:
+                if virtual_address <= rva < virtual_address + size:
+                    return raw_offset + rva - virtual_address
+            raise ValueError(f"RVA {rva:#x} is outside every section")
+
+        def string(rva):
+            start = offset(rva)
+            return data[start:data.index(b'\0', start)].decode('ascii', 'replace')
+
+        imports = []
+        # IMAGE_IMPORT_DESCRIPTOR (20 bytes, name RVA at +12) and
+        # IMAGE_DELAYLOAD_DESCRIPTOR (32 bytes, name RVA at +4), both terminated by a zeroed entry
+        for index, size, name_field in ((IMPORT_DIRECTORY, 20, 12), (DELAY_IMPORT_DIRECTORY, 32, 4)):
+            rva = directory(index)
+            if not rva:
+                continue
+            position = offset(rva)
+            while True:
+                name_rva = struct.unpack_from('<I', data, position + name_field)[0]
+                if not name_rva:
+                    break
+                imports.append(string(name_rva))
+                position += size
+
+        exports = []
+        rva = directory(EXPORT_DIRECTORY)
+        if rva:
+            name_count, names_rva = struct.unpack_from('<I4xI', data, offset(rva) + 24)
+            names = offset(names_rva)
+            exports = [string(struct.unpack_from('<I', data, names + 4 * index)[0]) for index in range(name_count)]
+        return imports, exports
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"truncated PE image: {e}")
+
+
+def index_extensions(install_path):
+    """
+    Index the extension DLLs in a PHP installation's ext directory.
+
+    Parsed DLLs are cached per file size and modification time in the user
+    cache, so only new or changed DLLs are read again.
+
+    Args:
+        install_path (str): The PHP directory
+
+    Returns:
+        dict: Extension name -> {'dll', 'kind' ('extension' or 'zend_extension'),
+            'size', 'imports', 'error'}
+    """
+    ext_dir = os.path.join(install_path, 'ext')
+    cache_path = os.path.join(get_user_cache_dir(), EXT_INDEX_FILE)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except Exception:
+        cache = {}
+    key = os.path.normcase(os.path.abspath(ext_dir))
+    cached = cache.get(key, {})
+
+    index = {}
+    changed = False
+    try:
+        names = sorted(name for name in os.listdir(ext_dir) if name.lower().startswith('php_') and name.lower().endswith('.dll'))
+    except OSError:
+        names = []
+    for dll in names:
+        stat = os.stat(os.path.join(ext_dir, dll))
+        entry = cached.get(dll)
+        if not entry or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'imports': [], 'kind': 'extension', 'error': None}
+            try:
+                imports, exports = read_pe_dependencies(os.path.join(ext_dir, dll))
+                entry['imports'] = imports
+                # Zend extensions (opcache, xdebug) export zend_extension_entry, PHP extensions get_module
+                entry['kind'] = 'zend_extension' if 'zend_extension_entry' in exports else 'extension'
+            except (OSError, ValueError) as e:
+                entry['error'] = str(e)
+            changed = True
+        index[dll[len('php_'):-len('.dll')].lower()] = dict(entry, dll=dll)
+
+    if changed or set(cached) != set(names):
+        cache[key] = {entry['dll']: {k: v for k, v in entry.items() if k != 'dll'} for entry in index.values()}
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=4)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"{BRIGHT_YELLOW}Could not write extension index '{cache_path}': {e}{RESET}")
+    return index
+
+
+def classify_imports(install_path, imports):
+    """
+    Split an extension's imports into PHP extensions, bundled libraries and missing DLLs.
+
+    Libraries found in the PHP directory (libcrypto, libssh2, ...) are
+    bundled; the ones in System32 belong to Windows. A DLL found in neither
+    place would make the extension fail to load. Outside Windows there is no
+    System32 to check, so nothing is reported missing.
+
+    Returns:
+        tuple: (extension names, bundled DLLs, missing DLLs)
+    """
+    system_dir = os.path.join(os.environ.get('SystemRoot', r'C:\Windows'), 'System32')
+    check_system = os.path.isdir(system_dir)
+    local = {name.lower() for name in _listdir(install_path)}
+    extensions, bundled, missing = [], [], []
+    for name in imports:
+        lower = name.lower()
+        if re.fullmatch(r'php\d+(ts)?\.dll', lower):
+            continue  # The PHP core
+        if lower.startswith('php_') and lower.endswith('.dll'):
+            extensions.append(lower[len('php_'):-len('.dll')])
+        elif lower in local:
+            bundled.append(name)
+        elif check_system and not lower.startswith(('api-ms-win-', 'ext-ms-win-')) and not os.path.exists(os.path.join(system_dir, name)):
+            missing.append(name)
+    return extensions, bundled, missing
+
+
+def measure_startup(php_exe, runs=STARTUP_RUNS):
+    """
+    Measure how long php takes to start with the current php.ini.
+
+    Args:
+        php_exe (str): The PHP executable
+        runs (int): Number of runs of php -r ""
+
+    Returns:
+        tuple: (median milliseconds, startup warnings), or (None, [error]) if php cannot run
+    """
+    timings = []
+    warnings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        try:
+            process = subprocess.run([php_exe, '-r', ''], capture_output=True, text=True, timeout=30)
+        except (OSError, subprocess.SubprocessError) as e:
+            return None, [str(e)]
+        timings.append((time.perf_counter() - started) * 1000)
+        warnings = [line.strip() for line in (process.stdout + process.stderr).splitlines() if line.strip()]
+    return statistics.median(timings), warnings
+
+
+def get_php_install():
+    """Return (install directory, php executable) of the installed PHP, or (None, None) with an error printed."""
+    manifest = get_runtime('php')
+    install_path = resolve_installed_dir('php', manifest, load_config())
+    php_exe = os.path.join(install_path, manifest['exe'])
+    if not os.path.exists(php_exe):
+        print(f"{BRIGHT_RED}{manifest.get('label', 'PHP')} is not installed at '{install_path}'. Install it with --install php.{RESET}")
+        return None, None
+    return install_path, php_exe
+
+
+def list_extensions():
+    """
+    Print the extensions of the installed PHP with their state and dependencies (--php ext list).
+
+    Returns:
+        bool: True if PHP is installed
+    """
+    install_path, php_exe = get_php_install()
+    if install_path is None:
+        return False
+    index = index_extensions(install_path)
+    enabled = {name for _, name in get_extensions(read_ini(install_path) or [])}
+
+    print(f"{BOLD}{'Extension':16} {'Kind':15} {'State':9} {'Size':>8}  Dependencies{RESET}")
+    for name, entry in index.items():
+        state = f"{BRIGHT_GREEN}{'enabled':9}{RESET}" if name in enabled else f"{'disabled':9}"
+        if entry['error']:
+            print(f"{name:16} {'?':15} {state} {entry['size'] / 1024:>6.0f}KB  {BRIGHT_RED}unreadable: {entry['error']}{RESET}")
+            continue
+        extensions, bundled, missing = classify_imports(install_path, entry['imports'])
+        dependencies = ', '.join([f"php_{ext}" for ext in extensions] + bundled) or '-'
+        if missing:
+            dependencies += f" {BRIGHT_RED}missing: {', '.join(missing)}{RESET}"
+        print(f"{name:16} {entry['kind']:15} {state} {entry['size'] / 1024:>6.0f}KB  {dependencies}")
+    for name in sorted(enabled - set(index) - {'opcache'}):
+        print(f"{BRIGHT_YELLOW}{name:16} enabled in php.ini, but ext/php_{name}.dll does not exist{RESET}")
+
+    milliseconds, warnings = measure_startup(php_exe)
+    _print_startup('Startup', milliseconds, warnings)
+    return True
+
+
+def change_extensions(action, names):
+    """
+    Enable or disable extensions, or switch to a minimal profile (--php ext enable|disable|minimal).
+
+    Extensions that an enabled extension imports are enabled with it. The
+    startup time of php is measured before and after the change.
+
+    Args:
+        action (str): 'enable', 'disable' or 'minimal'
+        names (list): Extension names, or the profile name for 'minimal'
+
+    Returns:
+        bool: True if php.ini was updated
+    """
+    install_path, php_exe = get_php_install()
+    if install_path is None:
+        return False
+    index = index_extensions(install_path)
+    lines = read_ini(install_path)
+    if lines is None:
+        print(f"{BRIGHT_RED}'{install_path}' has no php.ini. Generate one with --php-profile.{RESET}")
+        return False
+    enabled = {name for _, name in get_extensions(lines)}
+
+    if action == 'minimal':
+        profiles = get_runtime('php').get('ext_profiles') or {}
+        if len(names) != 1 or names[0] not in profiles:
+            print(f"{BRIGHT_RED}Unknown extension profile '{','.join(names)}'. Available: {', '.join(profiles) or 'none'}{RESET}")
+            return False
+        wanted = [name for name in profiles[names[0]] if name in index]
+        skipped = [name for name in profiles[names[0]] if name not in index]
+        if skipped:
+            print(f"{BRIGHT_YELLOW}Not in this PHP build, skipping: {', '.join(skipped)}{RESET}")
+        enable = _with_dependencies(install_path, index, wanted)
+        # Built-in OPcache shows up as zend_extension=opcache only on PHP < 8.5, where it is kept
+        disable = sorted(enabled - set(enable) - {'opcache'})
+    else:
+        unknown = [name for name in names if name not in index]
+        if unknown:
+            print(f"{BRIGHT_RED}Unknown extension(s) {', '.join(unknown)}. Run --php ext list to see them.{RESET}")
+            return False
+        if action == 'enable':
+            enable, disable = _with_dependencies(install_path, index, names), []
+        else:
+            enable, disable = [], list(names)
+            for name in sorted(enabled - set(names)):
+                needed = classify_imports(install_path, index[name]['imports'])[0] if name in index else []
+                for dependency in set(needed) & set(names):
+                    print(f"{BRIGHT_YELLOW}{name} imports php_{dependency}.dll and will fail to load without it.{RESET}")
+
+    enable = [name for name in enable if name not in enabled]
+    disable = [name for name in disable if name in enabled]
+    if not enable and not disable:
+        print(f"{BRIGHT_GREEN}php.ini already has the requested extensions, nothing to change.{RESET}")
+        return True
+
+    before, _ = measure_startup(php_exe)
+    entries = [[name, index[name]['kind']] for name in enable]
+    if is_admin():
+        ok = set_extensions(install_path, entries, disable)
+    else:
+        ok = run_privileged('php_ext_set', enable=entries, disable=disable)
+    if not ok:
+        return False
+    if enable:
+        print(f"{BRIGHT_GREEN}Enabled: {', '.join(enable)}{RESET}")
+    if disable:
+        print(f"{BRIGHT_GREEN}Disabled: {', '.join(disable)}{RESET}")
+    after, warnings = measure_startup(php_exe)
+    if before is not None and after is not None:
+        print(f"{BRIGHT_CYAN}Startup (median of {STARTUP_RUNS} runs of php -r \"\"): {before:.1f} ms -> {after:.1f} ms "
+              f"({after - before:+.1f} ms){RESET}")
+    _print_startup(None, after, warnings)
+    return True
+
+
+def set_extensions(install_path, enable, disable):
+    """
+    Edit the extension lines of php.ini in place. Needs admin rights in Program Files.
+
+    Args:
+        install_path (str): The PHP directory
+        enable (list): [name, 'extension' or 'zend_extension'] pairs to load, in order
+        disable (list): Extension names to comment out
+
+    Returns:
+        bool: True if php.ini was written
+    """
+    lines = read_ini(install_path)
+    if lines is None:
+        print(f"{BRIGHT_RED}'{install_path}' has no php.ini.{RESET}")
+        return False
+    for name, kind in enable:
+        enable_extension(lines, name, kind)
+    for name in disable:
+        disable_extension(lines, name)
+    try:
+        write_ini(install_path, lines)
+    except OSError as e:
+        print(f"{BRIGHT_RED}Could not write php.ini in '{install_path}': {e}{RESET}")
+        return False
+    return True
+
+
+def manage_extensions(arguments):
+    """
+    Run a --php subcommand: ext list, ext enable <names>, ext disable <names> or ext minimal <profile>.
+
+    Args:
+        arguments (list): The words after --php, e.g. ['ext', 'enable', 'curl,mbstring']
+
+    Returns:
+        bool: True if successful
+    """
+    if arguments[:1] != ['ext'] or len(arguments) < 2 or arguments[1] not in ('list', 'enable', 'disable', 'minimal'):
+        print(f"{BRIGHT_RED}Usage: --php ext list | ext enable <names> | ext disable <names> | ext minimal <profile>{RESET}")
+        return False
+    if arguments[1] == 'list':
+        return list_extensions()
+    names = [name.strip().lower() for value in arguments[2:] for name in value.split(',') if name.strip()]
+    if not names:
+        print(f"{BRIGHT_RED}--php ext {arguments[1]} needs at least one name.{RESET}")
+        return False
+    return change_extensions(arguments[1], names)
+
+
+def _with_dependencies(install_path, index, names):
+    """Return names plus the extensions they import, dependencies first."""
+    ordered = []
+
+    def visit(name, seen):
+        if name in ordered or name in seen or name not in index:
+            return
+        for dependency in classify_imports(install_path, index[name]['imports'])[0]:
+            visit(dependency, seen | {name})
+        ordered.append(name)
+    for name in names:
+        visit(name, set())
+    return ordered
+
+
+def _print_startup(label, milliseconds, warnings):
+    if milliseconds is None:
+        print(f"{BRIGHT_RED}Could not run php to measure startup: {'; '.join(warnings)}{RESET}")
+        return
+    if label:
+        print(f"{BRIGHT_CYAN}{label} (median of {STARTUP_RUNS} runs of php -r \"\"): {milliseconds:.1f} ms{RESET}")
+    for line in warnings[:10]:
+        print(f"{BRIGHT_YELLOW}php: {line}{RESET}")
+
+
+def _listdir(path):
+    try:
+        return os.listdir(path)
+    except OSError:
+        return []
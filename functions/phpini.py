@@ -0,0 +1,242 @@
+import os
+import re
+import shutil
+from .admin import is_admin
+from .broker import run_privileged
+from .config import load_config
+from .runtimes import get_runtime, resolve_installed_dir
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+INI_FILE = 'php.ini'
+HEADER_PATTERN = re.compile(r"^; Generated by SyncWide Devtools from (\S+) with the '([^']+)' profile")
+EXTENSION_PATTERN = re.compile(r'^\s*(zend_extension|extension)\s*=\s*"?([^";]+?)"?\s*(?:;.*)?$', re.IGNORECASE)
+# Until PHP 8.5, OPcache is a separate php_opcache.dll that has to be loaded explicitly
+OPCACHE_DLL = os.path.join('ext', 'php_opcache.dll')
+
+
+def get_profiles():
+    """Return the php.ini profiles from runtimes.json: name -> {'base', 'settings'}."""
+    return (get_runtime('php') or {}).get('ini_profiles') or {}
+
+
+def read_ini(install_path):
+    """
+    Read the installed php.ini.
+
+    Returns:
+        list: Its lines without line endings, or None if there is none
+    """
+    try:
+        with open(os.path.join(install_path, INI_FILE), 'r', encoding='utf-8', errors='replace') as f:
+            return [line.rstrip('\r\n') for line in f]
+    except OSError:
+        return None
+
+
+def write_ini(install_path, lines):
+    """Replace php.ini atomically (with Windows line endings, like the templates)."""
+    ini_path = os.path.join(install_path, INI_FILE)
+    tmp_path = f"{ini_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='\r\n') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, ini_path)
+
+
+def get_applied_profile(lines):
+    """Return (base, profile) from the header of a generated php.ini, or (None, None)."""
+    match = HEADER_PATTERN.match(lines[0]) if lines else None
+    return match.groups() if match else (None, None)
+
+
+def format_value(value):
+    """Quote an ini value unless it is a plain number, size or word."""
+    return value if re.fullmatch(r'[A-Za-z0-9_.+-]+', value) else f'"{value}"'
+
+
+def set_directive(lines, key, value):
+    """
+    Set a php.ini directive in place.
+
+    The first active line for the key is replaced and any later ones are
+    commented out. Without an active line, the template's commented example
+    (e.g. ';opcache.enable=1') is replaced, so the setting stays next to its
+    documentation. Otherwise the directive is appended.
+    """
+    active = re.compile(rf'^\s*{re.escape(key)}\s*=', re.IGNORECASE)
+    commented = re.compile(rf'^\s*;\s*{re.escape(key)}\s*=', re.IGNORECASE)
+    line = f"{key} = {format_value(value)}"
+    matches = [index for index, existing in enumerate(lines) if active.match(existing)]
+    if matches:
+        lines[matches[0]] = line
+        for index in matches[1:]:
+            lines[index] = ';' + lines[index]
+        return
+    for index, existing in enumerate(lines):
+        if commented.match(existing):
+            lines[index] = line
+            return
+    lines.append(line)
+
+
+def get_extensions(lines):
+    """
+    List the extensions a php.ini loads.
+
+    Returns:
+        list: (directive, name) pairs, e.g. ('extension', 'curl') or ('zend_extension', 'opcache')
+    """
+    extensions = []
+    for line in lines:
+        match = EXTENSION_PATTERN.match(line)
+        if match:
+            extensions.append((match.group(1).lower(), extension_name(match.group(2))))
+    return extensions
+
+
+def extension_name(value):
+    """Normalize 'php_curl.dll', 'ext/php_curl.dll' or 'curl' to 'curl'."""
+    name = os.path.basename(value.strip().replace('\\', '/')).lower()
+    if name.endswith('.dll'):
+        name = name[:-len('.dll')]
+    return name[len('php_'):] if name.startswith('php_') else name
+
+
+def enable_extension(lines, name, directive='extension'):
+    """
+    Load an extension, uncommenting the template's ';extension=<name>' line if there is one.
+
+    Returns:
+        bool: False if it was already enabled
+    """
+    if (directive, name) in get_extensions(lines):
+        return False
+    for index, line in enumerate(lines):
+        stripped = line.lstrip()
+        if stripped.startswith(';'):
+            match = EXTENSION_PATTERN.match(stripped.lstrip(';'))
+            if match and match.group(1).lower() == directive and extension_name(match.group(2)) == name:
+                lines[index] = f"{directive}={name}"
+                return True
+    lines.append(f"{directive}={name}")
+    return True
+
+
+def disable_extension(lines, name):
+    """
+    Stop loading an extension by commenting out its lines.
+
+    Returns:
+        bool: False if it was not enabled
+    """
+    changed = False
+    for index, line in enumerate(lines):
+        match = EXTENSION_PATTERN.match(line)
+        if match and extension_name(match.group(2)) == name:
+            lines[index] = ';' + line.lstrip()
+            changed = True
+    return changed
+
+
+def build_ini(install_path, profile_name, profile, previous=None, preload=None):
+    """
+    Generate php.ini lines from a template and a profile.
+
+    Args:
+        install_path (str): The PHP directory
+        profile_name (str): The profile's name, recorded in the header
+        profile (dict): {'base': template file name, 'settings': {directive: value}}
+        previous (list): Lines of the php.ini being replaced; its extensions are kept
+        preload (str): Script for opcache.preload (ignored on Windows, where PHP does not support preloading)
+
+    Returns:
+        list: The php.ini lines, or None if the template is missing
+    """
+    template = os.path.join(install_path, profile['base'])
+    try:
+        with open(template, 'r', encoding='utf-8', errors='replace') as f:
+            lines = [line.rstrip('\r\n') for line in f]
+    except OSError as e:
+        print(f"{BRIGHT_RED}Could not read '{template}': {e}{RESET}")
+        return None
+
+    lines.insert(0, f"; Generated by SyncWide Devtools from {profile['base']} with the '{profile_name}' profile.")
+    lines.insert(1, "; Re-apply or switch profiles with 'main.py --php-profile <name>'; extension lines are kept.")
+    for key, value in profile['settings'].items():
+        set_directive(lines, key, value.replace('{install}', install_path))
+    if os.path.exists(os.path.join(install_path, OPCACHE_DLL)):
+        enable_extension(lines, 'opcache', 'zend_extension')
+    if preload:
+        if os.name == 'nt':
+            print(f"{BRIGHT_YELLOW}PHP does not support opcache.preload on Windows, ignoring '{preload}'.{RESET}")
+        else:
+            set_directive(lines, 'opcache.preload', preload)
+    for directive, name in get_extensions(previous or []):
+        enable_extension(lines, name, directive)
+    return lines
+
+
+def apply_profile(install_path, profile_name=None, cfg=None):
+    """
+    Write php.ini for an installed PHP from one of the manifest's profiles.
+
+    php.ini is regenerated from the profile's template every time, so
+    switching profiles leaves nothing of the previous one behind. The
+    extensions the old php.ini loaded are kept, and a php.ini that was not
+    generated by SyncWide Devtools is saved as php.ini.bak first.
+
+    Args:
+        install_path (str): The PHP directory
+        profile_name (str): Profile name, defaults to the manifest's ini_profile
+        cfg (dict): The loaded configuration (for php_preload), defaults to load_config()
+
+    Returns:
+        bool: True if php.ini was written
+    """
+    profiles = get_profiles()
+    profile_name = profile_name or (get_runtime('php') or {}).get('ini_profile')
+    if profile_name not in profiles:
+        print(f"{BRIGHT_RED}Unknown php.ini profile '{profile_name}'. Available: {', '.join(profiles) or 'none'}{RESET}")
+        return False
+    if cfg is None:
+        cfg = load_config()
+
+    previous = read_ini(install_path)
+    ini_path = os.path.join(install_path, INI_FILE)
+    lines = build_ini(install_path, profile_name, profiles[profile_name], previous, cfg.get('php_preload'))
+    if lines is None:
+        return False
+    try:
+        if previous is not None and get_applied_profile(previous) == (None, None):
+            shutil.copyfile(ini_path, ini_path + '.bak')
+            print(f"{BRIGHT_YELLOW}Saved the existing php.ini as '{ini_path}.bak'.{RESET}")
+        write_ini(install_path, lines)
+    except OSError as e:
+        print(f"{BRIGHT_RED}Could not write '{ini_path}': {e}{RESET}")
+        return False
+    print(f"{BRIGHT_GREEN}Wrote '{ini_path}' from {profiles[profile_name]['base']} with the '{profile_name}' profile.{RESET}")
+    return True
+
+
+def apply_installed_profile(profile_name):
+    """
+    Re-apply a php.ini profile to the installed PHP (main.py --php-profile).
+
+    Returns:
+        bool: True if php.ini was written
+    """
+    if not is_admin():
+        return bool(run_privileged('php_profile', profile=profile_name))
+    manifest = get_runtime('php')
+    cfg = load_config()
+    install_path = resolve_installed_dir('php', manifest, cfg)
+    if not os.path.exists(os.path.join(install_path, manifest['exe'])):
+        print(f"{BRIGHT_RED}{manifest.get('label', 'PHP')} is not installed at '{install_path}'. Install it with --install php.{RESET}")
+        return False
+    print(f"{BRIGHT_CYAN}Applying the '{profile_name}' php.ini profile to '{install_path}'...{RESET}")
+    return apply_profile(install_path, profile_name, cfg)
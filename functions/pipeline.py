@@ -0,0 +1,840 @@
+import os
+import glob
+import time
+import hashlib
+import fnmatch
+import shutil
+import zipfile
+import tempfile
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from . import metrics, wheelhouse
+from .admin import is_admin
+from .broker import get_broker, run_privileged
+from .config import find_config_path, load_config, save_config, get_artifact_dir, get_user_cache_dir
+from .download import download_file, sha256_file
+from .journal import clear_journal, fingerprint, get_journal_path, load_journal, save_journal
+from .path import get_path, is_within, set_path
+from .phpini import apply_profile
+from .releases import get_release, resolve_version
+from .runtimes import apply_mode, get_runtime, is_managed_dir, load_runtimes, render, resolve_install_path, resolve_installed_dir
+from .shims import update_shims
+from .trace import span
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+
+def prepare_install(name, version=None, cfg=None, config_path=None, mode=None, precompile=True, requirements=None,
+                    ini_profile=None):
+    """
+    Build the install context shared by every pipeline stage.
+
+    Args:
+        name (str): Runtime name (e.g. 'python', 'php')
+        version (str): Version to install, defaults to the manifest version
+        cfg (dict): The loaded configuration, defaults to load_config()
+        config_path (str): Config file, defaults to find_config_path()
+        mode (str): Install mode from the manifest's 'modes' (e.g. 'portable'),
+            None for the default install
+        precompile (bool): Compile the manifest's 'precompile' directories to bytecode
+        requirements (str): pip requirements file to install after the runtime (--with)
+        ini_profile (str): php.ini profile for runtimes with 'ini_profiles' (--php-profile),
+            defaults to the manifest's ini_profile
+
+    Returns:
+        dict: The install context, or None if the runtime or mode is unknown
+    """
+    manifest = get_runtime(name)
+    if manifest is None:
+        print(f"{BRIGHT_RED}Unknown runtime '{name}'. Available: {', '.join(load_runtimes())}{RESET}")
+        return None
+    if mode:
+        modes = ', '.join(manifest.get('modes') or {}) or 'none'
+        manifest = apply_mode(manifest, mode)
+        if manifest is None:
+            print(f"{BRIGHT_RED}{get_runtime(name).get('label', name)} has no '{mode}' install mode. Available: {modes}{RESET}")
+            return None
+
+    config_path = config_path or find_config_path()
+    if cfg is None:
+        cfg = load_config(config_path)
+    version = version or manifest['version']
+
+    # The manifest's checksum only applies to the manifest's version. Other releases, and the
+    # manifest's version if it has no checksum, take the URL and checksum the release index
+    # publishes (PHP's releases.json)
+    pinned = manifest.get('sha256') if version == manifest['version'] else None
+    release = {} if mode or pinned else get_release(name.lower(), version)
+    url = release.get('url') or render(manifest['url'], version)
+    sha256 = pinned or release.get('sha256')
+    # Unelevated runs download into the user's cache; the broker copies the
+    # artifact into the protected cache before installing it
+    artifact_dir = get_artifact_dir(cfg) if is_admin() else os.path.join(get_user_cache_dir(), 'artifacts')
+    try:
+        os.makedirs(artifact_dir, exist_ok=True)
+    except Exception as e:
+        print(f"{BRIGHT_YELLOW}Could not create artifact cache '{artifact_dir}': {e}. Using the temp directory.{RESET}")
+        artifact_dir = os.path.join(tempfile.gettempdir(), 'sw-devtools')
+        os.makedirs(artifact_dir, exist_ok=True)
+
+    pip_wheel = manifest.get('pip_wheel')
+    return {
+        'name': name.lower(),
+        'quiet': False,
+        'label': manifest.get('label', name),
+        'manifest': manifest,
+        'mode': mode,
+        'version': version,
+        'cfg': dict(cfg),
+        'config_path': config_path,
+        'url': url,
+        'sha256': sha256,
+        'artifact_dir': artifact_dir,
+        'artifact': os.path.join(artifact_dir, os.path.basename(url.split('?')[0])),
+        'install_path': resolve_install_path(name.lower(), manifest, cfg, version),
+        'pip_wheel': os.path.join(artifact_dir, os.path.basename(pip_wheel['url'])) if pip_wheel else None,
+        'precompile': precompile,
+        'requirements': requirements,
+        'ini_profile': ini_profile or manifest.get('ini_profile'),
+        'journal_path': get_journal_path(name.lower(), version, mode),
+        'timings': {},
+    }
+
+
+def stage_fetch(ctx):
+    """Download the runtime artifact (and pip wheel, if any) into the artifact cache unless already there."""
+    mirror = ctx['cfg'].get('cache_mirror')
+    if not _fetch(ctx['label'], ctx['url'], ctx['artifact'], show_progress=not ctx['quiet'], mirror=mirror, sha256=ctx['sha256']):
+        return False
+    if ctx['pip_wheel']:
+        pip_wheel = ctx['manifest']['pip_wheel']
+        return _fetch('pip', pip_wheel['url'], ctx['pip_wheel'], show_progress=not ctx['quiet'], mirror=mirror,
+                      sha256=pip_wheel.get('sha256'))
+    return True
+
+
+def stage_verify(ctx):
+    """Check the artifact and pip wheel against their published sha256."""
+    allow_unverified = ctx['cfg'].get('allow_unverified_downloads', False)
+    if not _verify(ctx['artifact'], ctx['sha256'], allow_unverified):
+        return False
+    return not ctx['pip_wheel'] or _verify(ctx['pip_wheel'], ctx['manifest']['pip_wheel'].get('sha256'), allow_unverified)
+
+
+def stage_extract(ctx):
+    """Extract the archive or run the installer into the install directory."""
+    if not is_admin():
+        # The broker resolves the artifact, checksum and directory itself, and also runs
+        # stage_bootstrap and stage_compile, since they write into the install directory
+        return run_privileged('install_artifact', name=ctx['name'], version=ctx['version'], mode=ctx['mode'],
+                              precompile=ctx['precompile'], ini_profile=ctx['ini_profile'])
+    manifest = ctx['manifest']
+    install_path = ctx['install_path']
+
+    # Ensure the install directory exists (installer will usually create it, but report to user)
+    try:
+        if not os.path.exists(install_path):
+            os.makedirs(install_path, exist_ok=True)
+            print(f"{BRIGHT_GREEN}Created install directory at '{install_path}'.{RESET}")
+        else:
+            print(f"{BRIGHT_YELLOW}Install directory already exists at '{install_path}'.{RESET}")
+    except Exception as e:
+        print(f"{BRIGHT_YELLOW}Could not create install directory '{install_path}': {e}{RESET}")
+
+    print(f"{BRIGHT_GREEN}Starting {ctx['label']} installation to '{install_path}'...{RESET}")
+    if not _install_artifact(ctx['artifact'], manifest['archive'], install_path, manifest.get('installer_args', ''), ctx['version']):
+        return False
+
+    if _has_expected_files(install_path, manifest.get('expect_any')):
+        print(f"{BRIGHT_GREEN}{ctx['label']} installed successfully at '{install_path}'.{RESET}")
+        return True
+
+    fallback = manifest.get('fallback')
+    if not fallback:
+        print(f"{BRIGHT_RED}Target install directory appears empty or missing {ctx['label']} files.{RESET}")
+        return False
+
+    print(f"{BRIGHT_YELLOW}Target install directory appears empty or missing {ctx['label']} files. Falling back to {fallback['archive']} installation...{RESET}")
+    fallback_url = render(fallback['url'], ctx['version'])
+    fallback_artifact = os.path.join(ctx['artifact_dir'], os.path.basename(fallback_url.split('?')[0]))
+    if not _fetch(ctx['label'], fallback_url, fallback_artifact, show_progress=not ctx['quiet'], mirror=ctx['cfg'].get('cache_mirror'), sha256=fallback.get('sha256')) or not _verify(fallback_artifact, fallback.get('sha256'), ctx['cfg'].get('allow_unverified_downloads', False)):
+        return False
+    if not _install_artifact(fallback_artifact, fallback['archive'], install_path, fallback.get('installer_args', ''), ctx['version']):
+        return False
+    print(f"{BRIGHT_GREEN}{ctx['label']} extracted to '{install_path}'.{RESET}")
+    return True
+
+
+def stage_bootstrap(ctx):
+    """
+    Make the extracted runtime ready to use.
+
+    Modes with a pip_wheel get site-packages enabled and pip installed into
+    the embeddable Python. Runtimes with ini_profiles (PHP) get their ini
+    file generated from the selected profile.
+    """
+    if not is_admin():
+        return True  # Already done by the broker in stage_extract
+    if ctx['pip_wheel']:
+        with span('bootstrap.pip', wheel=os.path.basename(ctx['pip_wheel'])) as attrs:
+            attrs['files'] = _bootstrap_pip(ctx['install_path'], ctx['pip_wheel'])
+        if attrs['files'] is None:
+            return False
+        print(f"{BRIGHT_GREEN}Enabled site-packages and installed pip from '{os.path.basename(ctx['pip_wheel'])}'.{RESET}")
+    if ctx['manifest'].get('ini_profiles'):
+        with span('bootstrap.ini', profile=ctx['ini_profile']):
+            if not apply_profile(ctx['install_path'], ctx['ini_profile'], ctx['cfg']):
+                return False
+    return True
+
+
+def stage_compile(ctx):
+    """
+    Compile the manifest's 'precompile' directories (e.g. Python's Lib) to bytecode.
+
+    Without this, the first import of every module compiles it, which slows
+    down the first job on a fresh machine. The installed interpreter runs
+    compileall itself, so the bytecode matches its version, with one worker
+    per CPU. Files whose .pyc is up to date are skipped.
+    """
+    directories = [os.path.join(ctx['install_path'], d) for d in ctx['manifest'].get('precompile') or []]
+    directories = [d for d in directories if os.path.isdir(d)]
+    if not directories or not ctx['precompile'] or not is_admin():
+        return True  # Nothing to do, opted out, or already done by the broker in stage_extract
+    exe_path = os.path.join(ctx['install_path'], ctx['manifest']['exe'])
+    if not os.path.exists(exe_path):
+        print(f"{BRIGHT_YELLOW}'{exe_path}' not found, skipping bytecode precompilation.{RESET}")
+        return True
+
+    print(f"{BRIGHT_CYAN}Precompiling {', '.join(os.path.relpath(d, ctx['install_path']) for d in directories)} to bytecode...{RESET}")
+    started = time.perf_counter()
+    try:
+        with span('compile.bytecode', directories=len(directories)) as attrs:
+            process = subprocess.run([exe_path, '-m', 'compileall', '-q', '-j', '0', *directories],
+                                     stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            attrs['returncode'] = process.returncode
+    except OSError as e:
+        print(f"{BRIGHT_YELLOW}Could not run '{exe_path}' to precompile bytecode: {e}{RESET}")
+        return True
+    seconds = time.perf_counter() - started
+    failed = [line[len('*** Error compiling '):].strip(" '.") for line in process.stdout.splitlines()
+              if line.startswith('*** Error compiling')]
+    if process.returncode != 0 and failed:
+        # Files that do not compile (e.g. test data with deliberate syntax errors) just get no .pyc
+        print(f"{BRIGHT_YELLOW}Precompiled bytecode in {seconds:.1f}s; {len(failed)} file(s) could not be compiled, "
+              f"e.g. '{failed[0]}'.{RESET}")
+    elif process.returncode != 0:
+        print(f"{BRIGHT_YELLOW}Bytecode precompilation failed after {seconds:.1f}s: {process.stdout.strip()[-500:]}{RESET}")
+    else:
+        print(f"{BRIGHT_GREEN}Precompiled bytecode in {seconds:.1f}s.{RESET}")
+    return True
+
+
+def stage_packages(ctx):
+    """
+    Install the --with requirements file's packages from the shared wheelhouse.
+
+    The wheels are resolved and cached by content in the artifact cache, so
+    every further install of the same requirements (on this machine, or on
+    one sharing the cache mirror) installs with pip --no-index.
+    """
+    if not ctx['requirements']:
+        return True
+    if ctx['manifest'].get('packages') != 'pip':
+        print(f"{BRIGHT_YELLOW}{ctx['label']} has no package manager, ignoring '{ctx['requirements']}'.{RESET}")
+        return True
+    exe_path = os.path.join(ctx['install_path'], ctx['manifest']['exe'])
+    house = wheelhouse.get_wheelhouse(ctx['artifact_dir'])
+    wheels = wheelhouse.provision_wheels(exe_path, ctx['requirements'], house, f"{ctx['name']}-{ctx['version']}",
+                                         index_url=ctx['cfg'].get('pip_index_url'), mirror=ctx['cfg'].get('cache_mirror'))
+    if wheels is None:
+        return False
+    if not is_admin():
+        # The broker copies the wheels into the protected wheelhouse and checks them before pip runs elevated
+        return run_privileged('install_wheels', name=ctx['name'], version=ctx['version'], mode=ctx['mode'],
+                              wheels=[[wheel['path'], wheel['sha256'], wheel['name'], wheel['version']] for wheel in wheels])
+    return wheelhouse.install_wheels(exe_path, house, wheels)
+
+
+def stage_path(ctx):
+    """Point the shared shims directory at the new runtime."""
+    if not is_admin():
+        # The broker records the runtime and writes the config in one step
+        return run_privileged('commit_runtimes', runtimes=[[ctx['name'], ctx['version'], ctx['mode']]])
+    _record_runtime(ctx, ctx['cfg'])
+    return update_shims(ctx['cfg'])
+
+
+def stage_config(ctx):
+    """Write the runtime's executable path into the configuration file."""
+    if not is_admin():
+        return True  # Already written by the broker in stage_path
+    config_key = ctx['manifest']['config_key']
+    # Re-read the config so keys written by other commands in the meantime are kept
+    config_data = load_config(ctx['config_path'])
+    config_data[config_key] = ctx['cfg'][config_key]
+    if not save_config(config_data, ctx['config_path']):
+        return False
+    print(f"{BRIGHT_GREEN}Wrote '{config_key}' to config at '{ctx['config_path'] or find_config_path() or 'default location'}'.{RESET}")
+    return True
+
+
+# Install stages in execution order
+STAGES = (
+    ('fetch', stage_fetch),
+    ('verify', stage_verify),
+    ('extract', stage_extract),
+    ('bootstrap', stage_bootstrap),
+    ('compile', stage_compile),
+    ('packages', stage_packages),
+    ('path', stage_path),
+    ('config', stage_config),
+)
+
+STAGE_NAMES = [stage_name for stage_name, _ in STAGES]
+
+# Stages install_many runs per runtime; PATH and config are committed once for all of them
+DOWNLOAD_STAGES = STAGES[:2]
+INSTALL_STAGES = STAGES[2:6]
+
+
+def run_pipeline(ctx, stages=STAGES):
+    """
+    Run install stages in order, stopping at the first one that fails.
+
+    Every completed stage is checkpointed in the install's journal. If an
+    earlier run of the same install stopped partway, the stages it completed
+    are skipped as long as what they produced is still in place (the same
+    artifact, the runtime's files), and the run resumes at the first
+    incomplete stage.
+
+    Args:
+        ctx (dict): The install context from prepare_install
+        stages (tuple): (name, function) pairs; each function takes the context
+            and returns True on success
+
+    Returns:
+        bool: True if every stage succeeded
+    """
+    journal = _get_journal(ctx)
+    skipped = []
+    for index, (stage_name, stage) in enumerate(stages):
+        if len(skipped) == index and _stage_completed(ctx, journal, stage_name):
+            skipped.append(stage_name)
+            continue
+        if len(skipped) == index:
+            # This stage and every later one run again, so their old checkpoints no longer hold
+            for name in STAGE_NAMES[STAGE_NAMES.index(stage_name):]:
+                journal['stages'].pop(name, None)
+            if skipped:
+                metrics.inc('install_resumes_total', runtime=ctx['name'], stage=stage_name)
+                print(f"{BRIGHT_CYAN}Resuming {ctx['label']} {ctx['version']} at stage '{stage_name}'; "
+                      f"{', '.join(skipped)} completed in an earlier run (--restart for a clean run).{RESET}")
+        started = time.perf_counter()
+        with span(f"install.{stage_name}", runtime=ctx['name'], version=ctx['version']) as attrs:
+            try:
+                ok = stage(ctx)
+            except Exception as e:
+                print(f"{BRIGHT_RED}An error occurred during {ctx['label']} installation ({stage_name}): {e}{RESET}")
+                ok = False
+            attrs['ok'] = bool(ok)
+        ctx['timings'][stage_name] = time.perf_counter() - started
+        metrics.observe('install_stage_seconds', ctx['timings'][stage_name], runtime=ctx['name'], stage=stage_name)
+        if not ok:
+            print(f"{BRIGHT_RED}{ctx['label']} installation stopped at stage '{stage_name}'.{RESET}")
+            return False
+        journal['stages'][stage_name] = {'at': time.time(), 'state': _stage_state(ctx, stage_name)}
+        save_journal(ctx['journal_path'], journal)
+    if skipped and len(skipped) == len(stages):
+        print(f"{BRIGHT_CYAN}{ctx['label']} {ctx['version']}: {', '.join(skipped)} completed in an earlier run.{RESET}")
+    return True
+
+
+def install_runtime(name, version=None, mode=None, precompile=True, requirements=None, ini_profile=None, restart=False):
+    """
+    Install a runtime described in runtimes.json.
+
+    Args:
+        name (str): Runtime name (e.g. 'python', 'php')
+        version (str): Version to install, defaults to the manifest version
+        mode (str): Install mode (e.g. 'portable'), None for the default install
+        precompile (bool): Precompile the runtime's bytecode after installing (--no-compile turns it off)
+        requirements (str): pip requirements file to install into the runtime (--with)
+        ini_profile (str): php.ini profile for PHP (--php-profile), defaults to the manifest's
+        restart (bool): Discard the journal of an interrupted install and run every stage (--restart)
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if get_runtime(name) is None:
+        print(f"{BRIGHT_RED}Unknown runtime '{name}'. Available: {', '.join(load_runtimes())}{RESET}")
+        return False
+    if mode and apply_mode(get_runtime(name), mode) is None:
+        prepare_install(name, mode=mode)  # Reports the available modes
+        return False
+    if not _ensure_privileges():
+        return False
+
+    ctx = prepare_install(name, version, mode=mode, precompile=precompile, requirements=requirements, ini_profile=ini_profile)
+    if ctx is None:
+        return False
+    if restart:
+        clear_journal(ctx['journal_path'])
+    mode_note = f" ({mode})" if mode else ''
+    print(f"{BRIGHT_CYAN}Installing {ctx['label']} {ctx['version']}{mode_note} to '{ctx['install_path']}'...{RESET}")
+    ok = run_pipeline(ctx)
+    if ok:
+        clear_journal(ctx['journal_path'])
+    _record_install(ctx, ok)
+    timings = ', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in ctx['timings'].items())
+    print(f"{BRIGHT_CYAN}Stage timings: {timings}{RESET}")
+    return ok
+
+
+def parse_runtime_list(value):
+    """
+    Split a comma-separated --install/--uninstall argument into runtime names.
+
+    Args:
+        value (str): e.g. 'python' or 'python@3.13,php@latest'
+
+    Returns:
+        list: Unique runtime names in the given order, without version specs
+    """
+    names = []
+    for name in value.split(','):
+        name = name.split('@', 1)[0].strip().lower()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def resolve_install_versions(value):
+    """
+    Resolve the version specs of an --install argument against the release index.
+
+    Args:
+        value (str): e.g. 'python@3.13.7,php@latest'; runtimes without '@' get the manifest version
+
+    Returns:
+        dict: Runtime name -> exact version, or None if a spec could not be resolved
+    """
+    versions = {}
+    for item in value.split(','):
+        name, _, spec = item.partition('@')
+        name = name.strip().lower()
+        if not spec.strip() or get_runtime(name) is None:
+            continue
+        version = resolve_version(name, spec)
+        if version is None:
+            return None
+        versions[name] = version
+    return versions
+
+
+def install_many(names, install_workers=1, versions=None, mode=None, precompile=True, requirements=None, ini_profile=None,
+                 restart=False):
+    """
+    Install several runtimes with overlapping download and install stages.
+
+    All downloads start at once. Each runtime moves to the install stage as
+    soon as its download is verified. The install stage is bounded by
+    install_workers, because installers such as the Python MSI must not run
+    concurrently. Elevation is requested once (through the broker when not
+    elevated), and the PATH/shims and config updates are committed once at
+    the end for every runtime that installed.
+
+    Args:
+        names (list): Runtime names to install
+        install_workers (int): Maximum number of concurrent install stages
+        versions (dict): Runtime name -> version, defaults to the manifest versions
+        mode (str): Install mode for the runtimes that define it (e.g. 'portable');
+            the others get their default install
+        precompile (bool): Precompile bytecode after installing
+        requirements (str): pip requirements file for the runtimes with a package manager (--with)
+        ini_profile (str): php.ini profile for PHP (--php-profile)
+        restart (bool): Discard the journals of interrupted installs and run every stage (--restart)
+
+    Returns:
+        bool: True if every runtime was installed
+    """
+    unknown = [name for name in names if get_runtime(name) is None]
+    if unknown:
+        print(f"{BRIGHT_RED}Unknown runtime(s) {', '.join(unknown)}. Available: {', '.join(load_runtimes())}{RESET}")
+        return False
+    if not _ensure_privileges():
+        return False
+
+    modes = {}
+    for name in names:
+        if mode and apply_mode(get_runtime(name), mode) is None:
+            print(f"{BRIGHT_YELLOW}{get_runtime(name).get('label', name)} has no '{mode}' install mode, using the default install.{RESET}")
+        else:
+            modes[name] = mode
+    with_packages = [name for name in names if get_runtime(name).get('packages')]
+    if requirements and not with_packages:
+        print(f"{BRIGHT_YELLOW}None of {', '.join(names)} has a package manager, ignoring '{requirements}'.{RESET}")
+
+    config_path = find_config_path()
+    cfg = load_config(config_path)
+    ctxs = [prepare_install(name, (versions or {}).get(name), cfg=cfg, config_path=config_path, mode=modes.get(name), precompile=precompile,
+                            requirements=requirements if name in with_packages else None, ini_profile=ini_profile) for name in names]
+    for ctx in ctxs:
+        # Concurrent progress bars would overwrite each other
+        ctx['quiet'] = True
+        if restart:
+            clear_journal(ctx['journal_path'])
+        print(f"{BRIGHT_CYAN}Queued {ctx['label']} {ctx['version']} for '{ctx['install_path']}'.{RESET}")
+
+    started = time.perf_counter()
+    installed = []
+    with ThreadPoolExecutor(max_workers=len(ctxs)) as downloads, \
+            ThreadPoolExecutor(max_workers=max(1, install_workers)) as installs:
+        download_futures = {downloads.submit(run_pipeline, ctx, DOWNLOAD_STAGES): ctx for ctx in ctxs}
+        install_futures = {}
+        for future in as_completed(download_futures):
+            ctx = download_futures[future]
+            if future.result():
+                install_futures[installs.submit(run_pipeline, ctx, INSTALL_STAGES)] = ctx
+        for future in as_completed(install_futures):
+            if future.result():
+                installed.append(install_futures[future])
+
+    # One PATH/shims and config commit for everything that installed
+    commit_started = time.perf_counter()
+    if installed:
+        with span('install.commit', runtimes=len(installed)):
+            if is_admin():
+                committed = commit_runtimes(installed, config_path)
+            else:
+                committed = run_privileged('commit_runtimes', runtimes=[[ctx['name'], ctx['version'], ctx['mode']] for ctx in installed])
+        if committed:
+            for ctx in installed:
+                clear_journal(ctx['journal_path'])
+    commit_seconds = time.perf_counter() - commit_started
+
+    for ctx in ctxs:
+        _record_install(ctx, ctx in installed)
+
+    print(f"\n{BRIGHT_CYAN}Stage timings:{RESET}")
+    for ctx in ctxs:
+        timings = ', '.join(f"{stage} {seconds:.1f}s" for stage, seconds in ctx['timings'].items())
+        state = f"{BRIGHT_GREEN}installed{RESET}" if ctx in installed else f"{BRIGHT_RED}failed{RESET}"
+        print(f"  {ctx['label']}: {state} ({timings})")
+    print(f"  PATH/config commit: {commit_seconds:.1f}s")
+    print(f"  Total: {time.perf_counter() - started:.1f}s")
+    return len(installed) == len(ctxs)
+
+
+def commit_runtimes(ctxs, config_path=None):
+    """
+    Record installed runtimes in the config, regenerate the shims and save.
+
+    Args:
+        ctxs (list): Install contexts of the runtimes that installed
+        config_path (str): Config file, defaults to find_config_path()
+
+    Returns:
+        bool: True if the config was written
+    """
+    config_data = load_config(config_path)
+    for ctx in ctxs:
+        _record_runtime(ctx, config_data)
+    update_shims(config_data)
+    if not save_config(config_data, config_path):
+        return False
+    keys = ', '.join(f"'{ctx['manifest']['config_key']}'" for ctx in ctxs)
+    print(f"{BRIGHT_GREEN}Wrote {keys} to config.{RESET}")
+    return True
+
+
+def uninstall_runtime(name):
+    """
+    Uninstall a runtime installed by SyncWide Devtools.
+
+    - Determines the installed directory from config (or defaults).
+    - Removes the directory and files.
+    - Removes the directory from the system PATH registry value and broadcasts change.
+    - Removes the runtime's config key and its shims.
+
+    Args:
+        name (str): Runtime name (e.g. 'python', 'php')
+
+    A directory that is not a managed location of the runtime is left alone,
+    and so are its PATH entries and config key.
+
+    Returns:
+        bool: True if the runtime's directory is gone, False if it was refused or could not be removed
+    """
+    manifest = get_runtime(name)
+    if manifest is None:
+        print(f"{BRIGHT_RED}Unknown runtime '{name}'. Available: {', '.join(load_runtimes())}{RESET}")
+        return False
+    if not is_admin():
+        return bool(run_privileged('uninstall', name=name))
+
+    label = manifest.get('label', name)
+    config_key = manifest['config_key']
+    print(f"{BRIGHT_CYAN}Starting uninstall of SyncWide-managed {label}...{RESET}")
+    started = time.perf_counter()
+    removed = True
+
+    config_path = find_config_path()
+    cfg = load_config(config_path)
+    target_dir = resolve_installed_dir(name.lower(), manifest, cfg)
+    print(f"{BRIGHT_CYAN}Resolved target uninstall directory: {target_dir}{RESET}")
+
+    if not os.path.exists(target_dir):
+        print(f"{BRIGHT_YELLOW}Target directory does not exist: {target_dir}. Nothing to remove.{RESET}")
+    elif not is_managed_dir(name.lower(), manifest, cfg, target_dir):
+        # Only delete a directory this runtime could have been installed to, whatever the config says
+        print(f"{BRIGHT_RED}Refusing to delete '{target_dir}': it is not a {label} directory under the install root "
+              f"or the manifest's default location.{RESET}")
+        metrics.inc('uninstalls_total', runtime=name.lower(), result='refused')
+        return False
+    else:
+        try:
+            print(f"{BRIGHT_CYAN}Removing directory '{target_dir}'...{RESET}")
+            shutil.rmtree(target_dir)
+            print(f"{BRIGHT_GREEN}Removed '{target_dir}'.{RESET}")
+        except Exception as e:
+            print(f"{BRIGHT_RED}Failed to remove '{target_dir}': {e}{RESET}")
+            removed = False
+
+    # Remove PATH entries equal to or inside target_dir left by older installs
+    path_dirs = get_path('system')
+    if path_dirs is not None:
+        kept = [p for p in path_dirs if not is_within(p, target_dir)]
+        if len(kept) != len(path_dirs):
+            if set_path(kept, 'system'):
+                print(f"{BRIGHT_GREEN}Removed '{target_dir}' from system PATH.{RESET}")
+        else:
+            print(f"{BRIGHT_YELLOW}No PATH entries matched '{target_dir}'.{RESET}")
+
+    # Remove the config key (if present)
+    if config_key in cfg:
+        del cfg[config_key]
+        if save_config(cfg, config_path):
+            print(f"{BRIGHT_GREEN}Removed '{config_key}' from config.{RESET}")
+    else:
+        print(f"{BRIGHT_YELLOW}No '{config_key}' key found in config to remove.{RESET}")
+
+    # Drop the runtime's shims now that it is gone
+    update_shims(cfg)
+
+    metrics.inc('uninstalls_total', runtime=name.lower(), result='ok' if removed else 'partial')
+    metrics.observe('uninstall_seconds', time.perf_counter() - started, runtime=name.lower())
+    if not removed:
+        print(f"{BRIGHT_RED}Uninstall of {label} is incomplete: '{target_dir}' is still there (see messages above).{RESET}")
+        return False
+    print(f"{BRIGHT_GREEN}Uninstall completed (see messages above).{RESET}")
+    return True
+
+
+def _record_install(ctx, ok):
+    """Count an install and its total stage time."""
+    mode = ctx['mode'] or 'default'
+    metrics.inc('installs_total', runtime=ctx['name'], mode=mode, result='ok' if ok else 'failed')
+    metrics.observe('install_seconds', sum(ctx['timings'].values()), runtime=ctx['name'], mode=mode)
+
+
+def _get_journal(ctx):
+    """Load the install's journal once per context; it is discarded if the install's inputs changed."""
+    if 'journal' not in ctx:
+        requirements_digest = None
+        if ctx['requirements']:
+            try:
+                with open(ctx['requirements'], 'rb') as f:
+                    requirements_digest = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                pass
+        key = fingerprint([ctx['url'], ctx['sha256'], ctx['install_path'], ctx['mode'], ctx['precompile'],
+                           ctx['requirements'], requirements_digest, ctx['ini_profile']])
+        ctx['journal'] = load_journal(ctx['journal_path'], key)
+    return ctx['journal']
+
+
+def _stage_state(ctx, stage_name):
+    """
+    Describe what a stage left behind, cheaply enough to check before skipping it.
+
+    Downloads are identified by size and modification time, so a replaced or
+    truncated artifact is fetched and verified again. The install stages
+    require the runtime's expected files, so a deleted install directory is
+    installed again.
+    """
+    if stage_name in ('fetch', 'verify'):
+        state = {}
+        for path in filter(None, [ctx['artifact'], ctx['pip_wheel']]):
+            try:
+                stat = os.stat(path)
+                state[path] = [stat.st_size, stat.st_mtime_ns]
+            except OSError:
+                state[path] = None
+        return state
+    if stage_name in ('extract', 'bootstrap', 'compile', 'packages'):
+        return {'installed': _has_expected_files(ctx['install_path'], ctx['manifest'].get('expect_any'))}
+    return {}
+
+
+def _stage_completed(ctx, journal, stage_name):
+    """Return True if the journal records the stage as completed and its output is still in place."""
+    entry = journal['stages'].get(stage_name)
+    return entry is not None and entry.get('state') == _stage_state(ctx, stage_name)
+
+
+def _ensure_privileges():
+    """Start the broker up front when not elevated, so the UAC prompt comes before the downloads."""
+    return bool(is_admin() or get_broker() is not None)  # get_broker says why it could not start
+
+
+def _record_runtime(ctx, cfg):
+    """Store the installed executable under the runtime's config key and expose it to this process."""
+    manifest = ctx['manifest']
+    install_path = ctx['install_path']
+    exe_path = os.path.join(install_path, manifest['exe'])
+    cfg[manifest['config_key']] = exe_path if os.path.exists(exe_path) else install_path
+
+    # Update current process PATH immediately
+    if os.path.isdir(install_path) and install_path not in os.environ.get('PATH', ''):
+        os.environ['PATH'] = install_path + os.pathsep + os.environ.get('PATH', '')
+
+
+def _fetch(label, url, artifact, show_progress=True, mirror=None, sha256=None):
+    """
+    Download url to artifact unless a complete copy is already cached, preferring the cache mirror.
+
+    A cached copy only counts if it matches sha256, so a truncated or
+    replaced file is downloaded again instead of failing verification.
+    Without a checksum the cached copy is used as is; downloads only land
+    there once complete.
+    """
+    if os.path.exists(artifact):
+        if not sha256 or sha256_file(artifact) == sha256.lower():
+            metrics.inc('artifact_cache_total', result='hit')
+            print(f"{BRIGHT_GREEN}Using cached {label} artifact '{artifact}'.{RESET}")
+            return True
+        print(f"{BRIGHT_YELLOW}Cached {label} artifact '{artifact}' does not match its checksum, downloading it again.{RESET}")
+        os.remove(artifact)
+    metrics.inc('artifact_cache_total', result='miss')
+    print(f"{BRIGHT_GREEN}Downloading {label} from {url}...{RESET}")
+    try:
+        download_file(url, artifact, show_progress=show_progress, mirror=mirror)
+    except Exception:
+        # Fall back to urlretrieve if streaming fails for any reason
+        print(f"{BRIGHT_YELLOW}Streaming download failed, falling back to simple download...{RESET}")
+        urllib.request.urlretrieve(url, artifact + '.part')
+        os.replace(artifact + '.part', artifact)
+    print(f"{BRIGHT_GREEN}Download complete.{RESET}")
+    return True
+
+
+def _verify(artifact, expected, allow_unverified=False):
+    """
+    Compare an artifact's SHA-256 with the expected digest.
+
+    An artifact without a published digest is refused, unless the config
+    opts out with allow_unverified_downloads (allow_unverified).
+    """
+    if not expected:
+        if allow_unverified:
+            print(f"{BRIGHT_YELLOW}No checksum published for '{os.path.basename(artifact)}', installing it unverified "
+                  f"(allow_unverified_downloads).{RESET}")
+            return True
+        print(f"{BRIGHT_RED}No checksum published for '{os.path.basename(artifact)}'. Add its sha256 to runtimes.json, "
+              f"or set \"allow_unverified_downloads\": true in the config to install it anyway.{RESET}")
+        return False
+    actual = sha256_file(artifact)
+    if actual.lower() != expected.lower():
+        print(f"{BRIGHT_RED}Checksum mismatch for '{artifact}': expected {expected}, got {actual}.{RESET}")
+        try:
+            os.remove(artifact)
+        except Exception:
+            pass
+        return False
+    print(f"{BRIGHT_GREEN}Verified checksum of '{os.path.basename(artifact)}'.{RESET}")
+    return True
+
+
+def _install_artifact(artifact, archive, install_path, installer_args, version):
+    """Extract a zip artifact or run an installer artifact into install_path."""
+    if archive == 'zip':
+        with span('extract.zip', artifact=os.path.basename(artifact)) as attrs, metrics.timed('extract_seconds', archive='zip'), \
+                zipfile.ZipFile(artifact, 'r') as zip_ref:
+            members = zip_ref.infolist()
+            attrs['files'] = sum(1 for member in members if not member.is_dir())
+            attrs['bytes'] = sum(member.file_size for member in members)
+            attrs['compressed_bytes'] = sum(member.compress_size for member in members)
+            zip_ref.extractall(install_path)
+        metrics.inc('extract_files_total', attrs['files'])
+        metrics.inc('extract_bytes_total', attrs['bytes'])
+        return True
+    if archive == 'installer':
+        install_command = f'"{artifact}" ' + render(installer_args, version, target=install_path)
+        with span('extract.installer', artifact=os.path.basename(artifact)) as attrs, metrics.timed('extract_seconds', archive='installer'):
+            # Started directly, not through cmd.exe, so nothing in the arguments is interpreted by a shell
+            try:
+                process = subprocess.run(install_command)
+            except OSError as e:
+                print(f"{BRIGHT_RED}Could not run the installer '{artifact}': {e}{RESET}")
+                return False
+            attrs['returncode'] = process.returncode
+        if process.returncode != 0:
+            print(f"{BRIGHT_RED}Installer failed with return code {process.returncode}.{RESET}")
+            return False
+        print(f"{BRIGHT_GREEN}Installer reported success.{RESET}")
+        return True
+    print(f"{BRIGHT_RED}Unsupported archive type '{archive}'.{RESET}")
+    return False
+
+
+def _bootstrap_pip(install_path, wheel):
+    """
+    Make an embeddable Python usable with pip.
+
+    The embeddable package ignores site-packages until 'import site' is
+    enabled in its python3XX._pth file. pip is then installed by unpacking
+    its wheel into Lib\\site-packages: a wheel is a zip laid out for exactly
+    that, so no interpreter has to run, and 'python -m pip' works afterwards.
+
+    Returns:
+        int: Number of files unpacked from the wheel, or None on failure
+    """
+    pth_files = glob.glob(os.path.join(install_path, 'python*._pth'))
+    if not pth_files:
+        print(f"{BRIGHT_RED}No python*._pth file in '{install_path}'; is this an embeddable Python?{RESET}")
+        return None
+    for pth_file in pth_files:
+        with open(pth_file, 'r', encoding='utf-8') as f:
+            lines = [line.rstrip('\r\n') for line in f]
+        lines = ['import site' if line.strip() == '#import site' else line for line in lines]
+        if 'import site' not in lines:
+            lines.append('import site')
+        if not any(line.strip().lower() == 'lib\\site-packages' for line in lines):
+            lines.insert(lines.index('import site'), 'Lib\\site-packages')
+        with open(pth_file, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    site_packages = os.path.join(install_path, 'Lib', 'site-packages')
+    os.makedirs(site_packages, exist_ok=True)
+    with zipfile.ZipFile(wheel, 'r') as zip_ref:
+        members = [member for member in zip_ref.infolist() if not member.is_dir()]
+        zip_ref.extractall(site_packages)
+    return len(members)
+
+
+def _has_expected_files(install_path, patterns):
+    """Check that install_path contains at least one entry matching any pattern."""
+    if not patterns:
+        return True
+    try:
+        contents = [name.lower() for name in os.listdir(install_path)]
+    except Exception:
+        return False
+    return any(fnmatch.fnmatch(name, pattern.lower()) for name in contents for pattern in patterns)
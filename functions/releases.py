@@ -0,0 +1,378 @@
+import os
+import re
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from . import metrics
+from .admin import is_admin
+from .config import get_user_cache_dir, load_config
+from .runtimes import get_runtime, render
+from .trace import span
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+RELEASE_INDEX_FILE = 'release-index.json'
+# Seconds a fetched index is used without asking the server again (config key release_index_ttl)
+DEFAULT_TTL = 24 * 3600
+TIMEOUT = 15
+SPEC_PATTERN = re.compile(r'^(latest|\d+(\.\d+){0,2})$')
+PYTHON_FTP_PATTERN = re.compile(r'<a href="(\d+\.\d+\.\d+)/">')
+PHP_BUILD_PATTERN = re.compile(r'^nts-v[sc](\d+)-x64$')
+PHP_ARCHIVE_PATTERN = re.compile(r'href="([^"]*?php-(\d+\.\d+\.\d+)-nts-Win32-v[sc](\d+)-x64\.zip)"', re.IGNORECASE)
+# Releases without their own download URL whose installer is checked before resolve_version picks one
+MAX_PROBES = 5
+
+# Indexes read straight from upstream by elevated processes, which don't trust the user cache
+_upstream = {}
+
+
+def parse_python_ftp(text, base_url):
+    """
+    Parse python.org's FTP directory listing (https://www.python.org/ftp/python/).
+
+    An X.Y.Z directory may only hold that version's prereleases, or only its
+    sources (security releases), so resolve_version checks that the Windows
+    installer exists before it picks one.
+
+    Returns:
+        dict: Version -> {} (the URLs come from the manifest templates)
+    """
+    return {version: {} for version in PYTHON_FTP_PATTERN.findall(text)}
+
+
+def parse_php_releases(text, base_url):
+    """
+    Parse windows.php.net's releases.json (the latest release of each supported branch).
+
+    Returns:
+        dict: Version -> {'url', 'sha256'} of the 64-bit non-thread-safe zip
+    """
+    releases = {}
+    for branch in json.loads(text).values():
+        if not isinstance(branch, dict) or 'version' not in branch:
+            continue
+        builds = sorted((key for key in branch if PHP_BUILD_PATTERN.match(key)),
+                        key=lambda key: int(PHP_BUILD_PATTERN.match(key).group(1)), reverse=True)
+        if not builds or 'zip' not in branch[builds[0]]:
+            continue
+        archive = branch[builds[0]]['zip']
+        releases[branch['version']] = {'url': urllib.parse.urljoin(base_url, archive['path']), 'sha256': archive.get('sha256')}
+    return releases
+
+
+def parse_php_archives(text, base_url):
+    """
+    Parse the directory listing of windows.php.net's release archives (every older patch release).
+
+    The listing has no checksums. A version built with several compilers
+    maps to the newest build.
+
+    Returns:
+        dict: Version -> {'url'} of the 64-bit non-thread-safe zip
+    """
+    builds = {}
+    for href, version, compiler in PHP_ARCHIVE_PATTERN.findall(text):
+        if int(compiler) > builds.get(version, (0, None))[0]:
+            builds[version] = (int(compiler), href)
+    return {version: {'url': urllib.parse.urljoin(base_url, href)} for version, (_, href) in builds.items()}
+
+
+PARSERS = {
+    'python-ftp': parse_python_ftp,
+    'php-releases-json': parse_php_releases,
+    'php-archives': parse_php_archives,
+}
+
+
+def get_sources(name):
+    """Return a runtime's release_index sources (one object or a list of them in runtimes.json)."""
+    source = (get_runtime(name) or {}).get('release_index')
+    if not source:
+        return []
+    return source if isinstance(source, list) else [source]
+
+
+def merge_sources(results):
+    """Merge the versions of several sources; a version listed by an earlier source keeps its entry."""
+    versions = {}
+    for result in results:
+        for version, release in result.items():
+            versions.setdefault(version, release)
+    return versions
+
+
+def version_key(version):
+    """Sort key for X.Y.Z version strings."""
+    return tuple(int(part) for part in version.split('.'))
+
+
+def load_index():
+    """Load the cached release index: runtime -> {'versions', 'fetched_at', 'sources': {url: {'versions', 'etag', 'last_modified'}}}."""
+    try:
+        with open(os.path.join(get_user_cache_dir(), RELEASE_INDEX_FILE), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        return index if isinstance(index, dict) else {}
+    except Exception:
+        return {}
+
+
+def save_index(index):
+    """Write the release index atomically."""
+    cache_dir = get_user_cache_dir()
+    index_path = os.path.join(cache_dir, RELEASE_INDEX_FILE)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        print(f"{BRIGHT_YELLOW}Could not write release index '{index_path}': {e}{RESET}")
+
+
+def fetch_source(name, source, cached=None):
+    """
+    Fetch and parse one release listing.
+
+    Args:
+        name (str): Runtime name
+        source (dict): {'url', 'format'} from the runtime's release_index
+        cached (dict): The source's cached {'versions', 'etag', 'last_modified'}, sent as a conditional GET
+
+    Returns:
+        dict: {'versions', 'etag', 'last_modified'}; the cached one if the server answered 304
+
+    Raises:
+        Exception: If the listing cannot be fetched or holds no releases
+    """
+    request = urllib.request.Request(source['url'], headers={'User-Agent': 'sw-devtools'})
+    if cached and cached.get('etag'):
+        request.add_header('If-None-Match', cached['etag'])
+    if cached and cached.get('last_modified'):
+        request.add_header('If-Modified-Since', cached['last_modified'])
+    with span('releases.fetch', runtime=name, url=source['url']) as attrs:
+        try:
+            with urllib.request.urlopen(request, timeout=TIMEOUT) as response:
+                body = response.read().decode('utf-8', errors='replace')
+                headers = response.headers
+            attrs['bytes'] = len(body)
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or not cached:
+                raise
+            attrs['status'] = 304
+            metrics.inc('release_index_total', runtime=name, result='not_modified')
+            return cached
+    versions = PARSERS[source['format']](body, source['url'])
+    if not versions:
+        raise ValueError(f"no releases found in {source['url']}")
+    metrics.inc('release_index_total', runtime=name, result='fetched')
+    return {'versions': versions, 'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+
+
+def get_releases(name, refresh=False, ttl=None):
+    """
+    Return the known releases of a runtime.
+
+    The index is cached in the user cache. Within the TTL it is used as is.
+    After that each of the runtime's listings is revalidated with a
+    conditional GET (If-None-Match / If-Modified-Since), so an unchanged
+    listing costs one small 304 response. A listing that cannot be reached
+    keeps its cached releases, and the index is retried on the next call.
+
+    Args:
+        name (str): Runtime name
+        refresh (bool): Revalidate even within the TTL
+        ttl (int): Seconds the index stays fresh, defaults to the release_index_ttl config key or a day
+
+    Returns:
+        dict: Version -> release info ({} or {'url', 'sha256'}), or None if no index is available
+    """
+    sources = get_sources(name)
+    if not sources:
+        return None
+    if ttl is None:
+        ttl = load_config().get('release_index_ttl', DEFAULT_TTL)
+    entry = load_index().get(name)
+    if entry and not refresh and time.time() - entry.get('fetched_at', 0) < ttl:
+        metrics.inc('release_index_total', runtime=name, result='fresh')
+        return entry['versions']
+
+    cached = (entry or {}).get('sources') or {}
+    fetched = {}
+    failed = False
+    for source in sources:
+        try:
+            fetched[source['url']] = fetch_source(name, source, cached.get(source['url']))
+        except Exception as e:
+            metrics.inc('release_index_total', runtime=name, result='error')
+            failed = True
+            if source['url'] in cached:
+                print(f"{BRIGHT_YELLOW}Could not refresh the {name} release listing {source['url']} ({e}), using the cached one.{RESET}")
+                fetched[source['url']] = cached[source['url']]
+            else:
+                print(f"{BRIGHT_RED}Could not fetch the {name} release listing {source['url']}: {e}{RESET}")
+    if not fetched:
+        return entry['versions'] if entry else None
+
+    versions = merge_sources(fetched[source['url']]['versions'] for source in sources if source['url'] in fetched)
+    # Installers found earlier stay found; missing ones are checked again, they may have been published since
+    for version, release in (entry or {}).get('versions', {}).items():
+        if release.get('available') and version in versions:
+            versions[version] = dict(versions[version], available=True)
+    entry = {'versions': versions, 'sources': fetched,
+             'fetched_at': (entry or {}).get('fetched_at', 0) if failed else time.time()}
+    index = load_index()  # Another command may have refreshed other runtimes meanwhile
+    index[name] = entry
+    save_index(index)
+    return versions
+
+
+def probe(url):
+    """
+    Check with a HEAD request whether a download exists.
+
+    Returns:
+        bool: Whether the server has the file, or None if that could not be determined
+    """
+    request = urllib.request.Request(url, method='HEAD', headers={'User-Agent': 'sw-devtools'})
+    try:
+        with span('releases.probe', url=url), urllib.request.urlopen(request, timeout=TIMEOUT):
+            return True
+    except urllib.error.HTTPError as e:
+        return False if e.code in (403, 404, 410) else None
+    except Exception:
+        return None
+
+
+def _remember(name, version, available):
+    """Record in the cached index whether a release's download exists."""
+    index = load_index()
+    release = ((index.get(name) or {}).get('versions') or {}).get(version)
+    if release is not None:
+        release['available'] = available
+        save_index(index)
+
+
+def _first_available(name, manifest, releases, candidates):
+    """
+    Return the first of candidates (newest first) that has a download.
+
+    Releases listed with their own URL have one. For the others the
+    manifest's URL is checked once and the answer is kept in the index. A
+    release that cannot be checked is taken, and its download tells.
+    """
+    for version in candidates[:MAX_PROBES]:
+        release = releases[version]
+        if release.get('url'):
+            return version
+        available = release.get('available')
+        if available is None:
+            available = probe(render(manifest['url'], version))
+            if available is None:
+                return version
+            _remember(name, version, available)
+        if available:
+            return version
+    return None
+
+
+def resolve_version(name, spec):
+    """
+    Resolve a version spec from --install <runtime>@<spec>.
+
+    'latest' is the newest release; '3' and '3.13' are the newest matching
+    release; '3.13.7' is that release. Only releases with a download count:
+    a Python version directory holding just prereleases or sources is
+    skipped. An exact version found in the cached index needs no network
+    beyond that check, and one that cannot be checked because the index is
+    unreachable is used as given, so installs from the artifact cache keep
+    working offline.
+
+    Args:
+        name (str): Runtime name
+        spec (str): Version spec, or None for the manifest's version
+
+    Returns:
+        str: The exact version, or None if the spec matches no release
+    """
+    manifest = get_runtime(name)
+    label = manifest.get('label', name)
+    if not spec:
+        return manifest['version']
+    spec = spec.strip().lower()
+    if not SPEC_PATTERN.match(spec):
+        print(f"{BRIGHT_RED}Invalid version '{spec}' for {label}. Use e.g. latest, 3, 3.13 or 3.13.7.{RESET}")
+        return None
+    exact = spec.count('.') == 2
+    if exact and spec == manifest['version']:
+        return spec
+
+    releases = get_releases(name)
+    if exact and releases is not None and spec not in releases:
+        releases = get_releases(name, refresh=True)  # Released since the index was cached?
+    if releases is None:
+        if exact:
+            print(f"{BRIGHT_YELLOW}Installing {label} {spec} without checking the release index.{RESET}")
+            return spec
+        return None
+
+    if spec == 'latest':
+        matches = list(releases)
+    else:
+        prefix = version_key(spec)
+        matches = [version for version in releases if version_key(version)[:len(prefix)] == prefix]
+    if not matches:
+        nearby = sorted(releases, key=version_key)[-8:]
+        print(f"{BRIGHT_RED}No {label} release matches '{spec}'. Recent releases: {', '.join(nearby)}{RESET}")
+        return None
+    candidates = sorted(matches, key=version_key, reverse=True)
+    version = _first_available(name, manifest, releases, candidates)
+    if version is None:
+        if exact:
+            print(f"{BRIGHT_RED}{label} {spec} has no Windows download at {render(manifest['url'], spec)} "
+                  f"(source-only or not yet released).{RESET}")
+        else:
+            print(f"{BRIGHT_RED}None of the newest {label} releases matching '{spec}' has a Windows download: "
+                  f"{', '.join(candidates[:MAX_PROBES])}{RESET}")
+        return None
+    if not exact:
+        print(f"{BRIGHT_CYAN}Resolved {label}@{spec} to {version}.{RESET}")
+    return version
+
+
+def get_release(name, version):
+    """
+    Return what the index knows about a release.
+
+    Unelevated, only the cached index is read, without any network access.
+    An elevated process would install whatever URL and checksum the cache
+    names, and any program of the user can write the cache, so it reads the
+    index from upstream instead, once per process.
+
+    Returns:
+        dict: {'url'} and maybe 'sha256' for releases with their own download (PHP's listings), otherwise {}
+    """
+    if is_admin():
+        versions = _read_upstream(name)
+    else:
+        versions = (load_index().get(name) or {}).get('versions')
+    return (versions or {}).get(version) or {}
+
+
+def _read_upstream(name):
+    """Fetch and parse a runtime's release listings without the cache; None if none can be read."""
+    if name not in _upstream:
+        results = []
+        for source in get_sources(name):
+            try:
+                results.append(fetch_source(name, source)['versions'])
+            except Exception as e:
+                print(f"{BRIGHT_YELLOW}Could not read the {name} release listing {source['url']}: {e}{RESET}")
+        _upstream[name] = merge_sources(results) if results else None
+    return _upstream[name]
@@ -0,0 +1,199 @@
+import os
+import re
+import json
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+
+RUNTIMES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runtimes.json')
+
+# What the version placeholders of a directory template can render to
+VERSION_PLACEHOLDERS = {'{version}': r'\d+(?:\.\d+)*', '{major}': r'\d+', '{minor}': r'\d+', '{patch}': r'\d+'}
+
+_runtimes = None
+
+
+def load_runtimes():
+    """
+    Load the runtime manifests from runtimes.json.
+
+    Each manifest describes one runtime: label, version, download URL template,
+    archive type ('zip' or 'installer'), optional sha256, target directory,
+    executable, config key, the shims it provides and optional install modes
+    (see apply_mode).
+
+    Returns:
+        dict: Runtime name -> manifest, or an empty dict if the file cannot be read
+    """
+    global _runtimes
+    if _runtimes is None:
+        try:
+            with open(RUNTIMES_FILE, 'r', encoding='utf-8') as f:
+                _runtimes = json.load(f)
+        except Exception as e:
+            print(f"{BRIGHT_RED}Failed to read runtime manifests '{RUNTIMES_FILE}': {e}{RESET}")
+            return {}
+    return _runtimes
+
+
+def use_runtimes(manifests):
+    """
+    Replace the loaded runtime manifests, e.g. with the catalog packed into an offline bundle.
+
+    Args:
+        manifests (dict): Runtime name -> manifest, or None to read runtimes.json again
+    """
+    global _runtimes
+    _runtimes = manifests
+
+
+def get_runtime(name):
+    """
+    Return the manifest of a runtime.
+
+    Args:
+        name (str): Runtime name (e.g. 'python', 'php')
+
+    Returns:
+        dict: The manifest, or None if no such runtime exists
+    """
+    return load_runtimes().get(name.lower())
+
+
+def apply_mode(manifest, mode):
+    """
+    Return the manifest for an install mode.
+
+    A mode (e.g. python's 'portable') replaces the keys it defines. The
+    default install's fallback and installer arguments do not carry over.
+
+    Args:
+        manifest (dict): The runtime manifest
+        mode (str): Mode name, or None for the default install
+
+    Returns:
+        dict: The effective manifest, or None if the runtime has no such mode
+    """
+    if not mode:
+        return manifest
+    modes = manifest.get('modes') or {}
+    if mode not in modes:
+        return None
+    effective = {key: value for key, value in manifest.items() if key not in ('modes', 'fallback', 'installer_args')}
+    effective.update(modes[mode])
+    return effective
+
+
+def template_vars(version, **extra):
+    """Return the placeholders available to manifest templates for a version."""
+    parts = version.split('.') + ['0', '0']
+    values = {
+        'version': version,
+        'major': parts[0],
+        'minor': parts[1],
+        'patch': parts[2],
+        'program_files': os.getenv('ProgramFiles') or r"C:\Program Files",
+    }
+    values.update(extra)
+    return values
+
+
+def render(template, version, **extra):
+    """
+    Fill a manifest template such as 'python-{version}-amd64.exe'.
+
+    Args:
+        template (str): Template with {version}, {major}, {minor}, {patch},
+            {program_files} or any extra placeholder
+        version (str): Runtime version
+        **extra: Additional placeholders
+
+    Returns:
+        str: The rendered string
+    """
+    return template.format(**template_vars(version, **extra))
+
+
+def resolve_install_path(name, manifest, cfg, version=None):
+    """
+    Determine where a runtime is installed to.
+
+    If the config's install path points at the SyncWide Devtools root the
+    manifest's target_dir is appended, any other configured path is used as is,
+    and without a configured path the manifest's default_dir is used.
+
+    Args:
+        name (str): Runtime name
+        manifest (dict): The runtime manifest
+        cfg (dict): The loaded configuration
+        version (str): Runtime version, defaults to the manifest version
+
+    Returns:
+        str: The install directory
+    """
+    version = version or manifest['version']
+    install_path_part = cfg.get('install_path') or cfg.get(f'{name}_install_path') or cfg.get('installPath')
+    if install_path_part:
+        normalized = install_path_part.rstrip('\\/ ')
+        base = os.path.basename(normalized).lower()
+        if base in ('syncwide devtools', 'syncwide-devtools'):
+            return os.path.join(install_path_part, render(manifest['target_dir'], version))
+        return install_path_part
+    return render(manifest['default_dir'], version)
+
+
+def is_managed_dir(name, manifest, cfg, path):
+    """
+    Check that a directory is one the runtime can be installed to, for any version or mode.
+
+    That is its target_dir inside the install root, its default_dir, or the
+    configured install path of the runtime. Directories named by other
+    config values (e.g. a python_path pointing at C:\\Windows) are not,
+    so they are never deleted on uninstall.
+
+    Args:
+        name (str): Runtime name
+        manifest (dict): The runtime manifest
+        cfg (dict): The loaded configuration
+        path (str): The directory to check
+
+    Returns:
+        bool: True if path is a directory of this runtime
+    """
+    from .config import get_install_root
+    path = os.path.normcase(os.path.abspath(path))
+    root = os.path.normcase(os.path.abspath(get_install_root(cfg)))
+    manifests = [manifest] + [apply_mode(manifest, mode) for mode in manifest.get('modes') or {}]
+    patterns = []
+    for effective in manifests:
+        patterns.append(re.escape(root + os.sep) + _template_pattern(effective['target_dir']))
+        patterns.append(_template_pattern(effective['default_dir']))
+        configured = os.path.normcase(os.path.abspath(resolve_install_path(name, effective, cfg)))
+        patterns.append(re.escape(configured))
+    return any(re.fullmatch(pattern, path) for pattern in patterns)
+
+
+def _template_pattern(template):
+    """Return a regex matching what a directory template renders to for any version."""
+    parts = re.split(r'(\{\w+\})', template)
+    return ''.join(VERSION_PLACEHOLDERS.get(part) or re.escape(os.path.normcase(render(part, '0'))) for part in parts if part)
+
+
+def resolve_installed_dir(name, manifest, cfg):
+    """
+    Return the directory of an installed runtime.
+
+    Uses the runtime's config key (e.g. python_path) when present and falls back
+    to resolve_install_path otherwise.
+
+    Returns:
+        str: The absolute install directory
+    """
+    path_value = cfg.get(manifest['config_key'])
+    if path_value:
+        # If the config value is an executable, use its containing directory
+        if path_value.lower().endswith('.exe'):
+            return os.path.abspath(os.path.dirname(path_value))
+        return os.path.abspath(path_value)
+    return os.path.abspath(resolve_install_path(name, manifest, cfg))
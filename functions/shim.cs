@@ -0,0 +1,92 @@
+// sw-devtools shim launcher.
+//
+// Every shim in the shims directory is a copy of this program next to a
+// <name>.shim file naming the executable it stands for:
+//
+//     # sw-devtools shim
+//     path = C:\Program Files\Python314\python.exe
+//     args = -m pip
+//
+// The launcher starts that executable with the fixed args followed by its own
+// command line, passed on exactly as the caller wrote it, waits for it and
+// exits with its exit code. Because it is a real .exe, CreateProcess and
+// subprocess find it on PATH, and batch files can run it without 'call'.
+//
+// functions/shims.py compiles it with the C# compiler of the .NET Framework
+// (csc.exe, part of Windows), as a console and as a GUI program.
+using System;
+using System.ComponentModel;
+using System.Diagnostics;
+using System.IO;
+using System.Reflection;
+
+static class Shim
+{
+    static int Main()
+    {
+        string shimFile = Path.ChangeExtension(Assembly.GetEntryAssembly().Location, ".shim");
+        string target = null;
+        string args = "";
+        try
+        {
+            foreach (string line in File.ReadAllLines(shimFile))
+            {
+                int separator = line.IndexOf('=');
+                if (line.StartsWith("#") || separator < 0)
+                    continue;
+                string key = line.Substring(0, separator).Trim();
+                string value = line.Substring(separator + 1).Trim();
+                if (key == "path")
+                    target = value;
+                else if (key == "args")
+                    args = value;
+            }
+        }
+        catch (IOException e)
+        {
+            Console.Error.WriteLine("sw-devtools shim: cannot read " + shimFile + ": " + e.Message);
+            return 1;
+        }
+        if (target == null)
+        {
+            Console.Error.WriteLine("sw-devtools shim: no path in " + shimFile);
+            return 1;
+        }
+
+        ProcessStartInfo info = new ProcessStartInfo(target, (args + " " + ArgumentsOf(Environment.CommandLine)).Trim());
+        info.UseShellExecute = false;
+        // Ctrl+C reaches the child through the shared console; the launcher just waits for it
+        Console.CancelKeyPress += delegate(object sender, ConsoleCancelEventArgs e) { e.Cancel = true; };
+        try
+        {
+            using (Process process = Process.Start(info))
+            {
+                process.WaitForExit();
+                return process.ExitCode;
+            }
+        }
+        catch (Win32Exception e)
+        {
+            Console.Error.WriteLine("sw-devtools shim: cannot run " + target + ": " + e.Message);
+            return 1;
+        }
+    }
+
+    // The command line after the program name, unchanged, so no quoting or ^ & % is reinterpreted
+    static string ArgumentsOf(string commandLine)
+    {
+        int end;
+        if (commandLine.StartsWith("\""))
+        {
+            end = commandLine.IndexOf('"', 1);
+            end = end < 0 ? commandLine.Length : end + 1;
+        }
+        else
+        {
+            end = 0;
+            while (end < commandLine.Length && commandLine[end] != ' ' && commandLine[end] != '\t')
+                end++;
+        }
+        return commandLine.Substring(end).TrimStart(' ', '\t');
+    }
+}
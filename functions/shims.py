@@ -0,0 +1,318 @@
+import os
+import glob
+import shutil
+import struct
+import filecmp
+import hashlib
+import subprocess
+from .config import load_config, get_install_root
+from .path import _expand_env_vars, _path_key, get_path, normalize_path_entry, set_path
+from .runtimes import is_managed_dir, load_runtimes
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_CYAN = "\033[96m"
+
+# First line of every .shim file we generate, so foreign files are never touched
+SHIM_MARKER = "# sw-devtools shim"
+# Older versions generated .cmd launchers starting with this line
+LEGACY_SHIM_MARKER = "@rem sw-devtools shim"
+# Source of the .exe launcher every shim is a copy of, and where the compiled launchers are kept
+LAUNCHER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'shim.cs')
+LAUNCHER_DIR = '.launchers'
+IMAGE_SUBSYSTEM_WINDOWS_GUI = 2
+
+
+def get_shim_definitions():
+    """
+    Collect the shims declared by the runtime manifests.
+
+    Returns:
+        dict: shim name -> (config key of the runtime, executable inside the runtime, extra arguments)
+    """
+    shims = {}
+    for manifest in load_runtimes().values():
+        for shim_name, command in manifest.get('shims', {}).items():
+            shims[shim_name] = (manifest['config_key'], command[0], list(command[1:]))
+    return shims
+
+
+def get_shims_dir(cfg):
+    """
+    Return the shims directory that is placed on PATH.
+
+    Args:
+        cfg (dict): The loaded configuration
+
+    Returns:
+        str: The configured shims_path, or 'shims' inside the install root
+    """
+    return cfg.get('shims_path') or os.path.join(get_install_root(cfg), 'shims')
+
+
+def _resolve_executable(path_value, exe_name):
+    """Resolve an executable inside a runtime from its configured *_path value."""
+    if path_value.lower().endswith('.exe'):
+        install_dir = os.path.dirname(path_value)
+    else:
+        install_dir = path_value
+    return os.path.join(install_dir, exe_name)
+
+
+def _render_shim(target, args):
+    """Render the .shim file that tells a launcher which executable to run, and with which arguments."""
+    lines = [SHIM_MARKER, f"path = {target}"]
+    if args:
+        lines.append(f"args = {subprocess.list2cmdline(args)}")
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def _is_gui_executable(path):
+    """Tell from its PE header whether an executable is a Windows GUI program (like pythonw.exe)."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(4096)
+        pe_offset = struct.unpack_from('<I', header, 0x3C)[0]
+        # Subsystem lies 68 bytes into the optional header, after the 4-byte signature and the 20-byte file header
+        return (header[pe_offset:pe_offset + 4] == b'PE\0\0'
+                and struct.unpack_from('<H', header, pe_offset + 24 + 68)[0] == IMAGE_SUBSYSTEM_WINDOWS_GUI)
+    except (OSError, struct.error):
+        return False
+
+
+def _find_csc():
+    """Return the C# compiler of the .NET Framework that ships with Windows, or None."""
+    windir = os.environ.get('WINDIR', r'C:\Windows')
+    for framework in ('Framework64', 'Framework'):
+        csc = os.path.join(windir, 'Microsoft.NET', framework, 'v4.0.30319', 'csc.exe')
+        if os.path.isfile(csc):
+            return csc
+    return None
+
+
+def _compile_launcher(output_path, gui):
+    """Compile shim.cs to output_path as a console or GUI program. Returns True if it compiled."""
+    csc = _find_csc()
+    if csc is None:
+        print(f"{BRIGHT_RED}Cannot build the shim launcher: the .NET Framework C# compiler (csc.exe) was not found.{RESET}")
+        return False
+    result = subprocess.run([csc, '/nologo', '/optimize+', f"/target:{'winexe' if gui else 'exe'}", f"/out:{output_path}",
+                             LAUNCHER_SOURCE], capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"{BRIGHT_RED}Building the shim launcher failed:{RESET}\n{result.stdout.strip()}")
+        return False
+    return True
+
+
+def get_launcher(shims_dir, gui=False):
+    """
+    Return the compiled launcher, building it on first use.
+
+    Launchers are kept in the shims directory's .launchers folder under the
+    hash of shim.cs, so a changed source is compiled again and the shims
+    pick it up on the next update.
+
+    Args:
+        shims_dir (str): The shims directory
+        gui (bool): Build the GUI variant, for targets such as pythonw.exe
+
+    Returns:
+        str: Path of the launcher, or None if it could not be built
+    """
+    with open(LAUNCHER_SOURCE, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    launcher = os.path.join(shims_dir, LAUNCHER_DIR, f"launcher-{'gui' if gui else 'console'}-{digest}.exe")
+    if os.path.isfile(launcher):
+        return launcher
+    os.makedirs(os.path.dirname(launcher), exist_ok=True)
+    tmp_path = f"{launcher}.{os.getpid()}.tmp"
+    if not _compile_launcher(tmp_path, gui):
+        return None
+    os.replace(tmp_path, launcher)
+    return launcher
+
+
+def _write_text(path, content):
+    """Write a file if its content changed. Returns True if it was written."""
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            if f.read() == content:
+                return False
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(content)
+    return True
+
+
+def _install_launcher(launcher, shim_exe):
+    """Copy a launcher to a shim .exe unless it is already identical. Returns True if it was copied."""
+    if os.path.exists(shim_exe) and filecmp.cmp(launcher, shim_exe, shallow=False):
+        return False
+    tmp_path = f"{shim_exe}.{os.getpid()}.tmp"
+    shutil.copyfile(launcher, tmp_path)
+    try:
+        os.replace(tmp_path, shim_exe)
+    except PermissionError:
+        # A shim that is running cannot be replaced, but it can be renamed out of the way
+        os.replace(shim_exe, f"{shim_exe}.{os.getpid()}.old")
+        os.replace(tmp_path, shim_exe)
+    return True
+
+
+def read_shim_target(shims_dir, name):
+    """
+    Return the executable a shim runs.
+
+    Args:
+        shims_dir (str): The shims directory
+        name (str): Shim name, e.g. 'python'
+
+    Returns:
+        str: The path in the shim's .shim file, or None if there is no such shim generated by update_shims
+    """
+    if not os.path.isfile(os.path.join(shims_dir, f"{name}.exe")):
+        return None
+    try:
+        with open(os.path.join(shims_dir, f"{name}.shim"), 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not lines or lines[0].strip() != SHIM_MARKER:
+        return None
+    for line in lines[1:]:
+        key, separator, value = line.partition('=')
+        if separator and key.strip() == 'path':
+            return value.strip()
+    return None
+
+
+def _is_our_shim(shim_file):
+    """Check whether a .shim file was generated by update_shims."""
+    try:
+        with open(shim_file, 'r', encoding='utf-8') as f:
+            return f.readline().strip() == SHIM_MARKER
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def find_runtime_path_entries(path_dirs, cfg):
+    """
+    Find PATH entries that point straight at a runtime directory (or its Scripts folder).
+
+    Older installs put e.g. PHP850 and Python314 on PATH. The shims replace
+    them, and a stale entry would shadow the shims with another version.
+
+    Args:
+        path_dirs (list): PATH entries
+        cfg (dict): The loaded configuration
+
+    Returns:
+        list: The entries of path_dirs that belong to a runtime the manifest knows
+    """
+    stale = []
+    for entry in path_dirs:
+        directory = _expand_env_vars(normalize_path_entry(entry))
+        if not directory:
+            continue
+        candidates = [directory]
+        if os.path.basename(directory).lower() == 'scripts':
+            candidates.append(os.path.dirname(directory))
+        if any(is_managed_dir(name, manifest, cfg, candidate)
+               for name, manifest in load_runtimes().items() for candidate in candidates):
+            stale.append(entry)
+    return stale
+
+
+def update_shims(cfg=None, scope='system'):
+    """
+    Regenerate the launchers in the shims directory for the active runtimes.
+
+    Each shim is a small .exe (a copy of the launcher built from shim.cs)
+    with a .shim file naming the runtime executable it runs. Only files whose
+    content changed are rewritten, shims for runtimes that are no longer
+    configured are removed, and so are the .cmd launchers of older versions.
+    The shims directory is placed first on PATH, so another python or php on
+    PATH cannot win over the shims, and PATH entries of runtime directories
+    left by older installs are removed.
+
+    Args:
+        cfg (dict): The loaded configuration, defaults to load_config()
+        scope (str): Either 'system' or 'user' PATH to register the shims directory in
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if cfg is None:
+        cfg = load_config()
+    shims_dir = get_shims_dir(cfg)
+
+    try:
+        os.makedirs(shims_dir, exist_ok=True)
+    except Exception as e:
+        print(f"{BRIGHT_RED}Failed to create shims directory '{shims_dir}': {e}{RESET}")
+        return False
+
+    # Shims replaced while they were running
+    for old_path in glob.glob(os.path.join(shims_dir, '*.old')):
+        try:
+            os.remove(old_path)
+        except OSError:
+            pass
+
+    ok = True
+    written = removed = 0
+    for name, (config_key, exe_name, args) in get_shim_definitions().items():
+        shim_exe = os.path.join(shims_dir, f"{name}.exe")
+        shim_file = os.path.join(shims_dir, f"{name}.shim")
+        legacy_cmd = os.path.join(shims_dir, f"{name}.cmd")
+        path_value = cfg.get(config_key)
+        target = _resolve_executable(path_value, exe_name) if path_value else None
+
+        try:
+            if os.path.exists(legacy_cmd):
+                with open(legacy_cmd, 'r', encoding='utf-8', newline='') as f:
+                    if f.readline().strip() == LEGACY_SHIM_MARKER:
+                        os.remove(legacy_cmd)
+                        removed += 1
+            if target and os.path.exists(target):
+                if os.path.exists(shim_exe) and not _is_our_shim(shim_file):
+                    print(f"{BRIGHT_YELLOW}Leaving '{shim_exe}' alone: it was not created by sw-devtools.{RESET}")
+                    continue
+                launcher = get_launcher(shims_dir, gui=_is_gui_executable(target))
+                if launcher is None:
+                    ok = False
+                    continue
+                # The .shim file goes first, so a new launcher never starts without one
+                changed = _write_text(shim_file, _render_shim(target, args))
+                if _install_launcher(launcher, shim_exe) or changed:
+                    written += 1
+            elif _is_our_shim(shim_file):
+                for path in (shim_exe, shim_file):
+                    if os.path.exists(path):
+                        os.remove(path)
+                removed += 1
+        except Exception as e:
+            print(f"{BRIGHT_YELLOW}Could not update shim '{shim_exe}': {e}{RESET}")
+
+    if written or removed:
+        print(f"{BRIGHT_GREEN}Updated shims in '{shims_dir}' ({written} written, {removed} removed).{RESET}")
+    else:
+        print(f"{BRIGHT_CYAN}Shims in '{shims_dir}' are up to date.{RESET}")
+
+    path_dirs = get_path(scope)
+    if path_dirs is None:
+        return False
+    stale = find_runtime_path_entries(path_dirs, cfg)
+    shims_key = _path_key(shims_dir)
+    # Keep the spelling PATH already uses for the shims directory
+    first = next((entry for entry in path_dirs if _path_key(entry) == shims_key), shims_dir)
+    wanted = [first] + [entry for entry in path_dirs if entry not in stale and _path_key(entry) != shims_key]
+    if wanted != path_dirs:
+        if not set_path(wanted, scope):
+            return False
+        if stale:
+            print(f"{BRIGHT_GREEN}Removed runtime directories now covered by the shims from {scope} PATH: {', '.join(stale)}{RESET}")
+        print(f"{BRIGHT_GREEN}'{shims_dir}' is first on {scope} PATH.{RESET}")
+    return ok
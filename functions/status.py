@@ -0,0 +1,337 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from .config import find_config_path, load_config, get_user_cache_dir
+from .path import get_path_snapshot
+from .shims import get_shims_dir, read_shim_target
+from .runtimes import load_runtimes
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BOLD = "\033[1m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+# Runtimes managed by SyncWide Devtools: name -> display label, config key, executable and the shims that run it
+RUNTIMES = {
+    name: {'label': manifest.get('label', name), 'config_key': manifest['config_key'], 'exe': manifest['exe'],
+           'shims': [shim for shim, command in manifest.get('shims', {}).items() if command == [manifest['exe']]]}
+    for name, manifest in load_runtimes().items()
+}
+
+VERSION_CACHE_FILE = 'versions.json'
+_cache_lock = threading.Lock()
+
+
+def load_version_cache():
+    """
+    Load the cache of probed runtime versions.
+
+    Returns:
+        dict: Normalized executable path -> {'version', 'size', 'mtime_ns', 'probed_at'}
+    """
+    cache_path = os.path.join(get_user_cache_dir(), VERSION_CACHE_FILE)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except Exception:
+        return {}
+
+
+def save_version_cache(cache):
+    """
+    Write the version cache atomically.
+
+    Args:
+        cache (dict): The cache returned by load_version_cache
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    cache_dir = get_user_cache_dir()
+    cache_path = os.path.join(cache_dir, VERSION_CACHE_FILE)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, indent=4)
+        os.replace(tmp_path, cache_path)
+        return True
+    except Exception as e:
+        print(f"{BRIGHT_YELLOW}Could not write version cache '{cache_path}': {e}{RESET}")
+        return False
+
+
+def probe_runtime(name, cfg=None, snapshot=None, cache=None):
+    """
+    Probe the installation state of a managed runtime.
+
+    Args:
+        name (str): Runtime name, a key of RUNTIMES
+        cfg (dict): The loaded configuration, defaults to load_config()
+        snapshot (PathSnapshot): PATH snapshot, defaults to the shared one
+        cache (dict): Version cache from load_version_cache, updated in place.
+            None probes the executable without using the cache.
+
+    Returns:
+        dict: Probe result with the keys name, label, state ('installed',
+            'not_installed', 'missing_dir' or 'missing_exe'), version,
+            cached, install_dir, executable, in_path, via_shims and duration_ms
+    """
+    started = time.perf_counter()
+    runtime = RUNTIMES[name]
+    if cfg is None:
+        cfg = load_config()
+    result = {
+        'name': name,
+        'label': runtime['label'],
+        'state': 'not_installed',
+        'version': None,
+        'cached': False,
+        'install_dir': None,
+        'executable': None,
+        'in_path': False,
+        'via_shims': False,
+        'duration_ms': 0.0,
+    }
+
+    path_value = cfg.get(runtime['config_key'])
+    if path_value:
+        # Determine installation directory
+        if path_value.lower().endswith('.exe'):
+            install_dir = os.path.dirname(path_value)
+            executable = path_value
+        else:
+            install_dir = path_value
+            executable = os.path.join(install_dir, runtime['exe'])
+        result['install_dir'] = install_dir
+        result['executable'] = executable
+
+        if not os.path.exists(install_dir):
+            result['state'] = 'missing_dir'
+        elif not os.path.exists(executable):
+            result['state'] = 'missing_exe'
+        else:
+            result['state'] = 'installed'
+            result['version'], result['cached'] = _probe_version(executable, cache)
+
+            # Check if in PATH, either directly or through the shims directory
+            if snapshot is None:
+                snapshot = get_path_snapshot()
+            result['in_path'] = snapshot.contains(install_dir, 'system')
+            result['via_shims'] = not result['in_path'] and _has_shim(name, executable, cfg, snapshot)
+
+    result['duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def _has_shim(name, executable, cfg, snapshot):
+    """Check that the shims directory is on the system PATH and holds a shim running this executable."""
+    shims_dir = get_shims_dir(cfg)
+    if not snapshot.contains(shims_dir, 'system'):
+        return False
+    key = os.path.normcase(os.path.abspath(executable))
+    for shim in RUNTIMES[name]['shims']:
+        target = read_shim_target(shims_dir, shim)
+        if target and os.path.normcase(os.path.abspath(target)) == key:
+            return True
+    return False
+
+
+def _probe_version(executable, cache=None):
+    """
+    Return the first line of `<executable> --version`.
+
+    When a cache is given, the result is reused as long as the executable's size
+    and modification time are unchanged, so the process is not spawned again.
+
+    Returns:
+        tuple: (version, cached)
+    """
+    key = os.path.normcase(os.path.abspath(executable))
+    stat = None
+    if cache is not None:
+        try:
+            stat = os.stat(executable)
+            with _cache_lock:
+                entry = cache.get(key)
+            if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+                return entry.get('version', "Unknown"), True
+        except OSError:
+            stat = None
+
+    version = "Unknown"
+    try:
+        result = subprocess.run(
+            [executable, '--version'],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        if result.returncode == 0:
+            output = result.stdout.strip() or result.stderr.strip()
+            if output:
+                version = output.splitlines()[0].strip()
+    except Exception:
+        pass
+
+    # Only remember successful probes, a failed one should be retried next time
+    if stat is not None and version != "Unknown":
+        with _cache_lock:
+            cache[key] = {
+                'version': version,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'probed_at': time.time(),
+            }
+    return version, False
+
+
+def print_status(result, config_path=None):
+    """Print the detailed status of one runtime from a probe_runtime result."""
+    label = result['label']
+    if result['state'] == 'not_installed':
+        print(f"{BRIGHT_RED}✗ {label} is not installed via SyncWide Devtools{RESET}")
+        print(f"  No '{RUNTIMES[result['name']]['config_key']}' found in configuration.\n")
+        return
+    if result['state'] == 'missing_dir':
+        print(f"{BRIGHT_RED}✗ {label} installation directory not found{RESET}")
+        print(f"  Expected: {result['install_dir']}\n")
+        return
+    if result['state'] == 'missing_exe':
+        print(f"{BRIGHT_YELLOW}⚠ {label} directory exists but {RUNTIMES[result['name']]['exe']} not found{RESET}")
+        print(f"  Directory: {result['install_dir']}")
+        print(f"  Expected executable: {result['executable']}\n")
+        return
+
+    print(f"{BRIGHT_GREEN}✓ {label} is installed{RESET}")
+    print(f"  Version: {BRIGHT_CYAN}{result['version']}{RESET}{' (cached)' if result['cached'] else ''}")
+    print(f"  Location: {BRIGHT_CYAN}{result['install_dir']}{RESET}")
+    print(f"  Executable: {BRIGHT_CYAN}{result['executable']}{RESET}")
+    if result['via_shims']:
+        print(f"  In System PATH: {BRIGHT_GREEN}Yes (via shims){RESET}")
+    else:
+        print(f"  In System PATH: {BRIGHT_GREEN + 'Yes' + RESET if result['in_path'] else BRIGHT_YELLOW + 'No' + RESET}")
+
+    if config_path:
+        print(f"  Config: {BRIGHT_CYAN}{config_path}{RESET}")
+    print()
+
+
+def show_status(name, use_cache=True):
+    """
+    Check and display the detailed status of a single runtime.
+
+    Args:
+        name (str): Runtime name, a key of RUNTIMES
+        use_cache (bool): Reuse the cached version if the executable is unchanged
+    """
+    print(f"{BRIGHT_CYAN}Checking {RUNTIMES[name]['label']} installation status...{RESET}\n")
+    config_path = find_config_path()
+    cache = load_version_cache()
+    result = probe_runtime(name, load_config(config_path), cache=cache if use_cache else None)
+    if use_cache and not result['cached'] and result['state'] == 'installed':
+        save_version_cache(cache)
+    print_status(result, config_path)
+
+
+def parse_runtime_names(value):
+    """
+    Parse a --status argument into runtime names.
+
+    Args:
+        value (str): 'all' or a comma-separated list of runtime names
+
+    Returns:
+        list: Runtime names in the requested order
+
+    Raises:
+        ValueError: If an unknown runtime is requested
+    """
+    if value.strip().lower() == 'all':
+        return list(RUNTIMES)
+    names = []
+    for name in value.split(','):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in RUNTIMES:
+            raise ValueError(f"Unknown runtime '{name}'. Available: {', '.join(RUNTIMES)}")
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def status_many(names, as_json=False, use_cache=True):
+    """
+    Probe several runtimes concurrently and print a table or JSON.
+
+    The configuration and PATH are read once and shared by every probe, and the
+    probes run on a thread pool so the total time is bounded by the slowest one.
+    With as_json, warnings printed while probing go to stderr, so stdout only
+    holds the JSON document.
+
+    Args:
+        names (list): Runtime names to probe
+        as_json (bool): Print JSON instead of a table
+        use_cache (bool): Reuse cached versions of unchanged executables
+
+    Returns:
+        list: The probe results in the requested order
+    """
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr) if as_json else contextlib.nullcontext():
+        config_path = find_config_path()
+        cfg = load_config(config_path)
+        snapshot = get_path_snapshot()
+        cache = load_version_cache() if use_cache else None
+
+        with ThreadPoolExecutor(max_workers=max(1, len(names))) as pool:
+            results = list(pool.map(lambda name: probe_runtime(name, cfg, snapshot, cache), names))
+        if use_cache and any(r['state'] == 'installed' and not r['cached'] for r in results):
+            save_version_cache(cache)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if as_json:
+        json.dump({'config': config_path, 'elapsed_ms': round(elapsed_ms, 1), 'runtimes': results}, sys.stdout, indent=4)
+        sys.stdout.write("\n")
+        return results
+
+    states = {
+        'installed': f"{BRIGHT_GREEN}installed{RESET}",
+        'not_installed': f"{BRIGHT_RED}not installed{RESET}",
+        'missing_dir': f"{BRIGHT_RED}directory missing{RESET}",
+        'missing_exe': f"{BRIGHT_YELLOW}executable missing{RESET}",
+    }
+    rows = []
+    for result in results:
+        if result['via_shims']:
+            in_path = 'shims'
+        elif result['state'] == 'installed':
+            in_path = 'yes' if result['in_path'] else 'no'
+        else:
+            in_path = '-'
+        rows.append((result['label'], result['state'], result['version'] or '-', in_path, result['install_dir'] or '-'))
+
+    headers = ('Runtime', 'Status', 'Version', 'In PATH', 'Location')
+    plain_states = {'installed': 'installed', 'not_installed': 'not installed', 'missing_dir': 'directory missing', 'missing_exe': 'executable missing'}
+    widths = [len(h) for h in headers]
+    for row in rows:
+        cells = (row[0], plain_states[row[1]], row[2], row[3], row[4])
+        widths = [max(w, len(c)) for w, c in zip(widths, cells)]
+
+    print(f"{BOLD}" + "  ".join(h.ljust(w) for h, w in zip(headers, widths)) + f"{RESET}")
+    for label, state, version, in_path, location in rows:
+        # Pad the visible text before colorizing so ANSI codes do not break alignment
+        state_cell = states[state] + ' ' * (widths[1] - len(plain_states[state]))
+        print("  ".join([label.ljust(widths[0]), state_cell, version.ljust(widths[2]), in_path.ljust(widths[3]), location]))
+    print(f"\n{BRIGHT_CYAN}Probed {len(results)} runtime(s) in {elapsed_ms:.0f} ms.{RESET}")
+    return results
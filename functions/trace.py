@@ -0,0 +1,180 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BOLD = "\033[1m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_CYAN = "\033[96m"
+
+# Number of functions --profile prints
+PROFILE_TOP = 25
+
+# Recorded spans while tracing is on, otherwise None so span() costs next to nothing
+_events = None
+# Thread id -> name, kept because pool threads are gone by the time the trace is written
+_thread_names = {}
+_origin_ns = time.perf_counter_ns()
+_events_lock = threading.Lock()
+_profiler = None
+
+
+def enable():
+    """Start recording spans."""
+    global _events
+    with _events_lock:
+        if _events is None:
+            _events = []
+
+
+def enabled():
+    """Return True if spans are being recorded."""
+    return _events is not None
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """
+    Time a block of work as a trace span.
+
+    The block can add attributes such as byte and file counts to the yielded
+    dict; they show up as the span's args in the trace viewer. When tracing is
+    off this only yields the dict.
+
+    Args:
+        name (str): Span name, e.g. 'install.extract' or 'download'
+        **attrs: Initial attributes
+
+    Yields:
+        dict: The span's attributes
+    """
+    if _events is None:
+        yield attrs
+        return
+    started = time.perf_counter_ns()
+    try:
+        yield attrs
+    except BaseException as e:
+        attrs['error'] = repr(e)
+        raise
+    finally:
+        _record(name, started, time.perf_counter_ns(), attrs)
+
+
+def _record(name, started_ns, ended_ns, attrs):
+    event = {
+        'name': name,
+        'cat': name.split('.', 1)[0],
+        'ph': 'X',
+        'ts': (started_ns - _origin_ns) / 1000,
+        'dur': (ended_ns - started_ns) / 1000,
+        'pid': os.getpid(),
+        'tid': threading.get_ident(),
+        'args': {key: value if isinstance(value, (int, float, bool, str, type(None))) else str(value)
+                 for key, value in attrs.items()},
+    }
+    with _events_lock:
+        if _events is not None:
+            _events.append(event)
+            _thread_names.setdefault(event['tid'], threading.current_thread().name)
+
+
+def write_trace(path, other_data=None):
+    """
+    Write the recorded spans as a Chrome trace (chrome://tracing, Perfetto).
+
+    Args:
+        path (str): The JSON file to write
+        other_data (dict): Extra values for the trace's metadata section
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    with _events_lock:
+        events = list(_events or [])
+        thread_names = dict(_thread_names)
+    metadata = [{'name': 'process_name', 'ph': 'M', 'pid': os.getpid(), 'tid': 0, 'args': {'name': 'sw-devtools'}}]
+    for tid in sorted({event['tid'] for event in events}):
+        metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid,
+                         'args': {'name': thread_names.get(tid, f"thread-{tid}")}})
+    trace = {
+        'traceEvents': metadata + sorted(events, key=lambda event: event['ts']),
+        'displayTimeUnit': 'ms',
+        'otherData': other_data or {},
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"{BRIGHT_RED}Failed to write trace '{path}': {e}{RESET}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def start(trace=False, profile=False):
+    """
+    Turn on instrumentation for this command (main.py --trace / --profile).
+
+    Args:
+        trace (bool): Record spans
+        profile (bool): Run cProfile and track the Python heap peak with tracemalloc
+    """
+    global _profiler, _origin_ns
+    _origin_ns = time.perf_counter_ns()
+    if trace:
+        enable()
+    if profile:
+        import cProfile
+        import tracemalloc
+        tracemalloc.start()
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def finish(trace_path=None, profile_path=None):
+    """
+    Stop instrumentation and write the results. Registered with atexit by main.py.
+
+    Args:
+        trace_path (str): Write the Chrome trace here, if given
+        profile_path (str): Write cProfile stats here (for snakeviz, pstats), if given;
+            an empty string only prints the summary
+    """
+    global _profiler
+    other_data = {'command': ' '.join(sys.argv[1:])}
+    if _profiler is not None:
+        _profiler.disable()
+        import io
+        import pstats
+        import tracemalloc
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        other_data['tracemalloc_peak_mb'] = round(peak / (1024 * 1024), 2)
+
+        output = io.StringIO()
+        stats = pstats.Stats(_profiler, stream=output)
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP)
+        print(f"\n{BRIGHT_CYAN}{BOLD}Profile (top {PROFILE_TOP} by cumulative time){RESET}")
+        print(output.getvalue().strip())
+        print(f"{BRIGHT_CYAN}Python heap peak (tracemalloc): {peak / (1024 * 1024):.2f} MB{RESET}")
+        if profile_path:
+            stats.dump_stats(profile_path)
+            print(f"{BRIGHT_GREEN}Wrote profile '{profile_path}'.{RESET}")
+        _profiler = None
+
+    if trace_path:
+        # The whole command as the outermost span
+        _record('command', _origin_ns, time.perf_counter_ns(), {'argv': other_data['command']})
+        if write_trace(trace_path, other_data):
+            print(f"{BRIGHT_GREEN}Wrote trace '{trace_path}' ({len(_events)} spans).{RESET}")
@@ -0,0 +1,288 @@
+import os
+import re
+import json
+import time
+import hashlib
+import pathlib
+import tempfile
+import subprocess
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics
+from .download import download_file, sha256_file
+from .trace import span
+
+# ANSI escape codes for CLI colors
+RESET = "\033[0m"
+BRIGHT_RED = "\033[91m"
+BRIGHT_GREEN = "\033[92m"
+BRIGHT_YELLOW = "\033[93m"
+BRIGHT_CYAN = "\033[96m"
+
+# Concurrent wheel downloads when filling the wheelhouse
+WHEEL_WORKERS = 8
+# A pinned requirement as handed to the elevated broker, e.g. 'requests==2.32.5'
+PINNED_PATTERN = re.compile(r'^[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?==[A-Za-z0-9.+!_-]+$')
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def get_wheelhouse(artifact_dir):
+    """Return the wheelhouse directory inside an artifact cache."""
+    return os.path.join(artifact_dir, 'wheels')
+
+
+def blob_path(wheelhouse, sha256, filename):
+    """
+    Return where a wheel is stored in the wheelhouse.
+
+    Wheels are content-addressed: <wheelhouse>/<sha256[:2]>/<sha256>/<filename>.
+    The file name is kept because pip reads the project, version and tags from it.
+    """
+    return os.path.join(wheelhouse, sha256[:2], sha256, filename)
+
+
+def provision_wheels(python_exe, requirements_file, wheelhouse, lock_name, index_url=None, mirror=None):
+    """
+    Resolve a requirements file and make sure every wheel is in the wheelhouse.
+
+    The resolution is stored as a lock file keyed by the requirements file's
+    contents, the lock name (runtime and version) and the index. While the
+    lock exists and all of its wheels are cached, repeat calls reuse it
+    without touching the network. Otherwise pip resolves the requirements in
+    the target interpreter (pip install --dry-run --report, so nothing is
+    installed yet) and the missing wheels are downloaded in parallel,
+    checked against the index's sha256 and stored by content.
+
+    Args:
+        python_exe (str): The interpreter the packages are for
+        requirements_file (str): pip requirements file
+        wheelhouse (str): Wheelhouse directory from get_wheelhouse
+        lock_name (str): Prefix of the lock file, e.g. 'python-3.14.0'
+        index_url (str): Package index to resolve against, defaults to pip's own configuration
+        mirror (str): Base URL of a cache server (--serve-cache), or None
+
+    Returns:
+        list: Wheel dicts ('name', 'version', 'filename', 'sha256', 'path'), or None on failure
+    """
+    try:
+        with open(requirements_file, 'rb') as f:
+            requirements = f.read()
+    except OSError as e:
+        print(f"{BRIGHT_RED}Could not read requirements file '{requirements_file}': {e}{RESET}")
+        return None
+    key = hashlib.sha256(requirements + b'\0' + (index_url or '').encode('utf-8')).hexdigest()
+    lock_path = os.path.join(wheelhouse, 'locks', f"{lock_name}-{key[:16]}.json")
+
+    wheels = _load_lock(lock_path, wheelhouse)
+    if wheels is not None:
+        metrics.inc('wheel_cache_total', len(wheels), result='hit')
+        print(f"{BRIGHT_GREEN}Using the cached resolution of '{requirements_file}' ({len(wheels)} wheels, no index access).{RESET}")
+        return wheels
+
+    print(f"{BRIGHT_CYAN}Resolving '{requirements_file}'...{RESET}")
+    started = time.perf_counter()
+    with span('packages.resolve', requirements=os.path.basename(requirements_file)) as attrs:
+        wheels = resolve_requirements(python_exe, requirements_file, index_url)
+        attrs['wheels'] = len(wheels) if wheels is not None else 0
+    if wheels is None:
+        return None
+    print(f"{BRIGHT_GREEN}Resolved {len(wheels)} wheels in {time.perf_counter() - started:.1f}s.{RESET}")
+
+    wheels = fill_wheelhouse(wheels, wheelhouse, mirror)
+    if wheels is None:
+        return None
+    _save_lock(lock_path, wheels)
+    return wheels
+
+
+def resolve_requirements(python_exe, requirements_file, index_url=None):
+    """
+    Resolve a requirements file with pip in the target interpreter.
+
+    Only wheels are accepted (--only-binary :all:), so resolving and
+    installing never builds or runs a package's setup code.
+
+    Returns:
+        list: Wheel dicts ('name', 'version', 'filename', 'url', 'sha256' or None), or None on failure
+    """
+    fd, report_path = tempfile.mkstemp(prefix='sw-devtools-pip-report-', suffix='.json')
+    os.close(fd)
+    command = [python_exe, '-m', 'pip', 'install', '--dry-run', '--ignore-installed', '--only-binary', ':all:',
+               '--disable-pip-version-check', '--quiet', '--report', report_path, '-r', requirements_file]
+    if index_url:
+        command[4:4] = ['--index-url', index_url]
+    try:
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        if process.returncode != 0:
+            print(f"{BRIGHT_RED}pip could not resolve '{requirements_file}':\n{process.stdout.strip()[-2000:]}{RESET}")
+            return None
+        with open(report_path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"{BRIGHT_RED}Could not run pip in '{python_exe}': {e}{RESET}")
+        return None
+    finally:
+        try:
+            os.remove(report_path)
+        except OSError:
+            pass
+
+    wheels = []
+    for item in report.get('install', []):
+        download_info = item.get('download_info') or {}
+        url = download_info.get('url', '')
+        filename = urllib.parse.unquote(os.path.basename(urllib.parse.urlsplit(url).path))
+        if not url.startswith(('http://', 'https://')) or not filename.endswith('.whl'):
+            print(f"{BRIGHT_RED}'{url}' is not a wheel on a package index; only index wheels can be cached.{RESET}")
+            return None
+        archive_info = download_info.get('archive_info') or {}
+        sha256 = (archive_info.get('hashes') or {}).get('sha256')
+        if not sha256 and (archive_info.get('hash') or '').startswith('sha256='):
+            sha256 = archive_info['hash'][len('sha256='):]
+        wheels.append({
+            'name': item['metadata']['name'],
+            'version': item['metadata']['version'],
+            'filename': filename,
+            'url': url,
+            'sha256': sha256.lower() if sha256 else None,
+        })
+    return wheels
+
+
+def fill_wheelhouse(wheels, wheelhouse, mirror=None):
+    """
+    Download the wheels that are not in the wheelhouse yet, WHEEL_WORKERS at a time.
+
+    Args:
+        wheels (list): Wheel dicts from resolve_requirements
+        wheelhouse (str): Wheelhouse directory
+        mirror (str): Base URL of a cache server (--serve-cache), or None
+
+    Returns:
+        list: The wheel dicts with 'sha256' and 'path' set, or None if any download failed
+    """
+    missing = [wheel for wheel in wheels
+               if not wheel['sha256'] or not os.path.exists(blob_path(wheelhouse, wheel['sha256'], wheel['filename']))]
+    metrics.inc('wheel_cache_total', len(wheels) - len(missing), result='hit')
+    metrics.inc('wheel_cache_total', len(missing), result='miss')
+    if missing:
+        print(f"{BRIGHT_CYAN}Downloading {len(missing)} of {len(wheels)} wheels into '{wheelhouse}'...{RESET}")
+    else:
+        print(f"{BRIGHT_GREEN}All {len(wheels)} wheels are already in the wheelhouse.{RESET}")
+
+    incoming = os.path.join(wheelhouse, 'incoming')
+    os.makedirs(incoming, exist_ok=True)
+    started = time.perf_counter()
+    failed = []
+
+    def fetch(wheel):
+        part = os.path.join(incoming, f"{os.getpid()}-{wheel['filename']}")
+        try:
+            download_file(wheel['url'], part, show_progress=False, mirror=mirror)
+            actual = sha256_file(part)
+            if wheel['sha256'] and actual != wheel['sha256']:
+                raise ValueError(f"checksum mismatch: expected {wheel['sha256']}, got {actual}")
+            wheel['sha256'] = actual
+            path = blob_path(wheelhouse, actual, wheel['filename'])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(part, path)
+        except Exception as e:
+            failed.append(wheel['filename'])
+            print(f"{BRIGHT_RED}Failed to download '{wheel['filename']}': {e}{RESET}")
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+
+    with span('packages.download', wheels=len(missing)):
+        with ThreadPoolExecutor(max_workers=WHEEL_WORKERS) as pool:
+            list(pool.map(fetch, missing))
+    if failed:
+        return None
+    if missing:
+        print(f"{BRIGHT_GREEN}Downloaded {len(missing)} wheels in {time.perf_counter() - started:.1f}s.{RESET}")
+
+    for wheel in wheels:
+        wheel['path'] = blob_path(wheelhouse, wheel['sha256'], wheel['filename'])
+    return wheels
+
+
+def install_wheels(python_exe, wheelhouse, wheels):
+    """
+    Install resolved wheels from the wheelhouse with pip, without any index.
+
+    pip gets a find-links page listing exactly these wheels (with their
+    sha256, which pip checks), --no-index and the pinned versions. The
+    resolution is already complete, so --no-deps skips resolving again.
+    pip configuration files and PIP_* variables are ignored, so no other
+    find-links or index can add wheels.
+
+    Args:
+        python_exe (str): The interpreter to install into
+        wheelhouse (str): Wheelhouse directory (the find-links page is written there)
+        wheels (list): Wheel dicts with 'name', 'version', 'sha256' and 'path'
+
+    Returns:
+        bool: True if pip succeeded
+    """
+    if not wheels:
+        print(f"{BRIGHT_YELLOW}The requirements resolved to no packages, nothing to install.{RESET}")
+        return True
+    links_path = os.path.join(wheelhouse, f"links-{os.getpid()}.html")
+    anchors = [f'<a href="{pathlib.Path(os.path.abspath(wheel["path"])).as_uri()}#sha256={wheel["sha256"]}">{wheel["filename"]}</a><br>'
+               for wheel in wheels]
+    with open(links_path, 'w', encoding='utf-8') as f:
+        f.write('<!DOCTYPE html>\n<html><body>\n' + '\n'.join(anchors) + '\n</body></html>\n')
+
+    command = [python_exe, '-m', 'pip', 'install', '--no-index', '--find-links', links_path, '--no-deps',
+               '--only-binary', ':all:', '--disable-pip-version-check', '--no-warn-script-location',
+               *[f"{wheel['name']}=={wheel['version']}" for wheel in wheels]]
+    env = {key: value for key, value in os.environ.items() if not key.upper().startswith('PIP_')}
+    env['PIP_CONFIG_FILE'] = os.devnull
+    print(f"{BRIGHT_CYAN}Installing {len(wheels)} packages from the wheelhouse...{RESET}")
+    started = time.perf_counter()
+    try:
+        with span('packages.install', wheels=len(wheels)) as attrs:
+            process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
+            attrs['returncode'] = process.returncode
+    except OSError as e:
+        print(f"{BRIGHT_RED}Could not run pip in '{python_exe}': {e}{RESET}")
+        return False
+    finally:
+        try:
+            os.remove(links_path)
+        except OSError:
+            pass
+    if process.returncode != 0:
+        print(f"{BRIGHT_RED}pip install failed:\n{process.stdout.strip()[-2000:]}{RESET}")
+        return False
+    metrics.inc('packages_installed_total', len(wheels))
+    print(f"{BRIGHT_GREEN}Installed {len(wheels)} packages in {time.perf_counter() - started:.1f}s.{RESET}")
+    return True
+
+
+def _load_lock(lock_path, wheelhouse):
+    """Return the locked wheels if the lock exists and every wheel is still cached, otherwise None."""
+    try:
+        with open(lock_path, 'r', encoding='utf-8') as f:
+            wheels = json.load(f)['wheels']
+        for wheel in wheels:
+            wheel['path'] = blob_path(wheelhouse, wheel['sha256'], wheel['filename'])
+            if not os.path.exists(wheel['path']):
+                return None
+        return wheels
+    except Exception:
+        return None
+
+
+def _save_lock(lock_path, wheels):
+    """Store a resolution next to the wheels it refers to (atomically)."""
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    tmp_path = f"{lock_path}.{os.getpid()}.tmp"
+    entries = [{key: wheel[key] for key in ('name', 'version', 'filename', 'sha256')} for wheel in wheels]
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'created': time.time(), 'wheels': entries}, f, indent=4)
+        os.replace(tmp_path, lock_path)
+    except OSError as e:
+        print(f"{BRIGHT_YELLOW}Could not save the resolution to '{lock_path}': {e}{RESET}")
@@ -1,10 +1,7 @@
 import os
 import sys
 import argparse
-from functions.initialize import init_default_conifg, init_default_conifg_ud
-from functions.python import python
-from functions.php import php
-from functions.iso import list_available_isos, download_iso
+import importlib
 
 # ANSI escape codes for CLI colors
 RESET = "\033[0m"
@@ -54,20 +51,89 @@ BG_BRIGHT_WHITE = "\033[107m"
 
 CONFIG_FILE = os.getenv("SW_DEVTOOLS_CONFIG")
 
+# Command registry: name -> 'module:attribute'. Modules are imported only when a
+# command is dispatched, so --version and --status don't pay for urllib, zipfile,
+# winreg and friends.
+COMMANDS = {
+    'init.default': 'functions.initialize:init_default_conifg',
+    'init.custom': 'functions.initialize:init_default_conifg_ud',
+    'runtime.install': 'functions.pipeline:install_runtime',
+    'runtime.install_many': 'functions.pipeline:install_many',
+    'runtime.parse': 'functions.pipeline:parse_runtime_list',
+    'runtime.resolve': 'functions.pipeline:resolve_install_versions',
+    'runtime.uninstall': 'functions.pipeline:uninstall_runtime',
+    'php.profile': 'functions.phpini:apply_installed_profile',
+    'php.manage': 'functions.phpext:manage_extensions',
+    'path.optimize': 'functions.path:optimize_path',
+    'shims.update': 'functions.shims:update_shims',
+    'iso.download': 'functions.iso:download_iso',
+    'iso.repair': 'functions.iso:repair_iso',
+    'admin.check': 'functions.admin:is_admin',
+    'broker.run': 'functions.broker:run_privileged',
+    'broker.serve': 'functions.broker:serve_broker',
+    'bundle.create': 'functions.bundle:create_bundle',
+    'bundle.install': 'functions.bundle:install_bundle',
+    'cache.serve': 'functions.cache_server:serve_cache',
+    'daemon.run': 'functions.daemon:run',
+    'daemon.serve': 'functions.daemon:serve_daemon',
+    'daemon.stop': 'functions.daemon:stop_daemon',
+    'trace.start': 'functions.trace:start',
+    'trace.finish': 'functions.trace:finish',
+}
+
+
+def command(name):
+    """Import and return the callable registered for a command."""
+    module_name, attribute = COMMANDS[name].split(':')
+    target = importlib.import_module(module_name)
+    for part in attribute.split('.'):
+        target = getattr(target, part)
+    return target
+
+
 def main():
-    print(f"""{BRIGHT_CYAN}SyncWide Solutions Developer Tools (Version: 0.0.1b){RESET}
+    if '--json' not in sys.argv:
+        print(f"""{BRIGHT_CYAN}SyncWide Solutions Developer Tools (Version: 0.0.1b){RESET}
 
 """)
 
     parser = argparse.ArgumentParser(description='SyncWide Solutions Developer Tools')
     
     parser.add_argument('--version', action='store_true', help='Show the version of the tool')
-    parser.add_argument('--install', '-i', help='Install requested packages', type=str)
+    parser.add_argument('--install', '-i', help='Install requested packages (e.g., python or python,php); pick versions with @ (python@3.13.7, python@3.12, php@latest)', type=str)
+    parser.add_argument('--mode', help='Install mode for --install (e.g., portable: Python from the embeddable zip with pip, no MSI)', type=str)
+    parser.add_argument('--with', dest='requirements', help='pip requirements file to install into Python after --install, from the shared wheel cache', type=str)
+    parser.add_argument('--php-profile', help='php.ini profile written for PHP by --install, or re-applied to the installed PHP (development, cli, production)', type=str)
+    parser.add_argument('--php', help='Manage the installed PHP: ext list | ext enable <names> | ext disable <names> | ext minimal <cli|ci>', type=str, nargs='+')
+    parser.add_argument('--restart', help='Run every --install stage again instead of resuming an interrupted install', action='store_true')
+    parser.add_argument('--no-compile', help='Do not precompile Python bytecode after --install', action='store_true')
     parser.add_argument('--uninstall', '-u', help='Uninstall requested packages', type=str)
     parser.add_argument('--init', help='Initialize configuration for faster Command execution')
-    parser.add_argument('--status', help='Show the status of requested packages', type=str)
+    parser.add_argument('--status', help='Show the status of requested packages (e.g., python, php,python or all)', type=str)
+    parser.add_argument('--json', help='Print --status results as JSON', action='store_true')
+    parser.add_argument('--no-cache', help='Probe runtime versions again instead of using the version cache', action='store_true')
     parser.add_argument('--iso', help='List available ISOs or download with path (e.g., windows/11/media_creation_tool_download)', type=str, nargs='?', const='list')
+    parser.add_argument('--repair', help='With --iso <path>: re-fetch only the blocks of the downloaded ISO that fail their block hashes', action='store_true')
     parser.add_argument('--language', '--lang', help='Sets the language for the requested ISO image (e.g., en_US, de_DE, fr_FR)', type=str, default='en_US')
+    parser.add_argument('--path', help='Manage the PATH environment variable (e.g., optimize)', type=str, choices=['optimize'])
+    parser.add_argument('--scope', help='PATH scope used by --path (system or user)', type=str, choices=['system', 'user'], default='system')
+    parser.add_argument('--hot', help='Comma-separated directories --path optimize moves to the front of PATH', type=str)
+    parser.add_argument('--keep-missing', help='Do not drop PATH entries whose directory no longer exists', action='store_true')
+    parser.add_argument('--apply', help='Write the changes proposed by --path optimize instead of a dry run', action='store_true')
+    parser.add_argument('--shims', help='Regenerate the python/pip/php launchers in the shims directory', action='store_true')
+    parser.add_argument('--bundle', help='Create an offline bundle or install from one (requires --bundle-file)', type=str, choices=['create', 'install'])
+    parser.add_argument('--bundle-file', help='Bundle file used by --bundle', type=str)
+    parser.add_argument('--runtimes', help='Comma-separated runtimes for --bundle (default: all); create also takes name@version', type=str)
+    parser.add_argument('--isos', help='Comma-separated ISO paths for --bundle (e.g., linux/ubuntu/24.04_lts/desktop_amd64)', type=str)
+    parser.add_argument('--broker-serve', help=argparse.SUPPRESS, type=str)
+    parser.add_argument('--serve', help='Run the resident daemon that answers --status and --iso list from warm caches (or stop it)', type=str, nargs='?', const='start', choices=['start', 'stop'])
+    parser.add_argument('--serve-cache', help='Serve the artifact/ISO cache to other machines over HTTP, filling misses from upstream', action='store_true')
+    parser.add_argument('--bind', help='Address --serve-cache listens on', type=str, default='0.0.0.0')
+    parser.add_argument('--port', help='Port --serve-cache listens on', type=int, default=8080)
+    parser.add_argument('--cache-dir', help='Directory --serve-cache stores mirrored files in', type=str)
+    parser.add_argument('--no-daemon', help='Run --status and --iso list in this process even if the daemon is running', action='store_true')
+    parser.add_argument('--trace', help='Write timing spans of the command to this file in Chrome trace format (chrome://tracing, Perfetto)', type=str)
+    parser.add_argument('--profile', help='Print a cProfile summary and the tracemalloc peak of the command, optionally saving the stats to a file', type=str, nargs='?', const='')
 
     args = parser.parse_args()
 
@@ -75,47 +141,113 @@ def main():
         print(f"{BRIGHT_CYAN}Version: {GREEN}0.0.1b{RESET}")
         sys.exit(0)
 
+    if args.trace or args.profile is not None:
+        import atexit
+        # atexit also covers the sys.exit calls below
+        atexit.register(command('trace.finish'), args.trace, args.profile)
+        command('trace.start')(trace=bool(args.trace), profile=args.profile is not None)
+
+    if args.broker_serve is not None:
+        sys.exit(0 if command('broker.serve')(args.broker_serve) else 1)
+
+    if args.serve == 'start':
+        sys.exit(0 if command('daemon.serve')() else 1)
+    if args.serve == 'stop':
+        command('daemon.stop')()
+
+    if args.serve_cache:
+        sys.exit(0 if command('cache.serve')(args.bind, args.port, args.cache_dir) else 1)
+
     if args.init is not None:
-        if args.init == 'default':
-            try:
-                init_default_conifg()
-                print(f"{BRIGHT_GREEN}Initialization complete.{RESET}")
-            except Exception as e:
-                print(f"{BRIGHT_RED}Error during initialization: {e}{RESET}")
-        else:
-            try:
-                init_default_conifg_ud(args.init)
+        # The elevated helper may run in another working directory
+        path = args.init if args.init == 'default' else os.path.abspath(args.init)
+        try:
+            if command('broker.run')('init', path=path):
                 print(f"{BRIGHT_GREEN}Initialization complete.{RESET}")
-            except Exception as e:
-                print(f"{BRIGHT_RED}Error during initialization: {e}{RESET}")
+        except Exception as e:
+            print(f"{BRIGHT_RED}Error during initialization: {e}{RESET}")
         sys.exit(0)
     
     if args.install is not None:
-        if args.install.lower() == 'python':
-            python.install()
-        if args.install.lower() == 'php':
-            php.install()
+        names = command('runtime.parse')(args.install)
+        versions = command('runtime.resolve')(args.install)
+        if versions is None:
+            sys.exit(1)
+        # The elevated helper may run in another working directory
+        requirements = os.path.abspath(args.requirements) if args.requirements else None
+        if len(names) > 1:
+            ok = command('runtime.install_many')(names, versions=versions, mode=args.mode, precompile=not args.no_compile,
+                                                 requirements=requirements, ini_profile=args.php_profile, restart=args.restart)
+        else:
+            ok = command('runtime.install')(names[0], versions.get(names[0]), mode=args.mode, precompile=not args.no_compile,
+                                            requirements=requirements, ini_profile=args.php_profile, restart=args.restart) if names else False
+        if not ok:
+            sys.exit(1)
+
+    if args.php_profile and 'php' not in command('runtime.parse')(args.install or ''):
+        if not command('php.profile')(args.php_profile):
+            sys.exit(1)
+
+    if args.php is not None:
+        if not command('php.manage')(args.php):
+            sys.exit(1)
 
     if args.uninstall is not None:
-        if args.uninstall.lower() == 'python':
-            python.uninstall()
-        if args.uninstall.lower() == 'php':
-            php.uninstall()
+        if not command('runtime.uninstall')(args.uninstall.lower()):
+            sys.exit(1)
     
+    if args.bundle is not None:
+        if not args.bundle_file:
+            print(f"{BRIGHT_RED}--bundle {args.bundle} requires --bundle-file.{RESET}")
+            sys.exit(1)
+        runtimes = command('runtime.parse')(args.runtimes) if args.runtimes else None
+        isos = [p.strip() for p in args.isos.split(',') if p.strip()] if args.isos else None
+        if args.bundle == 'create':
+            versions = command('runtime.resolve')(args.runtimes) if args.runtimes else None
+            if args.runtimes and versions is None:
+                sys.exit(1)
+            ok = command('bundle.create')(args.bundle_file, runtimes=runtimes, isos=isos, language=args.language,
+                                          versions=versions)
+        elif args.runtimes and '@' in args.runtimes:
+            print(f"{BRIGHT_RED}--bundle install takes runtime names only; the bundle fixes their versions.{RESET}")
+            sys.exit(1)
+        else:
+            ok = command('bundle.install')(args.bundle_file, runtimes=runtimes, isos=isos)
+        if not ok:
+            sys.exit(1)
+
+    # Traced and profiled commands must run in this process to be measured
+    use_daemon = not (args.no_daemon or args.trace or args.profile is not None)
+
     if args.status is not None:
-        if args.status.lower() == 'python':
-            python.status()
-        if args.status.lower() == 'php':
-            php.status()
+        if command('daemon.run')('status', use_daemon=use_daemon, value=args.status, as_json=args.json, use_cache=not args.no_cache):
+            sys.exit(1)
+
+    if args.path == 'optimize':
+        hot = [d.strip() for d in args.hot.split(',') if d.strip()] if args.hot else None
+        if args.apply and args.scope == 'system':
+            result = command('broker.run')('optimize_path', scope=args.scope, hot=hot, prune_missing=not args.keep_missing)
+        else:
+            result = command('path.optimize')(args.scope, hot=hot, prune_missing=not args.keep_missing, apply=args.apply)
+        if result is None or result is False:
+            sys.exit(1)
+
+    if args.shims:
+        if not command('broker.run')('update_shims'):
+            sys.exit(1)
 
     if args.iso is not None:
         if args.iso == 'list' or args.iso.lower() == 'list':
-            list_available_isos()
+            command('daemon.run')('iso_list', use_daemon=use_daemon)
         else:
             # Download the ISO with the specified path and language
             language = args.language if args.language else 'en_US'
             try:
-                download_iso(args.iso, language)
+                if args.repair:
+                    if not command('iso.repair')(args.iso, language):
+                        sys.exit(1)
+                else:
+                    command('iso.download')(args.iso, language)
             except Exception as e:
                 print(f"{BRIGHT_RED}Failed to download ISO: {e}{RESET}")
                 sys.exit(1)
@@ -0,0 +1,86 @@
+"""Offline checks of the LAN cache server against a loopback upstream.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from functions.cache_server import CacheServer
+from functions.download import CHUNK_SIZE, mirror_url
+
+# The cache fills a chunk at a time, so upstream holds back its second half on a chunk boundary
+HALF = b'x' * (2 * CHUNK_SIZE)
+
+
+class Upstream(BaseHTTPRequestHandler):
+    """Sends half of /file, waits for the test to release it, then sends the rest without a Content-Length."""
+    protocol_version = 'HTTP/1.0'
+    release = None
+
+    def do_GET(self):
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(HALF)
+        self.wfile.flush()
+        self.release.wait(10)
+        self.wfile.write(HALF)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CacheServerTests(unittest.TestCase):
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='sw-devtools-test-')
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        handler = type('Handler', (Upstream,), {'release': self.release})
+        self.upstream = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.upstream_host = f"127.0.0.1:{self.upstream.server_address[1]}"
+        self.server = CacheServer(('127.0.0.1', 0), os.path.join(self.work_dir, 'cache'),
+                                  {self.upstream_host: 'http', 'files.example.org': 'https'})
+        self.server.RequestHandlerClass.log_message = lambda *args: None
+        for server in (self.upstream, self.server):
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+        self.mirror = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def test_encoded_slash_cannot_pick_another_host_directory(self):
+        self.assertEqual(self.server.resolve('/files.example.org/%2E%2E%2F127.0.0.1_1%2Fa.iso'), (None, None))
+        self.assertEqual(self.server.resolve('/files.example.org/pkg%2Fa.whl'), (None, None))
+        url, cache_path = self.server.resolve('/files.example.org/pkg/a%20b.whl')
+        self.assertEqual(url, 'https://files.example.org/pkg/a%20b.whl')
+        self.assertEqual(cache_path, os.path.join(self.server.cache_dir, 'files.example.org', 'pkg', 'a b.whl'))
+
+    def test_unknown_size_is_streamed_while_the_cache_fills(self):
+        url = f"http://{self.upstream_host}/file"
+        with urllib.request.urlopen(mirror_url(url, self.mirror), timeout=10) as response:
+            self.assertEqual(response.headers.get('Transfer-Encoding'), 'chunked')
+            # The first bytes arrive while upstream still holds back its second half
+            first = response.read(CHUNK_SIZE)
+            self.release.set()
+            self.assertEqual(first + response.read(), HALF + HALF)
+        _, cache_path = self.server.resolve(f"/{self.upstream_host}/file")
+        with open(cache_path, 'rb') as f:
+            self.assertEqual(f.read(), HALF + HALF)
+
+        # Once cached, the size is known
+        with urllib.request.urlopen(mirror_url(url, self.mirror), timeout=10) as response:
+            self.assertEqual(response.headers.get('Content-Length'), str(2 * len(HALF)))
+            self.assertEqual(response.read(), HALF + HALF)
+
+
+if __name__ == '__main__':
+    unittest.main()
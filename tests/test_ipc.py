@@ -0,0 +1,110 @@
+"""Offline checks of the signed local IPC protocol over a socketpair and a loopback server.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import time
+import socket
+import threading
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from functions import ipc
+from functions.ipc import IPCError, LocalClient, LocalServer, decode_message, encode_message, serve_connection
+
+TOKEN = 'a' * 64
+OTHER_TOKEN = 'b' * 64
+
+
+class ServeConnectionTests(unittest.TestCase):
+    """serve_connection on one end of a socketpair, with the test writing requests to the other."""
+
+    def setUp(self):
+        self.handled = []
+        server, self.client = socket.socketpair()
+        self.addCleanup(self.client.close)
+        self.reader = self.client.makefile('rb')
+        self.addCleanup(self.reader.close)
+
+        def serve():
+            with server, server.makefile('rb') as reader, server.makefile('wb') as writer:
+                serve_connection(reader, writer, self.handle, TOKEN, set())
+
+        thread = threading.Thread(target=serve, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.client.shutdown, socket.SHUT_WR)
+
+    def handle(self, message):
+        self.handled.append(message)
+        return {'ok': True, 'result': message.get('op')}
+
+    def send(self, line):
+        self.client.sendall(line)
+        return decode_message(self.reader.readline(), TOKEN)
+
+    def test_signed_request_is_answered_with_a_signed_reply(self):
+        reply = self.send(encode_message({'op': 'status', 'id': 'r1'}, TOKEN))
+        self.assertEqual(reply, {'ok': True, 'result': 'status', 'id': 'r1'})
+        self.assertEqual(self.handled, [{'op': 'status'}])
+
+    def test_wrong_token_is_rejected(self):
+        reply = self.send(encode_message({'op': 'status'}, OTHER_TOKEN))
+        self.assertEqual(reply, {'ok': False, 'error': 'Authentication failed'})
+        self.assertEqual(self.handled, [])
+
+    def test_unsigned_request_is_rejected(self):
+        reply = self.send(encode_message({'op': 'status'}))
+        self.assertEqual(reply['error'], 'Authentication failed')
+        self.assertEqual(self.handled, [])
+
+    def test_expired_request_is_rejected(self):
+        with mock.patch.object(ipc.time, 'time', return_value=time.time() - ipc.MAX_MESSAGE_AGE - 60):
+            line = encode_message({'op': 'status'}, TOKEN)
+        reply = self.send(line)
+        self.assertEqual(reply['error'], 'Message expired')
+        self.assertEqual(self.handled, [])
+
+    def test_replayed_request_is_rejected(self):
+        line = encode_message({'op': 'status'}, TOKEN)
+        self.assertTrue(self.send(line)['ok'])
+        self.assertEqual(self.send(line)['error'], 'Replayed message')
+        self.assertEqual(len(self.handled), 1)
+
+
+class ClientTests(unittest.TestCase):
+    def serve(self, token):
+        server = LocalServer(token, lambda message: {'ok': True, 'result': message['args'], 'output': ''})
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_call_returns_the_result(self):
+        server = self.serve(TOKEN)
+        self.assertEqual(LocalClient(server.port, TOKEN).call('echo', value=1), {'value': 1})
+
+    def test_reply_signed_with_another_token_is_refused(self):
+        server = self.serve(OTHER_TOKEN)
+        with self.assertRaisesRegex(IPCError, 'Authentication failed'):
+            ipc.request('127.0.0.1', server.port, {'op': 'ping'}, TOKEN, timeout=5)
+        self.assertFalse(LocalClient(server.port, TOKEN).ping())
+
+    def test_replayed_reply_is_refused(self):
+        left, right = socket.socketpair()
+        self.addCleanup(left.close)
+        self.addCleanup(right.close)
+        # A reply captured from an earlier request, sent back to a new one
+        old_reply = encode_message({'ok': True, 'result': True, 'id': 'earlier'}, TOKEN)
+        with mock.patch.object(ipc.socket, 'create_connection', return_value=left):
+            right.sendall(old_reply)
+            with self.assertRaisesRegex(IPCError, 'does not answer'):
+                ipc.request('127.0.0.1', 0, {'op': 'ping'}, TOKEN)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Offline checks of the Metalink 4 and Metalink 3 parser.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from functions.metalink import parse_metalink
+
+META4 = b"""<?xml version="1.0" encoding="UTF-8"?>
+<metalink xmlns="urn:ietf:params:xml:ns:metalink">
+  <file name="image.iso">
+    <size>10</size>
+    <hash type="sha-256">AB12</hash>
+    <pieces length="4" type="sha-256">
+      <hash>p0</hash>
+      <hash>p1</hash>
+      <hash>p2</hash>
+    </pieces>
+    <url priority="2">https://two.example/image.iso</url>
+    <url priority="1">https://one.example/image.iso</url>
+    <url priority="3">ftp://three.example/image.iso</url>
+  </file>
+</metalink>
+"""
+
+METALINK3 = b"""<?xml version="1.0" encoding="UTF-8"?>
+<metalink version="3.0" xmlns="http://www.metalinker.org/">
+  <files>
+    <file name="image.iso">
+      <size>10</size>
+      <verification>
+        <hash type="md5">00ff</hash>
+        <hash type="SHA256">AB12</hash>
+        <pieces length="4" type="sha1">
+          <hash piece="2">p2</hash>
+          <hash piece="0">p0</hash>
+          <hash piece="1">p1</hash>
+        </pieces>
+      </verification>
+      <resources>
+        <url type="http" preference="10">http://low.example/image.iso</url>
+        <url type="http" preference="100">http://high.example/image.iso</url>
+      </resources>
+    </file>
+  </files>
+</metalink>
+"""
+
+
+class ParseMetalinkTests(unittest.TestCase):
+    def test_metalink4(self):
+        meta = parse_metalink(META4)
+        self.assertEqual(meta['sha256'], 'ab12')
+        self.assertEqual(meta['piece_type'], 'sha256')
+        self.assertEqual(meta['pieces'], ['p0', 'p1', 'p2'])
+        self.assertEqual(meta['urls'], ['https://one.example/image.iso', 'https://two.example/image.iso'])
+
+    def test_metalink3_hash_names(self):
+        meta = parse_metalink(METALINK3)
+        self.assertEqual(meta['sha256'], 'ab12')
+        self.assertEqual(meta['piece_type'], 'sha1')
+        self.assertEqual(meta['piece_length'], 4)
+        self.assertEqual(meta['pieces'], ['p0', 'p1', 'p2'])
+        self.assertEqual(meta['urls'], ['http://high.example/image.iso', 'http://low.example/image.iso'])
+
+    def test_unknown_piece_type_is_ignored(self):
+        meta = parse_metalink(METALINK3.replace(b'type="sha1"', b'type="crc32"'))
+        self.assertEqual(meta['pieces'], [])
+        self.assertIsNone(meta['piece_type'])
+
+
+if __name__ == '__main__':
+    unittest.main()
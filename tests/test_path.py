@@ -0,0 +1,97 @@
+"""Offline checks of the PATH snapshot with an injected reader instead of the registry.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from functions import path
+from functions.path import PathSnapshot
+
+ROOT = os.path.abspath(os.sep)
+
+
+def entry(*parts):
+    return os.path.join(ROOT, *parts)
+
+
+class PathSnapshotTests(unittest.TestCase):
+    def snapshot(self, system='', user=''):
+        values = {'system': system, 'user': user}
+        return PathSnapshot(lambda scope: values[scope])
+
+    def test_lookup_is_normalized(self):
+        tools = entry('Opt', 'Tools')
+        with mock.patch.dict(os.environ, {'SW_DEVTOOLS_TEST_ROOT': entry('srv')}):
+            snapshot = self.snapshot(system=f' "{tools}{os.sep}" ;{entry("usr")}{os.sep}{os.sep}bin;%SW_DEVTOOLS_TEST_ROOT%{os.sep}php')
+            self.assertTrue(snapshot.contains(entry('opt', 'tools')))
+            self.assertEqual(snapshot.find(entry('OPT', 'TOOLS'), 'system'), f'"{tools}{os.sep}"')
+            self.assertIn(entry('usr', 'bin'), snapshot)
+            self.assertTrue(snapshot.contains(entry('srv', 'php')))
+        self.assertFalse(snapshot.contains(tools, 'user'))
+        self.assertFalse(snapshot.contains(entry('opt')))
+
+    def test_duplicates_keep_their_first_spelling(self):
+        first, second = entry('a'), entry('A') + os.sep
+        snapshot = self.snapshot(system=f"{first};{second};{entry('b')}", user=second)
+        # The entries stay as PATH has them; lookups answer with the first one that matches
+        self.assertEqual(snapshot.get('system'), [first, second, entry('b')])
+        self.assertEqual(snapshot.find(entry('a')), first)
+        self.assertEqual(snapshot.find(entry('a'), 'user'), second)
+
+    def test_unreadable_scope_is_empty(self):
+        def reader(scope):
+            if scope == 'user':
+                raise OSError('access denied')
+            return entry('a')
+        snapshot = PathSnapshot(reader)
+        self.assertEqual(snapshot.get('system'), [entry('a')])
+        self.assertEqual(snapshot.get('user'), [])
+
+
+class SharedSnapshotTests(unittest.TestCase):
+    def setUp(self):
+        self.values = {'system': entry('a'), 'user': ''}
+        self.reads = []
+        path.set_path_reader(self.read)
+        self.addCleanup(path.set_path_reader, None)
+
+    def read(self, scope):
+        self.reads.append(scope)
+        return self.values[scope]
+
+    def test_snapshot_is_read_once_until_invalidated(self):
+        snapshot = path.get_path_snapshot()
+        self.assertIs(path.get_path_snapshot(), snapshot)
+        self.assertEqual(self.reads, ['system', 'user'])
+
+        self.values['system'] = entry('b')
+        self.assertFalse(path.get_path_snapshot().contains(entry('b')))
+        path.invalidate_path_snapshot()
+        self.assertTrue(path.get_path_snapshot().contains(entry('b')))
+        self.assertEqual(len(self.reads), 4)
+
+    def test_get_path_uses_the_reader(self):
+        self.values['user'] = f"{entry('u')};;{entry('v')}"
+        self.assertEqual(path.get_path('user'), [entry('u'), entry('v')])
+
+    def test_new_reader_drops_the_snapshot(self):
+        path.get_path_snapshot()
+        path.set_path_reader(lambda scope: entry('c'))
+        self.assertTrue(path.get_path_snapshot().contains(entry('c'), 'user'))
+
+    def test_revalidate_without_a_registry_stamp_uses_the_age(self):
+        snapshot = path.get_path_snapshot()
+        self.assertIs(path.revalidate_path_snapshot(max_age=60), snapshot)
+        self.values['system'] = entry('b')
+        self.assertTrue(path.revalidate_path_snapshot(max_age=0).contains(entry('b')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Offline checks of the release index parsers and version resolution against saved listings.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(TESTS_DIR, 'fixtures')
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from functions import config, releases
+
+PYTHON_FTP_URL = 'https://www.python.org/ftp/python/'
+PHP_RELEASES_URL = 'https://windows.php.net/downloads/releases/releases.json'
+PHP_ARCHIVES_URL = 'https://windows.php.net/downloads/releases/archives/'
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class ParserTests(unittest.TestCase):
+    def test_python_ftp_lists_version_directories(self):
+        versions = releases.parse_python_ftp(read_fixture('python-ftp.html'), PYTHON_FTP_URL)
+        self.assertEqual(sorted(versions, key=releases.version_key),
+                         ['3.12.10', '3.12.11', '3.13.7', '3.14.0', '3.15.0'])
+        self.assertEqual(versions['3.14.0'], {})
+
+    def test_php_releases_picks_nts_x64_zip(self):
+        versions = releases.parse_php_releases(read_fixture('php-releases.json'), PHP_RELEASES_URL)
+        self.assertEqual(set(versions), {'8.3.26', '8.4.13'})
+        self.assertEqual(versions['8.4.13'], {
+            'url': 'https://windows.php.net/downloads/releases/php-8.4.13-nts-Win32-vs17-x64.zip',
+            'sha256': '5e6f7a8b9c0d1e2f3a4b5c6d7e8f9a0b1c2d3e4f5a6b7c8d9e0f1a2b3c4d5e6f',
+        })
+
+    def test_php_archives_lists_older_patches(self):
+        versions = releases.parse_php_archives(read_fixture('php-archives.html'), PHP_ARCHIVES_URL)
+        self.assertEqual(set(versions), {'7.2.14', '8.3.12', '8.3.26', '8.4.11'})
+        self.assertEqual(versions['8.4.11']['url'],
+                         'https://windows.php.net/downloads/releases/archives/php-8.4.11-nts-Win32-vs17-x64.zip')
+        self.assertEqual(versions['7.2.14']['url'],
+                         'https://windows.php.net/downloads/releases/archives/php-7.2.14-nts-Win32-VC15-x64.zip')
+        self.assertNotIn('sha256', versions['8.3.12'])
+
+    def test_earlier_source_wins(self):
+        current = releases.parse_php_releases(read_fixture('php-releases.json'), PHP_RELEASES_URL)
+        archives = releases.parse_php_archives(read_fixture('php-archives.html'), PHP_ARCHIVES_URL)
+        versions = releases.merge_sources([current, archives])
+        self.assertEqual(versions['8.3.26'], current['8.3.26'])
+        self.assertEqual(versions['8.3.12'], archives['8.3.12'])
+
+
+class ResolveTests(unittest.TestCase):
+    """resolve_version against a fresh cached index, with the installer checks answered from a fixed set."""
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp(prefix='sw-devtools-test-')
+        patches = [
+            mock.patch.dict(os.environ, {'LOCALAPPDATA': self.work_dir, 'ProgramFiles': self.work_dir}),
+            mock.patch.object(config, 'CONFIG_FILE', None),
+            mock.patch.object(releases, 'probe', self.probe),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+        self.installers = {'3.12.11', '3.13.7', '3.14.0'}
+        self.probed = []
+
+        index = {}
+        for name, fixture, url in (('python', 'python-ftp.html', PYTHON_FTP_URL),
+                                   ('php', 'php-releases.json', PHP_RELEASES_URL)):
+            source = releases.get_sources(name)[0]
+            versions = releases.PARSERS[source['format']](read_fixture(fixture), url)
+            index[name] = {'versions': versions, 'fetched_at': time.time(), 'sources': {}}
+        releases.save_index(index)
+
+    def probe(self, url):
+        self.probed.append(url)
+        return any(f"/{version}/" in url for version in self.installers)
+
+    def test_latest_skips_directories_without_an_installer(self):
+        self.assertEqual(releases.resolve_version('python', 'latest'), '3.14.0')
+        self.assertEqual(len(self.probed), 2)
+
+    def test_installer_checks_are_remembered(self):
+        releases.resolve_version('python', 'latest')
+        self.probed.clear()
+        self.assertEqual(releases.resolve_version('python', 'latest'), '3.14.0')
+        self.assertEqual(self.probed, [])
+        with open(os.path.join(self.work_dir, 'SyncWide Devtools', 'cache', releases.RELEASE_INDEX_FILE)) as f:
+            versions = json.load(f)['python']['versions']
+        self.assertFalse(versions['3.15.0']['available'])
+        self.assertTrue(versions['3.14.0']['available'])
+
+    def test_prefix_picks_newest_release_with_installer(self):
+        self.assertEqual(releases.resolve_version('python', '3.13'), '3.13.7')
+        self.assertEqual(releases.resolve_version('python', '3.12'), '3.12.11')
+
+    def test_no_release_with_installer(self):
+        self.installers.clear()
+        self.assertIsNone(releases.resolve_version('python', '3.12'))
+        self.assertEqual(len(self.probed), 2)
+
+    def test_exact_version_without_installer_is_refused(self):
+        self.assertIsNone(releases.resolve_version('python', '3.15.0'))
+
+    def test_listed_download_needs_no_check(self):
+        self.assertEqual(releases.resolve_version('php', 'latest'), '8.4.13')
+        self.assertEqual(self.probed, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
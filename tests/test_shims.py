@@ -0,0 +1,146 @@
+"""Offline checks of the shim launchers, their place on PATH and how --status sees them, against a fake registry.
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+import os
+import sys
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+from functions import path, shims, status
+
+CONSOLE, GUI = 3, 2
+
+
+class FakeWinreg:
+    """The parts of winreg that path.py uses, holding one PATH value per scope."""
+    HKEY_LOCAL_MACHINE, HKEY_CURRENT_USER = 'system', 'user'
+    KEY_READ, KEY_WRITE, REG_EXPAND_SZ = 1, 2, 2
+
+    def __init__(self, system_path):
+        self.values = {'system': system_path, 'user': ''}
+        self.writes = 0
+
+    def OpenKey(self, hkey, key_path, reserved=0, access=0):
+        return hkey
+
+    def CloseKey(self, key):
+        pass
+
+    def QueryValueEx(self, key, name):
+        return self.values[key], self.REG_EXPAND_SZ
+
+    def SetValueEx(self, key, name, reserved, reg_type, value):
+        self.values[key] = value
+        self.writes += 1
+
+    def QueryInfoKey(self, key):
+        return 0, 1, self.writes
+
+
+def write_executable(file_path, subsystem):
+    """Write just enough of a PE image for the subsystem to be read from its header."""
+    header = bytearray(0x200)
+    header[0:2] = b'MZ'
+    struct.pack_into('<I', header, 0x3C, 0x80)
+    header[0x80:0x84] = b'PE\0\0'
+    struct.pack_into('<H', header, 0x80 + 24 + 68, subsystem)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'wb') as f:
+        f.write(bytes(header))
+
+
+class UpdateShimsTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix='sw-devtools-test-')
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.shims_dir = os.path.join(self.root, 'shims')
+        self.python_dir = os.path.join(self.root, 'Python314')
+        write_executable(os.path.join(self.python_dir, 'python.exe'), CONSOLE)
+        write_executable(os.path.join(self.python_dir, 'pythonw.exe'), GUI)
+        self.other_python = os.path.join(self.root, 'other-python')
+        os.makedirs(self.other_python)
+        self.cfg = {'install_path': self.root, 'python_path': self.python_dir}
+
+        self.registry = FakeWinreg(';'.join([self.other_python, self.python_dir, self.shims_dir]))
+        self.compiled = []
+        for patch in (mock.patch.object(path, 'winreg', self.registry),
+                      mock.patch.object(shims, '_compile_launcher', self.compile_launcher)):
+            patch.start()
+            self.addCleanup(patch.stop)
+        path.invalidate_path_snapshot()
+        self.addCleanup(path.invalidate_path_snapshot)
+
+    def compile_launcher(self, output_path, gui):
+        self.compiled.append(gui)
+        with open(output_path, 'wb') as f:
+            f.write(b'gui launcher' if gui else b'console launcher')
+        return True
+
+    def read(self, name, mode='r'):
+        with open(os.path.join(self.shims_dir, name), mode) as f:
+            return f.read()
+
+    def test_shims_are_exe_launchers_next_to_shim_files(self):
+        self.assertTrue(shims.update_shims(self.cfg))
+        self.assertEqual(self.read('python.exe', 'rb'), b'console launcher')
+        self.assertEqual(self.read('pip.exe', 'rb'), b'console launcher')
+        self.assertEqual(self.read('pythonw.exe', 'rb'), b'gui launcher')
+        python_exe = os.path.join(self.python_dir, 'python.exe')
+        self.assertEqual(self.read('python.shim').splitlines(), [shims.SHIM_MARKER, f"path = {python_exe}"])
+        self.assertEqual(self.read('pip.shim').splitlines(),
+                         [shims.SHIM_MARKER, f"path = {python_exe}", "args = -m pip"])
+        # PHP is not configured, so it gets no shim
+        self.assertFalse(os.path.exists(os.path.join(self.shims_dir, 'php.exe')))
+        self.assertEqual(sorted(self.compiled), [False, True])
+
+    def test_shims_directory_goes_first_on_path(self):
+        self.assertTrue(shims.update_shims(self.cfg))
+        # The runtime directory is dropped, other directories keep their order behind the shims
+        self.assertEqual(path.get_path('system'), [self.shims_dir, self.other_python])
+
+    def test_second_run_changes_nothing(self):
+        shims.update_shims(self.cfg)
+        writes, compiled = self.registry.writes, list(self.compiled)
+        self.assertTrue(shims.update_shims(self.cfg))
+        self.assertEqual(self.registry.writes, writes)
+        self.assertEqual(self.compiled, compiled)
+
+    def test_status_counts_only_a_shim_that_runs_the_runtime(self):
+        shims.update_shims(self.cfg)
+        self.assertTrue(status.probe_runtime('python', self.cfg, path.get_path_snapshot())['via_shims'])
+
+        # Another Python configured, but the shims were not regenerated for it
+        other_python = os.path.join(self.root, 'Python313')
+        write_executable(os.path.join(other_python, 'python.exe'), CONSOLE)
+        result = status.probe_runtime('python', dict(self.cfg, python_path=other_python), path.get_path_snapshot())
+        self.assertEqual(result['state'], 'installed')
+        self.assertFalse(result['via_shims'])
+
+    def test_old_and_foreign_launchers(self):
+        os.makedirs(self.shims_dir)
+        with open(os.path.join(self.shims_dir, 'python.cmd'), 'w') as f:
+            f.write(f"{shims.LEGACY_SHIM_MARKER}\r\n@\"C:\\Python312\\python.exe\" %*\r\n")
+        with open(os.path.join(self.shims_dir, 'pip.exe'), 'wb') as f:
+            f.write(b'someone else')
+        shims.update_shims(dict(self.cfg, php_path=os.path.join(self.root, 'PHP850')))
+        self.assertFalse(os.path.exists(os.path.join(self.shims_dir, 'python.cmd')))
+        self.assertEqual(self.read('pip.exe', 'rb'), b'someone else')
+        self.assertTrue(os.path.exists(os.path.join(self.shims_dir, 'python.exe')))
+
+        # A runtime that is no longer configured loses its shim
+        shims.update_shims({'install_path': self.root})
+        self.assertFalse(os.path.exists(os.path.join(self.shims_dir, 'python.exe')))
+        self.assertFalse(os.path.exists(os.path.join(self.shims_dir, 'python.shim')))
+        self.assertEqual(self.read('pip.exe', 'rb'), b'someone else')
+
+
+if __name__ == '__main__':
+    unittest.main()